@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks for the node execution hot path.
+
+Benchmarks are registered with the `benchmark` decorator on a setup function, which
+receives the parameter of the run (an array size, a number of predecessors, ...) and
+returns the zero argument callable to time. Every callable is timed with `timeit`:
+the number of calls per measurement is calibrated with `Timer.autorange`, and the
+best of `repeat` measurements is kept.
+
+Run `python -m benchmarks --help` from the root of the repository.
+"""
+
+import fnmatch
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Any, Callable, Optional
+
+# array sizes used by the benchmarks parametrized with `sizes=True`
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+
+_registry: dict[str, "Benchmark"] = {}
+
+
+class Benchmark:
+    def __init__(
+        self,
+        name: str,
+        setup: Callable[[Any], Callable[[], Any]],
+        params: Optional[list] = None,
+        sizes: bool = False,
+    ) -> None:
+        self.name = name
+        self.setup = setup
+        self.params = params
+        self.sizes = sizes
+
+    def run_params(self, sizes: list) -> list:
+        if self.sizes:
+            return sizes
+        return self.params if self.params is not None else [None]
+
+
+def benchmark(name: str, params: Optional[list] = None, sizes: bool = False):
+    """
+    Registers a benchmark. `params` lists the values the setup function is called
+    with, `sizes` parametrizes it with the array sizes given on the command line
+    instead.
+    """
+
+    def decorator(setup):
+        _registry[name] = Benchmark(name, setup, params, sizes)
+        return setup
+
+    return decorator
+
+
+def registered(pattern: str = "*") -> list[Benchmark]:
+    from . import hot_path, startup  # noqa: F401, registers the benchmarks
+
+    return [b for name, b in _registry.items() if fnmatch.fnmatch(name, pattern)]
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, number: int = 0) -> dict:
+    timer = timeit.Timer(func)
+    if not number:
+        number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "best": min(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(
+    pattern: str = "*",
+    sizes: Optional[list] = None,
+    repeat: int = 5,
+    number: int = 0,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> list[dict]:
+    """Runs the benchmarks matching `pattern` and returns one entry per parameter"""
+    results = []
+    for bench in registered(pattern):
+        for param in bench.run_params(sizes or DEFAULT_SIZES):
+            func = bench.setup(param)
+            result = {"name": bench.name, "param": param}
+            result.update(measure(func, repeat, number))
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+def environment() -> dict:
+    import numpy
+
+    try:
+        from importlib.metadata import version
+
+        flojoy_version = version("flojoy")
+    except Exception:
+        flojoy_version = "unknown"
+    return {
+        "flojoy": flojoy_version,
+        "python": sys.version.split()[0],
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(results: list[dict], path: str):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load(path: str) -> list[dict]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def key(result: dict) -> str:
+    if result["param"] is None:
+        return result["name"]
+    return "%s[%s]" % (result["name"], result["param"])
+
+
+def compare(baseline: list[dict], current: list[dict], threshold: float = 0.1):
+    """
+    Matches the results of two runs by benchmark and parameter. Returns rows of
+    `(key, baseline best, current best, ratio)` and the keys of the benchmarks that
+    got slower by more than `threshold` (a fraction of the baseline time).
+    """
+    previous = {key(result): result["best"] for result in baseline}
+    rows = []
+    regressions = []
+    for result in current:
+        k = key(result)
+        if k not in previous:
+            continue
+        ratio = result["best"] / previous[k]
+        rows.append((k, previous[k], result["best"], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(k)
+    return rows, regressions
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "%.2f %s" % (seconds / scale, unit)
+    return "%.0f ns" % (seconds / 1e-9)
@@ -0,0 +1,79 @@
+"""
+Command line entry point of the benchmark suite.
+
+```
+python -m benchmarks --output before.json
+python -m benchmarks --output after.json --compare before.json
+python -m benchmarks -k "construct*" --sizes 10 1000000
+```
+
+Exits with status 1 when `--compare` finds a benchmark slower than the baseline by
+more than `--threshold`.
+"""
+
+import argparse
+import sys
+
+from . import DEFAULT_SIZES, compare, format_time, key, load, registered, run, save
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "-k", "--filter", default="*", help="glob matched against benchmark names"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="array sizes of the size parametrized benchmarks",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=0,
+        help="calls per measurement, calibrated automatically by default",
+    )
+    parser.add_argument("-o", "--output", help="write the results to a JSON file")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown (fraction of the baseline) reported as a regression",
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in registered(args.filter):
+            print(bench.name)
+        return 0
+
+    def progress(result):
+        print("%-50s %12s" % (key(result), format_time(result["best"])))
+
+    results = run(args.filter, args.sizes, args.repeat, args.number, progress)
+    if args.output:
+        save(results, args.output)
+
+    if args.compare:
+        rows, regressions = compare(load(args.compare), results, args.threshold)
+        print()
+        print("%-50s %12s %12s %8s" % ("benchmark", "baseline", "current", "ratio"))
+        for k, before, after, ratio in rows:
+            mark = " <" if k in regressions else ""
+            print(
+                "%-50s %12s %12s %7.2fx%s"
+                % (k, format_time(before), format_time(after), ratio, mark)
+            )
+        if regressions:
+            print("\n%d benchmark(s) regressed" % len(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
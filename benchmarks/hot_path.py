@@ -0,0 +1,331 @@
+"""
+Benchmarks of what runs for every node: the `flojoy` wrapper, fetching inputs,
+building `DataContainer`s, small memory and parameter parsing.
+"""
+
+import numpy as np
+
+from flojoy import data_container
+from flojoy.box import Box
+from flojoy.dao import Dao
+from flojoy.flojoy_python import fetch_inputs, flojoy
+from flojoy.job_service import JobService
+from flojoy.jobset_executor import Job, JobsetExecutor
+from flojoy.parameter_types import format_param_value, parse_array, parse_ctrl_value
+from flojoy.preview import preview_container
+from flojoy.reconciler import Reconciler
+from flojoy.serialization import decode, encode
+from flojoy.small_memory import SmallMemory
+
+from . import benchmark
+
+PREDECESSORS = [1, 10, 100]
+NESTED_BOX_LEAVES = [10, 100, 1000]
+ARRAY_PARAM_ITEMS = [10, 100, 1000]
+SWEEP_JOBS = [100, 1000]
+RECONCILED_INPUTS = [4, 32]
+
+
+@flojoy
+def _NOOP(default=None):
+    return default
+
+
+@flojoy
+def _PARAMS(default=None, **params):
+    return default
+
+
+def _gain(default, gain: float = 2.0):
+    return data_container.OrderedPair(x=default.x, y=default.y * gain)
+
+
+_GAIN = flojoy(_gain)
+_BATCHED_GAIN = flojoy(batch=True)(_gain)
+
+
+@benchmark("flojoy_wrapper")
+def flojoy_wrapper(_):
+    Dao.get_instance().clear_job_results()
+    return lambda: _NOOP(node_id="NOOP-1", job_id="job-1", jobset_id="bench")
+
+
+def _ctrls(count: int) -> dict:
+    return {
+        "p%d" % i: {"param": "p%d" % i, "value": "1,2,3", "type": "list[float]"}
+        for i in range(count)
+    }
+
+
+@benchmark("flojoy_wrapper[ctrls]", params=[10])
+def flojoy_wrapper_ctrls(count):
+    Dao.get_instance().clear_job_results()
+    ctrls = _ctrls(count)
+    return lambda: _PARAMS(
+        node_id="NOOP-1",
+        job_id="job-1",
+        jobset_id="bench",
+        function_parameters=set(ctrls),
+        ctrls=ctrls,
+    )
+
+
+@benchmark("call_plan[ctrls]", params=[10])
+def call_plan_ctrls(count):
+    Dao.get_instance().clear_job_results()
+    ctrls = _ctrls(count)
+    return _PARAMS.compile(
+        node_id="NOOP-1",
+        job_id="job-1",
+        jobset_id="bench",
+        function_parameters=set(ctrls),
+        ctrls=ctrls,
+    )
+
+
+@benchmark("fetch_inputs", params=PREDECESSORS)
+def fetch_inputs_predecessors(count):
+    Dao.get_instance().clear_job_results()
+    previous_jobs = []
+    for i in range(count):
+        job_id = "prev-%d" % i
+        JobService().post_job_result(job_id, data_container.Vector(v=np.arange(10)))
+        previous_jobs.append(
+            {"job_id": job_id, "input_name": "in%d" % i, "edge": "default"}
+        )
+    return lambda: fetch_inputs(previous_jobs)
+
+
+def _container_args(size: int) -> dict:
+    """Constructor arguments of every container class for arrays of `size` items"""
+    side = max(int(size**0.5), 1)
+    line = np.linspace(0, 1, size)
+    plane = np.zeros((side, side))
+    t = np.arange(side)
+    return {
+        "OrderedPair": dict(x=line, y=line),
+        "ParametricOrderedPair": dict(x=line, y=line, t=line),
+        "OrderedTriple": dict(x=line, y=line, z=line),
+        "ParametricOrderedTriple": dict(x=line, y=line, z=line, t=line),
+        "Surface": dict(x=t, y=t, z=plane),
+        "ParametricSurface": dict(x=t, y=t, z=plane, t=t),
+        "Scalar": dict(c=1.0),
+        "ParametricScalar": dict(c=line, t=line),
+        "Vector": dict(v=line),
+        "ParametricVector": dict(v=line, t=line),
+        "Matrix": dict(m=plane),
+        "ParametricMatrix": dict(m=plane, t=t),
+        "Image": dict(r=plane, g=plane, b=plane, a=plane),
+        "ParametricImage": dict(r=plane, g=plane, b=plane, a=plane, t=t),
+        "Grayscale": dict(img=plane),
+        "ParametricGrayscale": dict(img=plane, t=t),
+        "Bytes": dict(b=bytes(size)),
+        "TextBlob": dict(text_blob="x" * size),
+    }
+
+
+def _container_benchmark(name: str):
+    cls = getattr(data_container, name)
+
+    def setup(size):
+        kwargs = _container_args(size)[name]
+        return lambda: cls(**kwargs)
+
+    benchmark("construct[%s]" % name, sizes=True)(setup)
+
+
+for _name in _container_args(1):
+    _container_benchmark(_name)
+
+
+@benchmark("construct_from_lists[OrderedPair]", sizes=True)
+def construct_from_lists(size):
+    x = list(range(size))
+    return lambda: data_container.OrderedPair(x=x, y=x)
+
+
+@benchmark("box_to_dict", params=NESTED_BOX_LEAVES)
+def box_to_dict(leaves):
+    # three levels of nesting, with lists of boxes at the bottom
+    width = max(int(round(leaves ** (1 / 3))), 1)
+    leaf = [{"c%d" % k: k} for k in range(width)]
+    level = {"b%d" % j: leaf for j in range(width)}
+    nested = {"a%d" % i: level for i in range(width)}
+    box = Box(nested)
+    return box.to_dict
+
+
+@benchmark("small_memory_write[ndarray]", sizes=True)
+def small_memory_write(size):
+    memory = SmallMemory()
+    value = np.arange(size, dtype=np.float64)
+    return lambda: memory.write_to_memory("job-1", "bench", value)
+
+
+@benchmark("small_memory_read[ndarray]", sizes=True)
+def small_memory_read(size):
+    memory = SmallMemory()
+    memory.write_to_memory("job-1", "bench", np.arange(size, dtype=np.float64))
+    return lambda: memory.read_memory("job-1", "bench")
+
+
+@benchmark("small_memory_roundtrip[dict]")
+def small_memory_dict(_):
+    memory = SmallMemory()
+    value = {"count": 1, "label": "bench", "values": [1, 2, 3]}
+
+    def roundtrip():
+        memory.write_to_memory("job-1", "bench_dict", value)
+        return memory.read_memory("job-1", "bench_dict")
+
+    return roundtrip
+
+
+@benchmark("encode[OrderedPair]", sizes=True)
+def encode_ordered_pair(size):
+    line = np.linspace(0, 1, size)
+    dc = data_container.OrderedPair(x=line, y=line)
+    return lambda: encode(dc)
+
+
+@benchmark("decode[OrderedPair]", sizes=True)
+def decode_ordered_pair(size):
+    line = np.linspace(0, 1, size)
+    buffer = encode(data_container.OrderedPair(x=line, y=line))
+    return lambda: decode(buffer)
+
+
+@benchmark("preview[OrderedPair]", sizes=True)
+def preview_ordered_pair(size):
+    line = np.linspace(0, 1, size)
+    dc = data_container.OrderedPair(x=line, y=np.sin(line))
+    return lambda: preview_container(dc)
+
+
+@benchmark("format_param_value[scalars]")
+def format_param_value_scalars(_):
+    def parse():
+        format_param_value("1.5", "float")
+        format_param_value("3", "int")
+        format_param_value("text", "select")
+        format_param_value("", "bool")
+
+    return parse
+
+
+@benchmark("format_param_value[Array]", params=ARRAY_PARAM_ITEMS)
+def format_param_value_array(items):
+    value = ",".join(str(i * 0.5) for i in range(items))
+    return lambda: format_param_value(value, "Array")
+
+
+@benchmark("parse_array[list[float]]", params=ARRAY_PARAM_ITEMS)
+def parse_array_floats(items):
+    value = ",".join(str(i * 0.5) for i in range(items))
+    return lambda: parse_array(value, [float], "list[float]")
+
+
+@benchmark("parse_ctrl_value[list[float]]", params=ARRAY_PARAM_ITEMS)
+def parse_ctrl_value_floats(items):
+    # the same ctrl value on every invocation, as in a loop
+    value = ",".join(str(i * 0.5) for i in range(items))
+    return lambda: parse_ctrl_value("NODE", value, "list[float]")
+
+
+@benchmark("reconcile__matrix", sizes=True)
+def reconcile_matrix(size):
+    side = max(int(size**0.5), 2)
+    lhs = data_container.DataContainer(type="matrix", m=np.ones((side, side)))
+    rhs = data_container.DataContainer(type="matrix", m=np.ones((side // 2, side)))
+    reconciler = Reconciler()
+    return lambda: reconciler.reconcile__matrix(lhs, rhs)
+
+
+@benchmark("reconcile__matrix_scalar", sizes=True)
+def reconcile_matrix_scalar(size):
+    side = max(int(size**0.5), 2)
+    lhs = data_container.DataContainer(type="matrix", m=np.ones((side, side)))
+    rhs = data_container.DataContainer(type="scalar", c=2.0)
+    reconciler = Reconciler()
+    return lambda: reconciler.reconcile(lhs, rhs)
+
+
+@benchmark("reconcile__ordered_pair", sizes=True)
+def reconcile_ordered_pair(size):
+    x = np.linspace(0, 1, size)
+    lhs = data_container.DataContainer(type="ordered_pair", x=x, y=np.sin(x))
+    # same range, shifted samples: every point of one is interpolated in the other
+    x = x + 0.5 / size
+    rhs = data_container.DataContainer(type="ordered_pair", x=x, y=np.cos(x))
+    reconciler = Reconciler()
+    return lambda: reconciler.reconcile__ordered_pair(lhs, rhs)
+
+
+def _matrix_inputs(count: int):
+    # matrices of slightly different shapes, as the inputs of a `multiple` input
+    return [
+        data_container.DataContainer(
+            type="matrix", m=np.ones((256 - i % 3, 256 - i % 5))
+        )
+        for i in range(count)
+    ]
+
+
+@benchmark("reconcile_sum[pairwise]", params=RECONCILED_INPUTS)
+def reconcile_sum_pairwise(count):
+    dcs = _matrix_inputs(count)
+    reconciler = Reconciler()
+
+    def reduce():
+        total = dcs[0]
+        for dc in dcs[1:]:
+            lhs, rhs = reconciler.reconcile(total, dc)
+            total = data_container.DataContainer(type="matrix", m=lhs.m + rhs.m)
+        return total
+
+    return reduce
+
+
+@benchmark("reconcile_sum[stack]", params=RECONCILED_INPUTS)
+def reconcile_sum_stack(count):
+    dcs = _matrix_inputs(count)
+    reconciler = Reconciler()
+    return lambda: reconciler.stack(dcs).sum(axis=0)
+
+
+def _sweep(jobs: int, node):
+    # one small input per job, posted beforehand so that every job is ready at once
+    Dao.get_instance().clear_job_results()
+    x = np.arange(64, dtype=np.float64)
+    for i in range(jobs):
+        JobService().post_job_result(
+            "sweep-in-%d" % i, data_container.OrderedPair(x=x, y=x + i)
+        )
+    executor = JobsetExecutor(
+        [
+            Job(
+                "sweep-%d" % i,
+                node,
+                previous_jobs=[
+                    {
+                        "job_id": "sweep-in-%d" % i,
+                        "input_name": "default",
+                        "edge": "default",
+                    }
+                ],
+            )
+            for i in range(jobs)
+        ],
+        max_workers=1,
+    )
+    return executor.run
+
+
+@benchmark("jobset_sweep[per_job]", params=SWEEP_JOBS)
+def jobset_sweep(jobs):
+    return _sweep(jobs, _GAIN)
+
+
+@benchmark("jobset_sweep[batch]", params=SWEEP_JOBS)
+def jobset_sweep_batch(jobs):
+    return _sweep(jobs, _BATCHED_GAIN)
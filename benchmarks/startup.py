@@ -0,0 +1,31 @@
+"""
+Benchmarks of the startup of a worker process: a fresh interpreter importing flojoy.
+Each call starts a new interpreter, the `pass` statement measures the interpreter
+alone.
+"""
+
+import os
+import subprocess
+import sys
+
+import flojoy
+
+from . import benchmark
+
+STATEMENTS = [
+    "pass",
+    "import flojoy",
+    "from flojoy import flojoy",
+    "from flojoy import *",
+]
+
+
+@benchmark("import_time", params=STATEMENTS)
+def import_time(statement):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(flojoy.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (root, env.get("PYTHONPATH")) if path
+    )
+    command = [sys.executable, "-c", statement]
+    return lambda: subprocess.run(command, env=env, check=True)
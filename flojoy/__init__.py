@@ -1,12 +1,154 @@
-from .data_container import *
-from .flojoy_python import *
-from .job_result_builder import *
-from .flojoy_instruction import *
-from .job_result_utils import *
-from .data_container import *
-from .utils import *
-from .parameter_types import *
-from .small_memory import *
-from .job_service import *
-from .node_init import *
-from .config import *
+"""
+The public names of the flojoy submodules, loaded lazily.
+
+`import flojoy` doesn't import any submodule (nor NumPy): the submodule defining a
+name is imported the first time the name is read, e.g. `flojoy.DataContainer` imports
+`flojoy.data_container`. Worker processes which only need a few names don't pay for
+importing every subsystem. `__init__.pyi` lists the same names for type checkers.
+"""
+
+import importlib
+
+# public names of each submodule, in the order they used to be star imported: a name
+# exported by several submodules resolves to the last one
+_SUBMODULE_EXPORTS = {
+    "data_container": [
+        "DCNpArrayType",
+        "Lazy",
+        "DataContainer",
+        "OrderedPair",
+        "ParametricOrderedPair",
+        "OrderedTriple",
+        "ParametricOrderedTriple",
+        "Surface",
+        "ParametricSurface",
+        "Scalar",
+        "ParametricScalar",
+        "Vector",
+        "ParametricVector",
+        "Matrix",
+        "ParametricMatrix",
+        "Image",
+        "Bytes",
+        "TextBlob",
+        "ParametricImage",
+        "Grayscale",
+        "ParametricGrayscale",
+        "replace_fields",
+    ],
+    "flojoy_python": ["flojoy", "DefaultParams"],
+    "job_result_builder": ["JobResultBuilder"],
+    "flojoy_instruction": ["FLOJOY_INSTRUCTION"],
+    "job_result_utils": [
+        "get_job_result",
+        "get_next_directions",
+        "get_next_nodes",
+        "get_result_nbytes",
+    ],
+    "utils": ["clear_flojoy_memory"],
+    "parameter_types": [
+        "NodeReference",
+        "Array",
+        "format_param_value",
+        "parse_array",
+        "parse_ctrl_value",
+    ],
+    "small_memory": ["SmallMemory"],
+    "job_service": ["JobService"],
+    "node_init": [
+        "NoInitFunctionError",
+        "NodeInitContainer",
+        "NodeInit",
+        "node_initialization",
+        "NodeInitService",
+        "get_node_init_function",
+    ],
+    "config": ["FlojoyConfig", "logger"],
+    "jobset_executor": [
+        "Job",
+        "JobsetExecutor",
+        "topological_sort",
+        "invalidate_downstream",
+    ],
+    "async_jobset_runner": ["AsyncJobsetRunner", "run_jobset_async"],
+    "shared_memory": ["SharedResult", "SharedMemoryJobResults", "share_result"],
+    "dao_backends": ["DaoBackend", "InMemoryBackend", "DiskBackend", "RedisBackend"],
+    "spill": ["SpillStore"],
+    "instrumentation": ["Tracer", "enable_tracing", "disable_tracing", "get_tracer"],
+    "log": [
+        "get_logger",
+        "set_log_level",
+        "configure_logging",
+        "shutdown_logging",
+        "JsonLinesFormatter",
+    ],
+    "result_cache": ["ResultCache", "fingerprint"],
+    "streaming": ["DataStream", "iter_chunks", "concat_chunks"],
+    "batching": ["stack_containers", "unstack_container"],
+    "preview": [
+        "preview_result",
+        "preview_container",
+        "minmax_indices",
+        "lttb_indices",
+    ],
+    "flojoy_node_venv": ["run_in_venv"],
+    "reconciler": ["Reconciler", "IrreconcilableContainersException"],
+}
+
+_EXPORTS = {
+    name: submodule for submodule, names in _SUBMODULE_EXPORTS.items() for name in names
+}
+
+# names the star imports of the submodules used to leak, e.g. `flojoy.np`
+_LEGACY_EXPORTS = {
+    "np": "data_container",
+    "Box": "box",
+    "Dao": "dao",
+    "Any": "data_container",
+    "Callable": "dao",
+    "Union": "data_container",
+    "cast": "data_container",
+}
+
+# submodules which used to be imported by `import flojoy`, and so were exported too
+_LEGACY_SUBMODULES = [
+    "box",
+    "config",
+    "dao",
+    "data_container",
+    "flojoy_instruction",
+    "flojoy_python",
+    "job_result_builder",
+    "job_result_utils",
+    "job_service",
+    "node_init",
+    "parameter_types",
+    "small_memory",
+    "utils",
+]
+
+# submodules which can be read as attributes without importing them first
+_SUBMODULES = {*_SUBMODULE_EXPORTS, *_LEGACY_SUBMODULES, "serialization"}
+
+__all__ = [*_EXPORTS, *_LEGACY_EXPORTS, *_LEGACY_SUBMODULES]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        module = importlib.import_module("." + _EXPORTS[name], __name__)
+        value = getattr(module, name)
+    elif name in _LEGACY_EXPORTS:
+        module = importlib.import_module("." + _LEGACY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        # e.g. `flojoy.serialization` without importing it first
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    # later reads don't go through `__getattr__`
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -9,8 +9,20 @@ from .parameter_types import *
 from .small_memory import *
 from .job_service import *
 from .node_init import *
-from .data_container import *
 from .config import *
+from .jobset_executor import *
+from .async_jobset_runner import *
+from .shared_memory import *
+from .dao_backends import *
+from .spill import *
+from .instrumentation import *
+from .log import *
+from .result_cache import *
+from .streaming import *
+from .batching import *
+from .preview import *
+from .flojoy_node_venv import *
+from .reconciler import Reconciler, IrreconcilableContainersException
 
 
 def flojoy(
@@ -19,4 +31,7 @@ def flojoy(
     node_type: Optional[str] = None,
     deps: Optional[dict[str, str]] = None,
     inject_node_metadata: bool = False,
+    cache: bool = False,
+    prefetch: int = 0,
+    batch: bool = False,
 ) -> Callable[..., DataContainer | dict[str, Any]]: ...
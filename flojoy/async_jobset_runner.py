@@ -0,0 +1,140 @@
+"""
+Runs a jobset on an asyncio event loop.
+
+Nodes decorated with `@flojoy` on an `async def` function are awaited directly on the
+loop, so hundreds of I/O bound nodes (e.g. instrument polling) can wait at the same
+time without a thread per node. Regular (sync) nodes are handed to a worker thread so
+they never block the loop.
+"""
+
+import asyncio
+import inspect
+from typing import Any, Optional
+
+from .log import get_logger
+from .job_service import JobService
+from .jobset_executor import Job, is_edge_active, register_consumers, topological_sort
+
+__all__ = ["AsyncJobsetRunner", "run_jobset_async"]
+
+log = get_logger(__name__)
+
+
+class AsyncJobsetRunner:
+    """
+    Awaits every job of a jobset as soon as the results of its predecessors have been
+    posted to `JobService`.
+
+    Usage Example
+    -------------
+    ```
+    @flojoy
+    async def READ_INSTRUMENT(default: DataContainer):
+        ...
+
+    runner = AsyncJobsetRunner(jobs, max_concurrency=256)
+    results = await runner.run()
+    ```
+
+    `max_concurrency` bounds how many nodes run at once, `None` means no limit.
+    Like `JobsetExecutor.run`, `run` returns the results of the jobs that no other
+    job of the jobset consumes, and `release_results` frees intermediate results
+    once all of their consumers fetched them. When a job raises, the jobs downstream
+    of it don't run and `run` raises the error.
+    """
+
+    def __init__(
+        self,
+        jobs: list[Job],
+        jobset_id: str = "",
+        max_concurrency: Optional[int] = None,
+        release_results: bool = False,
+    ) -> None:
+        self.jobs = {job.job_id: job for job in jobs}
+        self.jobset_id = jobset_id
+        self.max_concurrency = max_concurrency
+        self.release_results = release_results
+        # fails early for cyclic jobsets, which would otherwise wait forever
+        self.order = topological_sort(jobs)
+
+    async def _call(self, job: Job):
+        kwargs = job.kwargs(self.jobset_id)
+        if inspect.iscoroutinefunction(job.func):
+            return await job.func(**kwargs)
+        return await asyncio.to_thread(job.func, **kwargs)
+
+    async def run(self) -> dict[str, Any]:
+        if self.release_results:
+            register_consumers(self.jobs)
+        finished = {job_id: asyncio.Event() for job_id in self.jobs}
+        skipped: set[str] = set()
+        # jobs which raised or were cancelled, their downstream jobs never run
+        failed: set[str] = set()
+        consumed = set(
+            prev_job_id
+            for job in self.jobs.values()
+            for prev_job_id in job.predecessor_ids()
+        )
+        results: dict[str, Any] = {}
+        semaphore = (
+            asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        )
+
+        async def run_job(job: Job):
+            try:
+                predecessors = [
+                    prev_job
+                    for prev_job in job.previous_jobs
+                    if prev_job.get("job_id") in self.jobs
+                ]
+                for prev_job in predecessors:
+                    await finished[prev_job.get("job_id")].wait()
+                if any(prev_job.get("job_id") in failed for prev_job in predecessors):
+                    log.debug("not running job after a failure: %s", job.job_id)
+                    failed.add(job.job_id)
+                    return
+                for prev_job in predecessors:
+                    prev_job_id = prev_job.get("job_id")
+                    if prev_job_id in skipped or not is_edge_active(
+                        prev_job_id, prev_job.get("edge", "")
+                    ):
+                        log.debug("skipping job: %s", job.job_id)
+                        skipped.add(job.job_id)
+                        for prev_job_id in job.predecessor_ids():
+                            JobService().release_job_result(prev_job_id)
+                        return
+                log.debug("running job: %s", job.job_id)
+                if semaphore is None:
+                    result = await self._call(job)
+                else:
+                    async with semaphore:
+                        result = await self._call(job)
+                if job.job_id not in consumed:
+                    results[job.job_id] = result
+            except BaseException:
+                failed.add(job.job_id)
+                raise
+            finally:
+                finished[job.job_id].set()
+
+        tasks = [
+            asyncio.ensure_future(run_job(self.jobs[job_id])) for job_id in self.order
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return results
+
+
+def run_jobset_async(
+    jobs: list[Job],
+    jobset_id: str = "",
+    max_concurrency: Optional[int] = None,
+    release_results: bool = False,
+) -> dict[str, Any]:
+    """Runs the jobs on a new event loop and blocks until all of them finished"""
+    runner = AsyncJobsetRunner(jobs, jobset_id, max_concurrency, release_results)
+    return asyncio.run(runner.run())
@@ -0,0 +1,136 @@
+"""
+Batched execution of a node over many jobs with a single call of its function.
+
+A node decorated with `@flojoy(batch=True)` receives stacked inputs: every array key
+of its `DataContainer` inputs gets an extra first axis with one row per job, e.g. the
+`y` of 1000 `OrderedPair`s of 64 samples becomes a (1000, 64) array. It returns one
+container whose array keys are stacked the same way, which is split back into the
+result of each job:
+
+```
+@flojoy(batch=True)
+def GAIN(default: OrderedPair, gain: float = 2.0):
+    return OrderedPair(x=default.x, y=default.y * gain)
+```
+
+A single job is a batch of one, so the function always sees stacked inputs.
+`JobsetExecutor` groups the jobs of a batched node which become ready at the same
+time and have the same ctrls and edges (e.g. the branches of a parameter sweep), and
+runs each group with one call: the node function and the NumPy operations on small
+arrays run once per group instead of once per job.
+
+Jobs can only be stacked when they are called with the same parameters and their
+containers of each input have the same type, the same keys and the same shapes.
+Otherwise they run one by one.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+
+from .data_container import DataContainer, replace_fields
+from .result_cache import fingerprint
+
+__all__ = ["stack_containers", "unstack_container"]
+
+_NUMBERS = (int, float, complex, np.number)
+
+
+def _same(values: list) -> bool:
+    first = values[0]
+    digest = None
+    for value in values[1:]:
+        if value is first:
+            continue
+        if digest is None:
+            digest = fingerprint(first)
+        if fingerprint(value) != digest:
+            return False
+    return True
+
+
+def stack_containers(dcs: list[DataContainer]) -> DataContainer:
+    """
+    Stacks containers of the same type and shapes into one, adding a first axis to
+    every array key. Numbers (e.g. the `c` of `Scalar`) are stacked into a 1-D array,
+    other keys (`type`, `extra`, ...) must be equal in all of them.
+    Raises a ValueError when the containers can't be stacked.
+    """
+    first = dcs[0]
+    keys = first.keys()
+    stacked = {}
+    for dc in dcs[1:]:
+        if type(dc) is not type(first) or dc.keys() != keys:
+            raise ValueError(
+                "Can't stack containers with different types or keys, got %s and %s"
+                % (keys, dc.keys())
+            )
+    for key, value in first.items():
+        values = [value] + [dc[key] for dc in dcs[1:]]
+        if isinstance(value, np.ndarray):
+            if any(np.shape(v) != value.shape for v in values):
+                raise ValueError('Can\'t stack "%s" keys of different shapes' % key)
+            stacked[key] = np.stack(values)
+        elif isinstance(value, _NUMBERS):
+            if not all(isinstance(v, _NUMBERS) for v in values):
+                raise ValueError('Can\'t stack "%s" keys of different types' % key)
+            stacked[key] = np.asarray(values)
+        elif _same(values):
+            stacked[key] = value
+        else:
+            raise ValueError('Can\'t stack containers with different "%s" keys' % key)
+    return replace_fields(first, stacked)
+
+
+def unstack_container(dc: DataContainer, count: int) -> list[DataContainer]:
+    """
+    Splits the result of a batched call into the results of its `count` jobs. Every
+    array key must have one row per job, the rows are split as views. The other keys
+    are shared by all of the results.
+    """
+    if not isinstance(dc, DataContainer):
+        raise ValueError(
+            "Batched nodes must return a DataContainer, got %s" % type(dc).__name__
+        )
+    fields = dict(dc.items())
+    for key, value in fields.items():
+        if isinstance(value, np.ndarray) and value.shape[:1] != (count,):
+            raise ValueError(
+                '"%s" key of a batched result must have %d rows, one per job, got '
+                "shape %s" % (key, count, value.shape)
+            )
+    return [
+        replace_fields(
+            dc,
+            {
+                key: (value[i] if isinstance(value, np.ndarray) else value)
+                for key, value in fields.items()
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def stack_args(calls: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    """
+    Merges the keyword arguments of several calls of a node into the arguments of one
+    batched call, `None` when the calls can't be stacked
+    """
+    first = calls[0]
+    if any(call.keys() != first.keys() for call in calls[1:]):
+        return None
+    args = {}
+    for name, value in first.items():
+        values = [call[name] for call in calls]
+        if isinstance(value, DataContainer):
+            if not all(isinstance(v, DataContainer) for v in values):
+                return None
+            try:
+                args[name] = stack_containers(values)
+            except ValueError:
+                return None
+        elif _same(values):
+            args[name] = value
+        else:
+            return None
+    return args
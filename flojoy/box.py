@@ -1,4 +1,6 @@
 class Box:
+    # no `__weakref__` slot, containers are never weakly referenced
+    __slots__ = ("__dict__",)
 
     def __init__(self, *args, **kwargs):
         for arg in args:
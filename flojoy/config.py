@@ -10,8 +10,16 @@ class FlojoyConfig:
     def __init__(self):
         self.is_offline = False
         self.to_print = False
+        # validate the DataContainers returned by nodes before posting them
+        self.validate_results = False
+        # size and method of the display resolution previews of results, see `preview`
+        self.preview_max_points = 2000
+        self.preview_max_side = 512
+        self.preview_method = "minmax"
+        # compute the previews when the results are posted instead of on demand
+        self.preview_results = False
 
-# TODO make log levels? 
+# prints for nodes when debugging is on, flojoy modules log through `log.get_logger`
 def logger(*to_print):
     if FlojoyConfig.get_instance().to_print:
         print(*to_print)
@@ -1,5 +1,17 @@
 import numpy as np
-from typing import Any, Callable
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from .dao_backends import (
+    DaoBackend,
+    InMemoryBackend,
+    JOB_RESULTS,
+    SMALL_MEMORY,
+    INIT_CONTAINERS,
+)
+from .log import get_logger
+
+log = get_logger(__name__)
 
 MAX_LIST_SIZE = 1000
 
@@ -13,10 +25,15 @@ def create_storage():
 
 
 """
-This class is a Singleton that acts as a in-memory datastorage
-
-IMPORTANT: The commented code should not be removed, as it acts as a reference for the future
-in case we need to implement a Redis based datastorage
+This class is a Singleton that acts as the datastorage of job results, small memory and
+node init containers. The values live in a `DaoBackend`: in memory by default, or on
+disk / in a Redis server when they have to be shared between processes and hosts
+(see `set_backend`). Node init functions are callables and always stay in memory.
+
+The job results can be bounded: with `set_job_results_budget` the least recently used
+results are evicted once their arrays take more than the given number of bytes, and a
+result registered with `set_job_consumers` is released as soon as all of its
+downstream consumers fetched it.
 """
 
 
@@ -29,11 +46,28 @@ class Dao:
             Dao._instance = Dao()
         return Dao._instance
 
-    def __init__(self):
-        self.storage = {}  # small memory
-        self.job_results = {}
-        self.node_init_container = {}
+    def __init__(self, backend: Optional[DaoBackend] = None):
         self.node_init_func = {}
+        self.job_results_budget: Optional[int] = None
+        self.job_results_nbytes = 0
+        # job ids from least to most recently used, with the size of their results
+        self.job_result_sizes: OrderedDict[str, int] = OrderedDict()
+        # number of consumers that still have to fetch a job result
+        self.job_consumers: dict[str, int] = {}
+        # signature of the job (node, ctrls, inputs) each result was computed for
+        self.job_signatures: dict[str, bytes] = {}
+        # display resolution previews of the job results, computed on demand
+        self.job_previews: dict[str, Any] = {}
+        self.job_results_lock = threading.RLock()
+        # optional second tier receiving the evicted results
+        self.spill_store = None
+        self.set_backend(backend if backend is not None else InMemoryBackend())
+
+    def set_backend(self, backend: DaoBackend):
+        self.backend = backend
+        self.storage = backend.namespace(SMALL_MEMORY)  # small memory
+        self.job_results = backend.namespace(JOB_RESULTS)
+        self.node_init_container = backend.namespace(INIT_CONTAINERS)
 
     """
     METHODS FOR JOB RESULTS
@@ -41,21 +75,167 @@ class Dao:
 
     def get_job_result(self, job_id: str) -> Any | None:
         res = self.job_results.get(job_id, None)
+        if res is None and self.spill_store is not None:
+            if self.spill_store.contains(job_id):
+                return self.spill_store.load(job_id)
         if res is None:
             raise ValueError("Job result with id %s does not exist" % job_id)
+        with self.job_results_lock:
+            if job_id in self.job_result_sizes:
+                self.job_result_sizes.move_to_end(job_id)
         return res
 
     def post_job_result(self, job_id: str, result: Any):
-        self.job_results[job_id] = result
+        from .job_result_utils import get_result_nbytes  # avoid circular import
+
+        nbytes = get_result_nbytes(result)
+        with self.job_results_lock:
+            self.job_results[job_id] = result
+            self.job_previews.pop(job_id, None)
+            if self.spill_store is not None:
+                # a spilled copy of an earlier result of the job is stale now
+                self.spill_store.delete(job_id)
+            self.job_results_nbytes += nbytes - self.job_result_sizes.get(job_id, 0)
+            self.job_result_sizes[job_id] = nbytes
+            self.job_result_sizes.move_to_end(job_id)
+            self._evict_job_results()
 
     def clear_job_results(self):
-        self.job_results.clear()
+        with self.job_results_lock:
+            self.job_results.clear()
+            if self.spill_store is not None:
+                self.spill_store.clear()
+            self.job_result_sizes.clear()
+            self.job_results_nbytes = 0
+            self.job_consumers.clear()
+            self.job_signatures.clear()
+            self.job_previews.clear()
+
+    def set_job_results_budget(self, max_bytes: Optional[int]):
+        """
+        Bounds the bytes taken by the arrays of the job results, `None` means unbounded
+        """
+        with self.job_results_lock:
+            self.job_results_budget = max_bytes
+            self._evict_job_results()
+
+    def _evict_job_results(self):
+        budget = self.job_results_budget
+        if budget is None or self.job_results_nbytes <= budget:
+            return
+        # the most recent result is always kept, even if it exceeds the budget alone
+        candidates = list(self.job_result_sizes)[:-1]
+        # results still waiting for consumers only go when nothing else is left, and
+        # only to the spill store: dropping them would starve their consumers
+        for waiting_for_consumers in (False, True):
+            for job_id in candidates:
+                if self.job_results_nbytes <= budget:
+                    return
+                if (job_id in self.job_consumers) != waiting_for_consumers:
+                    continue
+                if waiting_for_consumers and not self._spills(job_id):
+                    continue
+                self.evict_job_result(job_id)
+        if self.job_results_nbytes > budget:
+            log.warning(
+                "job results take %d bytes, above the budget of %d bytes, the rest "
+                "is still waiting for consumers",
+                self.job_results_nbytes,
+                budget,
+            )
+
+    def _spills(self, job_id: str) -> bool:
+        return (
+            self.spill_store is not None
+            and self.job_result_sizes.get(job_id, 0) >= self.spill_store.min_nbytes
+        )
+
+    def evict_job_result(self, job_id: str):
+        with self.job_results_lock:
+            if self._spills(job_id):
+                result = self.job_results.get(job_id, None)
+                if result is not None:
+                    self.spill_store.spill(job_id, result)
+            self.job_results.pop(job_id, None)
+            self.job_results_nbytes -= self.job_result_sizes.pop(job_id, 0)
+
+    def set_spill_store(self, spill_store):
+        """Sets the `SpillStore` evicted job results are written to, or `None`"""
+        with self.job_results_lock:
+            if self.spill_store is not None and self.spill_store is not spill_store:
+                self.spill_store.close()
+            self.spill_store = spill_store
+
+    def set_job_consumers(self, job_id: str, count: int):
+        """
+        Registers how many times a job result will be fetched by downstream jobs, the
+        result is deleted once `release_job_result` was called that many times
+        """
+        with self.job_results_lock:
+            if count > 0:
+                self.job_consumers[job_id] = count
+            else:
+                self.job_consumers.pop(job_id, None)
+
+    def release_job_result(self, job_id: str):
+        with self.job_results_lock:
+            if job_id not in self.job_consumers:
+                return
+            self.job_consumers[job_id] -= 1
+            if self.job_consumers[job_id] <= 0:
+                self.delete_job(job_id)
+
+    def use_shared_memory(self):
+        """
+        Stores job results in shared memory blocks so that worker processes can read
+        them without copying their arrays
+        """
+        from .shared_memory import SharedMemoryJobResults  # avoid circular import
+
+        if isinstance(self.job_results, SharedMemoryJobResults):
+            return
+        if not isinstance(self.backend, InMemoryBackend):
+            raise ValueError("Shared memory job results require the in-memory backend")
+        shared_results = SharedMemoryJobResults()
+        shared_results.update(self.job_results)
+        self.backend.namespaces[JOB_RESULTS] = shared_results
+        self.job_results = shared_results
 
     def job_exists(self, job_id: str) -> bool:
-        return job_id in self.job_results.keys()
+        if job_id in self.job_results.keys():
+            return True
+        return self.spill_store is not None and self.spill_store.contains(job_id)
 
     def delete_job(self, job_id: str):
-        self.job_results.pop(job_id, None)
+        with self.job_results_lock:
+            self.job_results.pop(job_id, None)
+            self.job_results_nbytes -= self.job_result_sizes.pop(job_id, 0)
+            self.job_consumers.pop(job_id, None)
+            self.job_signatures.pop(job_id, None)
+            self.job_previews.pop(job_id, None)
+            if self.spill_store is not None:
+                self.spill_store.delete(job_id)
+
+    def set_job_signature(self, job_id: str, signature: bytes):
+        self.job_signatures[job_id] = signature
+
+    def get_job_signature(self, job_id: str) -> Optional[bytes]:
+        return self.job_signatures.get(job_id)
+
+    def get_job_preview(self, job_id: str) -> Any:
+        """
+        Display resolution version of a job result (see `preview`), computed the first
+        time it is requested and kept until the result changes or is deleted
+        """
+        from .preview import preview_result  # avoid circular import
+
+        preview = self.job_previews.get(job_id)
+        if preview is None:
+            preview = preview_result(self.get_job_result(job_id))
+            with self.job_results_lock:
+                if job_id in self.job_result_sizes:
+                    self.job_previews[job_id] = preview
+        return preview
 
     """
     METHODS FOR SMALL MEMORY
@@ -76,7 +256,7 @@ class Dao:
     def set_str(self, key: str, value: str):
         self.storage[key] = value
 
-    def get_np_array(self, memo_key: str):
+    def get_np_array(self, memo_key: str, meta_data: Optional[dict] = None):
         encoded = self.storage.get(memo_key, None)
         self.check_if_valid(encoded, np.ndarray)
         return encoded
@@ -97,24 +277,13 @@ class Dao:
         self.storage.pop(key)
 
     def remove_item_from_set(self, key: str, item: Any):
-        res = self.storage.get(key, None)
-        self.check_if_valid(res, set)
-        if not res:
-            return
-        res.remove(item)
+        self.backend.remove_item_from_set(SMALL_MEMORY, key, item)
 
     def add_to_set(self, key: str, value: Any):
-        res = self.storage.get(key, None)
-        if res is None:
-            res = set()
-            res.add(value)
-            self.storage[key] = res
-            return
-        self.check_if_valid(res, set)
-        res.add(value)
+        self.backend.add_to_set(SMALL_MEMORY, key, value)
 
     def get_set_list(self, key: str):
-        res = self.storage.get(key, None)
+        res = self.backend.get_set(SMALL_MEMORY, key)
         if res is None:
             return None
         self.check_if_valid(res, set)
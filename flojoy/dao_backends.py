@@ -0,0 +1,316 @@
+"""
+Storage backends for `Dao`.
+
+A backend exposes named namespaces (job results, small memory, node init containers)
+as mutable mappings, plus the set operations used by small memory. Backends other
+than `InMemoryBackend` store values encoded by `serialization`: arrays are written as
+raw buffers next to their dtype/shape metadata, never pickled, so several processes
+(or hosts, for `RedisBackend`) can share job results. Their `compression` option
+compresses the large buffers of the stored values, see `serialization`.
+"""
+
+import mmap
+import os
+import re
+import socket
+import threading
+import urllib.parse
+from collections.abc import MutableMapping
+from typing import Any, Iterator, Optional
+
+from .serialization import decode, encode
+
+__all__ = ["DaoBackend", "InMemoryBackend", "DiskBackend", "RedisBackend"]
+
+JOB_RESULTS = "job_results"
+SMALL_MEMORY = "small_memory"
+INIT_CONTAINERS = "init_containers"
+
+
+class DaoBackend:
+    """
+    Interface of the storages `Dao` is built on. Subclasses only need to implement
+    `namespace`, the set operations have a generic read-modify-write fallback.
+    """
+
+    def namespace(self, name: str) -> MutableMapping:
+        raise NotImplementedError()
+
+    def get_set(self, namespace: str, key: str) -> Optional[set]:
+        return self.namespace(namespace).get(key, None)
+
+    def add_to_set(self, namespace: str, key: str, item: Any):
+        storage = self.namespace(namespace)
+        res = storage.get(key, None)
+        if res is None:
+            res = set()
+        res.add(item)
+        storage[key] = res
+
+    def remove_item_from_set(self, namespace: str, key: str, item: Any):
+        storage = self.namespace(namespace)
+        res = storage.get(key, None)
+        if not res:
+            return
+        res.remove(item)
+        storage[key] = res
+
+    def close(self):
+        pass
+
+
+class InMemoryBackend(DaoBackend):
+    """Plain dicts living in the current process, the default backend"""
+
+    def __init__(self) -> None:
+        self.namespaces: dict[str, MutableMapping] = {}
+
+    def namespace(self, name: str) -> MutableMapping:
+        if name not in self.namespaces:
+            self.namespaces[name] = {}
+        return self.namespaces[name]
+
+
+class _DiskNamespace(MutableMapping):
+    def __init__(self, directory: str, compression: Optional[str] = None) -> None:
+        self.directory = directory
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, urllib.parse.quote(key, safe=""))
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            with open(self._path(key), "rb") as f:
+                # copy-on-write mapping: decoded arrays are writable views over the
+                # file, and the mapping lives as long as they do
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except FileNotFoundError:
+            raise KeyError(key)
+        return decode(buffer)
+
+    def __setitem__(self, key: str, value: Any):
+        path = self._path(key)
+        tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "wb") as f:
+            f.write(encode(value, self.compression))
+        # readers either see the previous value or the new one, never a partial file
+        os.replace(tmp_path, path)
+
+    def __delitem__(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return os.path.exists(self._path(key))
+
+    def __iter__(self) -> Iterator[str]:
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(".tmp"):
+                yield urllib.parse.unquote(file_name)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class DiskBackend(DaoBackend):
+    """
+    Stores every value in its own file under `directory`, read back through a memory
+    map. Processes pointing at the same directory share their job results.
+    """
+
+    def __init__(self, directory: str, compression: Optional[str] = None) -> None:
+        self.directory = directory
+        self.compression = compression
+        self.namespaces: dict[str, _DiskNamespace] = {}
+
+    def namespace(self, name: str) -> MutableMapping:
+        if name not in self.namespaces:
+            self.namespaces[name] = _DiskNamespace(
+                os.path.join(self.directory, name), self.compression
+            )
+        return self.namespaces[name]
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Minimal client for the Redis serialization protocol (RESP 2)"""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0):
+        self.lock = threading.Lock()
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if db:
+            self.execute(b"SELECT", str(db).encode())
+
+    def _pack(self, args) -> list:
+        chunks = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            arg = arg if isinstance(arg, (bytes, bytearray)) else str(arg).encode()
+            chunks.append(b"$%d\r\n" % len(arg))
+            chunks.append(arg)
+            chunks.append(b"\r\n")
+        return chunks
+
+    def _read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line:
+            raise RedisError("Connection closed by server")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest
+        if prefix == b"-":
+            raise RedisError(rest.decode())
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            size = int(rest)
+            if size == -1:
+                return None
+            # read into a bytearray so decoded arrays are writable views over it
+            data = bytearray(size)
+            self.reader.readinto(memoryview(data))
+            self.reader.read(2)
+            return data
+        if prefix == b"*":
+            size = int(rest)
+            if size == -1:
+                return None
+            return [self._read_reply() for _ in range(size)]
+        raise RedisError("Unexpected reply %r" % line)
+
+    def execute(self, *args) -> Any:
+        with self.lock:
+            self.sock.sendall(b"".join(self._pack(args)))
+            return self._read_reply()
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def _glob_escape(pattern: bytes) -> bytes:
+    """Escapes the characters Redis glob patterns give a meaning to"""
+    return re.sub(rb"([*?\[\]\\])", rb"\\\1", pattern)
+
+
+class _RedisNamespace(MutableMapping):
+    def __init__(
+        self,
+        connection: RedisConnection,
+        prefix: bytes,
+        compression: Optional[str] = None,
+        allow_pickle: bool = False,
+    ) -> None:
+        self.connection = connection
+        self.prefix = prefix
+        self.compression = compression
+        self.allow_pickle = allow_pickle
+        # matches the keys of the namespace, even if the prefix contains a `*`
+        self.pattern = _glob_escape(prefix) + b"*"
+
+    def _key(self, key: str) -> bytes:
+        return self.prefix + key.encode()
+
+    def __getitem__(self, key: str) -> Any:
+        data = self.connection.execute(b"GET", self._key(key))
+        if data is None:
+            raise KeyError(key)
+        return decode(data, allow_pickle=self.allow_pickle)
+
+    def __setitem__(self, key: str, value: Any):
+        self.connection.execute(b"SET", self._key(key), encode(value, self.compression))
+
+    def __delitem__(self, key: str):
+        if not self.connection.execute(b"DEL", self._key(key)):
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return bool(self.connection.execute(b"EXISTS", self._key(key)))
+
+    def _scan(self) -> Iterator[bytes]:
+        cursor = b"0"
+        while True:
+            cursor, keys = self.connection.execute(
+                b"SCAN", cursor, b"MATCH", self.pattern, b"COUNT", b"1000"
+            )
+            yield from keys
+            if bytes(cursor) == b"0":
+                return
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._scan():
+            yield bytes(key[len(self.prefix) :]).decode()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._scan())
+
+    def clear(self):
+        keys = list(self._scan())
+        if keys:
+            self.connection.execute(b"DEL", *keys)
+
+
+class RedisBackend(DaoBackend):
+    """
+    Stores values in a Redis (or Redis protocol compatible) server, so workers on
+    several hosts can share job results. Keys are prefixed with `key_prefix` and the
+    namespace, sets of small memory map to Redis sets.
+
+    Any client of the server can write values, so pickled values are only decoded
+    when they refer to flojoy, NumPy and builtin types (see `serialization`). Set
+    `allow_pickle` to decode any pickled value, when the server is trusted.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        key_prefix: str = "flojoy",
+        compression: Optional[str] = None,
+        allow_pickle: bool = False,
+    ) -> None:
+        self.connection = RedisConnection(host, port, db)
+        self.key_prefix = key_prefix
+        self.compression = compression
+        self.allow_pickle = allow_pickle
+        self.namespaces: dict[str, _RedisNamespace] = {}
+
+    def _prefix(self, namespace: str) -> bytes:
+        return ("%s:%s:" % (self.key_prefix, namespace)).encode()
+
+    def namespace(self, name: str) -> MutableMapping:
+        if name not in self.namespaces:
+            self.namespaces[name] = _RedisNamespace(
+                self.connection, self._prefix(name), self.compression, self.allow_pickle
+            )
+        return self.namespaces[name]
+
+    def get_set(self, namespace: str, key: str) -> Optional[set]:
+        members = self.connection.execute(
+            b"SMEMBERS", self._prefix(namespace) + key.encode()
+        )
+        if not members:
+            return None
+        return set(decode(member, allow_pickle=self.allow_pickle) for member in members)
+
+    def add_to_set(self, namespace: str, key: str, item: Any):
+        self.connection.execute(
+            b"SADD", self._prefix(namespace) + key.encode(), encode(item)
+        )
+
+    def remove_item_from_set(self, namespace: str, key: str, item: Any):
+        self.connection.execute(
+            b"SREM", self._prefix(namespace) + key.encode(), encode(item)
+        )
+
+    def close(self):
+        self.connection.close()
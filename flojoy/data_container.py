@@ -1,6 +1,9 @@
+import os
+import sys
+import threading
 import numpy as np
 from .box import Box
-from typing import Union, Any, cast
+from typing import Union, Any, Optional, cast
 
 # DCType = Literal[
 #     "grayscale",
@@ -25,6 +28,49 @@ from typing import Union, Any, cast
 
 class DCNpArrayType: 0
 
+
+def _is_dataframe(value) -> bool:
+    # pandas is optional, and a DataFrame can only exist once pandas is imported
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(value, pandas.DataFrame)
+
+
+class Lazy:
+    """
+    Deferred value of a DataContainer key, materialized the first time the key is
+    read. `source` is either a callable computing the value, or the path of a `.npy`
+    file which is then memory-mapped (copy-on-write) instead of loaded.
+
+    Usage
+    -----
+    dc = DataContainer(type="matrix", m=Lazy(lambda: expensive_matrix()))
+
+    dc = Matrix(m=Lazy("/data/frame.npy"))
+    """
+
+    def __init__(self, source) -> None:
+        if not callable(source) and not isinstance(source, (str, os.PathLike)):
+            raise ValueError("Lazy expects a callable or the path of a .npy file")
+        self.source = source
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value = None
+
+    def load(self):
+        with self.lock:
+            if not self.loaded:
+                if callable(self.source):
+                    self.value = self.source()
+                else:
+                    self.value = np.load(self.source, mmap_mode="c")
+                self.loaded = True
+                self.source = None
+            return self.value
+
+    def __repr__(self):
+        return "Lazy(%r)" % (self.value if self.loaded else self.source)
+
+
 class DataContainer(Box):
     """
     A class that processes various types of data and supports dot assignment
@@ -43,8 +89,32 @@ class DataContainer(Box):
 
     v.type = 'ordered_pair'
 
+    The typed subclasses (OrderedPair, Scalar, ...) keep their keys in `__slots__`
+    instead of a per-instance `__dict__`, which makes them cheaper to create and to
+    read. Keys outside of the slots of a class still work, they are stored in the
+    instance `__dict__` like on a plain `Box`.
+
+    A key can be given a `Lazy` value (or be set with `set_lazy`): it is computed or
+    loaded the first time it is read, through `__getitem__` or attribute access.
+    Listing the keys or measuring the result does not materialize it, `items`,
+    `values`, `to_dict` and serialization do.
     """
 
+    __slots__ = ("type", "extra")
+    # keys stored in slots, in the order they are listed by `to_dict`
+    _slot_fields: tuple = ("type", "extra")
+    # type of the typed subclasses and keys filled by `from_arrays`
+    _dc_type: str = ""
+    _array_fields: tuple = ()
+    # trailing slot keys `from_arrays` may be called without
+    _optional_fields: tuple = ()
+    # pending `Lazy` values by key, only set on the instances having some
+    _lazy: Optional[dict] = None
+    # only set on the instances `disable_validation` was called on
+    _skip_validation: bool = False
+    # instance attributes kept in `__dict__` which are not keys
+    _state_attrs: tuple = ("_lazy", "_skip_validation")
+
     # allowed_types = list(typing.get_args(DCType))
     allowed_keys = [
         "x",
@@ -91,6 +161,7 @@ class DataContainer(Box):
         "bytes": ["b"],
         "text_blob": ["text_blob"],
     }
+    optional_keys_map = {"image": ["a"]}
 
     SKIP_ARRAYIEFY_TYPES = [
         str,
@@ -98,16 +169,170 @@ class DataContainer(Box):
         np.ndarray,
     ]  # value types not to be arrayified
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        slots = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get("__slots__", ()):
+                if name.startswith("_") or name in ("type", "extra"):
+                    continue
+                if name not in slots:
+                    slots.append(name)
+        cls._slot_fields = ("type", *slots, "extra")
+        cls._array_fields = tuple(slots)
+
+    @classmethod
+    def from_arrays(cls, *arrays, copy: bool = False, extra=None):
+        """
+        Fast construction path for the typed subclasses, e.g.
+        `OrderedPair.from_arrays(x, y, copy=False)`.
+
+        The arrays are given in the order of the constructor arguments. Each one is
+        validated once and stored as is (or copied when `copy` is set), skipping the
+        per key arrayification of `__setitem__`. Anything `numpy.asarray` accepts,
+        including NumPy scalars and ndarray subclasses, can be passed.
+        """
+        # containers of scalars, bytes and text have no `_dc_type` as their keys are
+        # not arrays
+        fields = cls._array_fields
+        if not cls._dc_type or not (
+            len(fields) - len(cls._optional_fields) <= len(arrays) <= len(fields)
+        ):
+            raise TypeError(
+                "%s.from_arrays expects the arrays %s"
+                % (cls.__name__, ", ".join(fields))
+            )
+        dc = cls.__new__(cls)
+        dc.type = cls._dc_type
+        for key, value in zip(fields, arrays):
+            if copy:
+                value = np.array(value)
+            elif not isinstance(value, np.ndarray):
+                value = np.asarray(value)
+            if value.dtype.hasobject:
+                raise ValueError("DataContainer keys are of wrong type")
+            if not value.ndim:
+                value = value.reshape(1)
+            setattr(dc, key, value)
+        if len(arrays) < len(fields):
+            for key in fields[len(arrays) :]:
+                setattr(dc, key, None)
+        dc.extra = extra
+        # only the checks of `validate` which don't depend on the number of samples
+        keys = list(fields[: len(arrays)])
+        dc_type = cls._dc_type
+        if dc_type.startswith("parametric_"):
+            dc_type = dc_type[len("parametric_") :]
+            dc.__check_entries_per_t(dc_type, keys, len(dc.t))
+        dc.__check_array_shapes(dc_type, keys)
+        return dc
+
+    def _items(self, materialize: bool = True):
+        lazy = self._lazy
+        for key in self._slot_fields:
+            if lazy is not None and key in lazy:
+                continue
+            try:
+                yield key, getattr(self, key)
+            except AttributeError:  # slot never assigned
+                continue
+        if lazy is None and not self._skip_validation:
+            yield from self.__dict__.items()
+            return
+        for key, value in list(self.__dict__.items()):
+            if key not in self._state_attrs and (lazy is None or key not in lazy):
+                yield key, value
+        if lazy is None:
+            return
+        for key, value in list(lazy.items()):
+            yield key, (getattr(self, key) if materialize else value)
+
+    def set_lazy(self, key: str, source):
+        """Sets `key` to a `Lazy` value, see `Lazy` for the accepted sources"""
+        value = source if isinstance(source, Lazy) else Lazy(source)
+        if key in self._slot_fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                pass
+        else:
+            self.__dict__.pop(key, None)
+        if self._lazy is None:
+            self.__dict__["_lazy"] = {}
+        self._lazy[key] = value
+
+    def is_lazy(self, key: str) -> bool:
+        """Whether `key` holds a value that was not materialized yet"""
+        return self._lazy is not None and key in self._lazy
+
+    def __getattr__(self, name: str):
+        # only called when the attribute is not set: the key is missing or lazy
+        lazy = self._lazy
+        if lazy is None or name not in lazy:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+            )
+        value = lazy[name].load()
+        self[name] = value
+        lazy.pop(name, None)
+        if not lazy:
+            self.__dict__.pop("_lazy", None)
+        return getattr(self, name)
+
     def copy(self):
         # Create an instance of DataContainer class
         copied_instance = DataContainer()
-        instance_dict = self.__dict__
-        for k, v in instance_dict.items():
-            setattr(copied_instance, k, v)
+        for k, v in self._items(materialize=False):
+            if isinstance(v, Lazy):
+                copied_instance.set_lazy(k, v)
+            else:
+                setattr(copied_instance, k, v)
         return copied_instance
 
+    def keys(self):
+        return [k for k, _ in self._items(materialize=False)]
+
+    def items(self):
+        return list(self._items())
+
+    def values(self):
+        return [v for _, v in self._items()]
+
+    def get(self, key, default=None):
+        return self.__getitem__(key, True) if key in self else default
+
+    def to_dict(self):
+        result = {}
+        for key, value in self._items():
+            if isinstance(value, Box):
+                result[key] = value.to_dict()
+            elif isinstance(value, list):
+                result[key] = [
+                    (v.to_dict() if isinstance(v, Box) else v) for v in value
+                ]
+            else:
+                result[key] = value
+        return result
+
+    def __contains__(self, key) -> bool:
+        if self._lazy is not None and key in self._lazy:
+            return True
+        if key in self._slot_fields:
+            return hasattr(self, key)
+        return key in self.__dict__ and key not in self._state_attrs
+
+    def __repr__(self):
+        return str(dict(self._items(materialize=False)))
+
     def _ndarrayify(self, value):
-        if isinstance(value, int) or isinstance(value, float):
+        if isinstance(value, np.ndarray):
+            # subclasses of ndarray (memmap, masked arrays, ...) are kept as they are
+            return value
+        elif (
+            isinstance(value, int)
+            or isinstance(value, float)
+            or isinstance(value, np.generic)
+        ):
             return np.array([value])
         elif isinstance(value, dict):
             arrayified_value = {}
@@ -123,6 +348,8 @@ class DataContainer(Box):
             return np.array(value)
         elif value is None:
             return value
+        elif _is_dataframe(value):
+            return value
         else:
             raise ValueError("DataContainer keys are of wrong type")
 
@@ -133,21 +360,115 @@ class DataContainer(Box):
         for k, v in kwargs.items():
             self[k] = v
 
-    def __getattribute__(self, __name: str) -> Any:
-        return super().__getattribute__(__name)
-
     def __getitem__(self, key: str, _ignore_default: bool = False) -> Any:
+        if key in self._slot_fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                if _ignore_default:
+                    return None
+                raise KeyError(key)
+        if self._lazy is not None and key in self._lazy:
+            return getattr(self, key)
         return super().__getitem__(key, _ignore_default)  # type:ignore
 
     def __setitem__(self, key: str, value) -> None:
+        if type(value) is Lazy:
+            self.set_lazy(key, value)
+            return
+        if self._lazy is not None:
+            # a value set over a pending lazy one replaces it
+            self._lazy.pop(key, None)
         if (
             key not in ["type", "extra", "c"]
             and type(value) not in self.SKIP_ARRAYIEFY_TYPES
         ):
-            formatted_value = self._ndarrayify(value)
-            super().__setitem__(key, formatted_value)  # type:ignore
+            setattr(self, key, self._ndarrayify(value))
         else:
-            super().__setitem__(key, value)  # type: ignore
+            setattr(self, key, value)
+
+    def disable_validation(self):
+        """Makes `validate` a no-op for this container"""
+        self.__dict__["_skip_validation"] = True
+
+    def enable_validation(self):
+        self.__dict__.pop("_skip_validation", None)
+
+    def validate(self):
+        """
+        Checks the keys of the container against its type: required and allowed keys,
+        ascending `t` for parametric types, matching lengths of `x`/`y`/`z` (and `t`
+        for parametric types) and matching shapes of the image channels.
+
+        The checks on array values are NumPy operations, their cost does not grow
+        with the number of Python objects. Keys set to `None` (e.g. a missing alpha
+        channel or `extra`) count as absent. Lazy keys are only checked for presence,
+        checking their values would materialize them.
+        """
+        if self._skip_validation:
+            return
+        keys = [
+            k
+            for k, v in self._items(materialize=False)
+            if k != "type" and v is not None
+        ]
+        for key in keys:
+            if key not in self.allowed_keys:
+                raise ValueError(
+                    self.__build_error_text(key, self.type, self.allowed_keys)
+                )
+            self.__check_combination(key, keys, self.combinations[key] + [key])
+        dc_type = self.type
+        if dc_type.startswith("parametric_"):
+            if "t" not in keys:
+                raise KeyError('t key must be provided for "%s"' % dc_type)
+            dc_type = dc_type[len("parametric_") :]
+            if not self.is_lazy("t"):
+                self.__check_t(dc_type, keys)
+        if dc_type not in self.type_keys_map:
+            # free form containers (e.g. plotly figures) have no required keys
+            return
+        self.__check_for_missing_keys(dc_type, keys)
+        self.__check_array_shapes(dc_type, keys)
+
+    def __check_t(self, dc_type: str, keys: list):
+        t = np.asarray(self["t"])
+        if t.ndim != 1:
+            raise ValueError("t key must be a 1-D array")
+        if t.size > 1 and not np.all(t[1:] >= t[:-1]):
+            raise ValueError("t key must be in ascending order")
+        self.__check_entries_per_t(dc_type, keys, len(t))
+
+    def __check_entries_per_t(self, dc_type: str, keys: list, length: int):
+        # parametric data is stacked along its first axis, one entry per `t`
+        for key in self.type_keys_map.get(dc_type, ()):
+            if key not in keys or self.is_lazy(key):
+                continue
+            if np.shape(self[key])[:1] not in ((length,), ()):
+                raise ValueError(
+                    '"%s" key must have %d entries along its first axis, one '
+                    "per t value" % (key, length)
+                )
+
+    def __check_array_shapes(self, dc_type: str, keys: list):
+        if dc_type in ("ordered_pair", "ordered_triple"):
+            self.__check_shapes(dc_type, keys, ["x", "y", "z"], lambda s: s[-1:])
+        elif dc_type == "image":
+            self.__check_shapes(dc_type, keys, ["r", "g", "b", "a"], lambda s: s)
+
+    def __check_shapes(self, dc_type: str, keys: list, fields: list, dims):
+        expected = None
+        for key in fields:
+            if key not in keys or self.is_lazy(key):
+                continue
+            shape = dims(np.shape(self[key]))
+            if expected is None:
+                expected = (key, shape)
+            elif shape != expected[1]:
+                raise ValueError(
+                    '"%s" and "%s" keys of "%s" type must have matching shapes, '
+                    "got %s and %s" % (expected[0], key, dc_type, expected[1], shape)
+                )
 
     def __check_combination(self, key: str, keys: list, allowed_keys: list):
         for i in keys:
@@ -158,30 +479,42 @@ class DataContainer(Box):
                 )
 
     def __check_for_missing_keys(self, dc_type, keys: list):
-        if dc_type.startswith("parametric_"):
-            if "t" not in keys:
-                raise KeyError('t key must be provided for "%s"' % dc_type)
-            t = self["t"]
-            is_ascending_order = all(t[i] <= t[i + 1] for i in range(len(t) - 1))
-            if is_ascending_order is not True:
-                raise ValueError("t key must be in ascending order")
-            splitted_type = dc_type.split("parametric_")[1]
-            self.__check_for_missing_keys(splitted_type, keys)
-        else:
-            for k in self.type_keys_map[dc_type]:
-                if k not in keys:
-                    raise KeyError(
-                        '"%s" key must be provided for type "%s"' % (k, dc_type)
-                    )
+        for k in self.type_keys_map[dc_type]:
+            if k not in keys and k not in self.optional_keys_map.get(dc_type, ()):
+                raise KeyError('"%s" key must be provided for type "%s"' % (k, dc_type))
 
     def __build_error_text(self, key: str, data_type: str, available_keys: list):
-        return (
-            'Invalid key "%s" provided for data type "%s", ' % (key, data_type)
-            + 'supported keys: {", ".join(available_keys)}'
-        )
+        return 'Invalid key "%s" provided for data type "%s", ' % (
+            key,
+            data_type,
+        ) + "supported keys: %s" % ", ".join(available_keys)
+
+
+def replace_fields(dc: DataContainer, fields: dict) -> DataContainer:
+    """
+    New container of the type of `dc` holding its keys, with the values of `fields`
+    replacing (or added to) them. Neither container is validated, and the keys of
+    `dc` which are not replaced are shared as they are: `Lazy` ones are not
+    materialized.
+    """
+    container = type(dc).__new__(type(dc))
+    for key, value in dc._items(materialize=False):
+        if key in fields:
+            value = fields[key]
+        if isinstance(value, Lazy):
+            container.set_lazy(key, value)
+        else:
+            setattr(container, key, value)
+    for key, value in fields.items():
+        if key not in container:
+            setattr(container, key, value)
+    return container
 
 
 class OrderedPair(DataContainer):
+    __slots__ = ("x", "y")
+    _dc_type = "ordered_pair"
+
     def __init__(  # type:ignore
         self, x, y, extra = None
     ):
@@ -189,6 +522,9 @@ class OrderedPair(DataContainer):
 
 
 class ParametricOrderedPair(DataContainer):
+    __slots__ = ("x", "y", "t")
+    _dc_type = "parametric_ordered_pair"
+
     def __init__(  # type:ignore
         self,
         x,
@@ -200,6 +536,9 @@ class ParametricOrderedPair(DataContainer):
 
 
 class OrderedTriple(DataContainer):
+    __slots__ = ("x", "y", "z")
+    _dc_type = "ordered_triple"
+
     def __init__(  # type:ignore
         self,
         x,
@@ -211,6 +550,9 @@ class OrderedTriple(DataContainer):
 
 
 class ParametricOrderedTriple(DataContainer):
+    __slots__ = ("x", "y", "z", "t")
+    _dc_type = "parametric_ordered_triple"
+
     def __init__(  # type:ignore
         self,
         x,
@@ -225,6 +567,9 @@ class ParametricOrderedTriple(DataContainer):
 
 
 class Surface(DataContainer):
+    __slots__ = ("x", "y", "z")
+    _dc_type = "surface"
+
     def __init__(  # type:ignore
         self,
         x,
@@ -236,6 +581,9 @@ class Surface(DataContainer):
 
 
 class ParametricSurface(DataContainer):
+    __slots__ = ("x", "y", "z", "t")
+    _dc_type = "parametric_surface"
+
     def __init__(  # type:ignore
         self,
         x,
@@ -248,21 +596,34 @@ class ParametricSurface(DataContainer):
 
 
 class Scalar(DataContainer):
+    __slots__ = ("c",)
+
     def __init__(self, c: int | float, extra = None):  # type:ignore
-        super().__init__(type="scalar", c=c, extra=extra)
+        # none of the keys is arrayified, so skip `__setitem__`
+        self.type = "scalar"
+        self.c = c
+        self.extra = extra
 
 
 class ParametricScalar(DataContainer):
+    __slots__ = ("c", "t")
+
     def __init__(self, c, t, extra = None):  # type: ignore
         super().__init__(type="parametric_scalar", c=c, t=t, extra=extra)
 
 
 class Vector(DataContainer):
+    __slots__ = ("v",)
+    _dc_type = "vector"
+
     def __init__(self, v, extra = None):  # type:ignore
         super().__init__(type="vector", v=v, extra=extra)
 
 
 class ParametricVector(DataContainer):
+    __slots__ = ("v", "t")
+    _dc_type = "parametric_vector"
+
     def __init__(  # type: ignore
         self, v, t, extra = None
     ):
@@ -270,11 +631,17 @@ class ParametricVector(DataContainer):
 
 
 class Matrix(DataContainer):
+    __slots__ = ("m",)
+    _dc_type = "matrix"
+
     def __init__(self, m, extra = None):  # type:ignore
         super().__init__(type="matrix", m=m, extra=extra)
 
 
 class ParametricMatrix(DataContainer):
+    __slots__ = ("m", "t")
+    _dc_type = "parametric_matrix"
+
     def __init__(  # type: ignore
         self, m, t, extra = None
     ):
@@ -282,6 +649,10 @@ class ParametricMatrix(DataContainer):
 
 
 class Image(DataContainer):
+    __slots__ = ("r", "g", "b", "a")
+    _dc_type = "image"
+    _optional_fields = ("a",)
+
     def __init__(  # type:ignore
         self,
         r,
@@ -294,19 +665,28 @@ class Image(DataContainer):
 
 
 class Bytes(DataContainer):
+    __slots__ = ("b",)
+
     def __init__(
         self,
         b: bytes,
     ):
-        super().__init__(type="bytes", b=b)
+        self.type = "bytes"
+        self.b = b
 
 
 class TextBlob(DataContainer):
+    __slots__ = ("text_blob",)
+
     def __init__(self, text_blob: str):
-        super().__init__(type="text_blob", text_blob=text_blob)
+        self.type = "text_blob"
+        self.text_blob = text_blob
 
 
 class ParametricImage(DataContainer):
+    __slots__ = ("r", "g", "b", "a", "t")
+    _dc_type = "parametric_image"
+
     def __init__(  # type:ignore
         self,
         r,
@@ -320,11 +700,17 @@ class ParametricImage(DataContainer):
 
 
 class Grayscale(DataContainer):
+    __slots__ = ("m",)
+    _dc_type = "grayscale"
+
     def __init__(self, img, extra = None):  # type:ignore
         super().__init__(type="grayscale", m=img, extra=extra)
 
 
 class ParametricGrayscale(DataContainer):
+    __slots__ = ("m", "t")
+    _dc_type = "parametric_grayscale"
+
     def __init__(  # type:ignore
         self, img, t, extra = None
     ):
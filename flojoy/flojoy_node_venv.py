@@ -0,0 +1,443 @@
+"""
+Runs a node in an isolated virtual environment with its own pip dependencies.
+
+```
+@flojoy
+@run_in_venv(pip_dependencies=["jax[cpu]==0.4.13"])
+def JAX_NODE(default: OrderedPair) -> OrderedPair:
+    import jax.numpy as jnp
+    return OrderedPair(x=default.x, y=np.asarray(jnp.sin(default.y)))
+```
+
+Virtual environments are created once in a cache directory, keyed by a hash of their
+dependencies (and of the Python version), and reused by every node with the same
+dependencies, across runs.
+
+Each environment gets a pool of long-lived worker interpreters, started on demand up to
+`max_workers`. A worker imports flojoy once, then runs the calls it receives over its
+stdin/stdout, so a call costs one round trip instead of starting an interpreter and
+importing the dependencies again. The function is sent to a worker once (pickled by
+value with `cloudpickle`). Arguments and results are pickled with protocol 5 and their
+array buffers are written to the pipe out-of-band, without being copied into the
+pickle. Workers run with the `sys.path` of the environment: the packages installed in
+the environment take precedence, NumPy included, and only the modules it doesn't have
+(flojoy itself, `cloudpickle`, ...) are looked up in the parent environment.
+Environments are created under a file lock, so processes starting at the same time
+don't build the same environment twice.
+
+`cloudpickle` is an optional dependency, install `flojoy[venv]` to use `run_in_venv`.
+"""
+
+import atexit
+import contextlib
+import functools
+import hashlib
+import importlib.machinery
+import json
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+import venv
+from typing import Any, Callable, Optional
+
+__all__ = ["run_in_venv"]
+
+_PARENT_SYS_PATH_ENV = "FLOJOY_VENV_PARENT_SYS_PATH"
+_READY_MARKER = ".flojoy_venv_ready"
+
+# pickle size and number of out-of-band buffers, followed by the size of each buffer
+_FRAME = struct.Struct("<QI")
+
+# run by the interpreter of the environment: imports this module from the parent's
+# `sys.path`, then hands over to `_worker_main` with the environment's own `sys.path`
+_BOOTSTRAP = """
+import json, os, sys
+venv_sys_path = [path for path in sys.path if path]
+parent_sys_path = json.loads(os.environ["%s"])
+sys.path[:0] = parent_sys_path
+from flojoy.flojoy_node_venv import _worker_main
+_worker_main(venv_sys_path, parent_sys_path)
+""" % (_PARENT_SYS_PATH_ENV)
+
+
+class VenvWorkerError(Exception):
+    """A virtual environment could not be created or one of its workers failed"""
+
+
+def _get_venv_cache_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "flojoy_node_venv")
+
+
+def _venv_hash(pip_dependencies: list[str]) -> str:
+    key = "%s\n%s" % (sys.version, "\n".join(sorted(pip_dependencies)))
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _venv_python(venv_dir: str) -> str:
+    if os.name == "nt":
+        return os.path.join(venv_dir, "Scripts", "python.exe")
+    return os.path.join(venv_dir, "bin", "python")
+
+
+def _send(stream, message: Any, dumps: Callable = pickle.dumps):
+    buffers: list = []
+    data = dumps(message, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    stream.write(
+        _FRAME.pack(len(data), len(raws))
+        + struct.pack("<%dQ" % len(raws), *(raw.nbytes for raw in raws))
+    )
+    stream.write(data)
+    for raw in raws:
+        stream.write(raw)
+    stream.flush()
+
+
+def _read_exact(stream, nbytes: int) -> bytearray:
+    buffer = bytearray(nbytes)
+    view = memoryview(buffer)
+    read = 0
+    while read < nbytes:
+        count = stream.readinto(view[read:])
+        if not count:
+            raise EOFError("Stream closed after %d of %d bytes" % (read, nbytes))
+        read += count
+    return buffer
+
+
+def _receive(stream, loads: Callable = pickle.loads) -> Any:
+    size, count = _FRAME.unpack(_read_exact(stream, _FRAME.size))
+    sizes = struct.unpack("<%dQ" % count, _read_exact(stream, 8 * count))
+    data = _read_exact(stream, size)
+    # arrays are rebuilt as views over the received buffers
+    return loads(data, buffers=[_read_exact(stream, nbytes) for nbytes in sizes])
+
+
+class _ParentFinder:
+    """
+    Last entry of `sys.meta_path` in workers: finds the top level modules missing
+    from the environment on the `sys.path` of the parent
+    """
+
+    def __init__(self, paths: list[str]) -> None:
+        self.paths = paths
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        if path is not None:
+            # submodules are found on the `__path__` of their package
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname, self.paths)
+
+
+def _alias_numpy_core():
+    """
+    NumPy 2 moved `numpy.core` to `numpy._core`, where the arrays it pickles refer
+    to: NumPy 1 workers alias the new names so they can unpickle them
+    """
+    try:
+        import numpy
+    except ImportError:
+        return
+    if int(numpy.__version__.split(".")[0]) >= 2:
+        return
+    import numpy.core.multiarray
+    import numpy.core.numeric
+
+    for name in ("multiarray", "numeric"):
+        sys.modules.setdefault("numpy._core." + name, getattr(numpy.core, name))
+
+
+def _worker_main(venv_sys_path: list[str], parent_sys_path: list[str]):
+    """Loop of a worker interpreter, see `_BOOTSTRAP`"""
+    # only flojoy and this module were imported from the parent so far, everything
+    # else (NumPy, when arguments are unpickled) comes from the environment first
+    sys.path[:] = venv_sys_path
+    sys.meta_path.append(_ParentFinder(parent_sys_path))
+    _alias_numpy_core()
+    import cloudpickle
+
+    # the protocol owns the original stdin and stdout, prints of the nodes go to
+    # stderr instead
+    requests = os.fdopen(os.dup(0), "rb")
+    responses = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+
+    functions: dict[str, Callable] = {}
+    while True:
+        try:
+            _, key, payload, args, kwargs = _receive(requests, cloudpickle.loads)
+        except EOFError:
+            return
+        try:
+            if payload is not None:
+                functions[key] = cloudpickle.loads(payload)
+            response = ("ok", functions[key](*args, **kwargs))
+            _send(responses, response, cloudpickle.dumps)
+            continue
+        except Exception as e:
+            error = e
+        details = traceback.format_exc()
+        try:
+            exception = cloudpickle.dumps(error)
+        except Exception:
+            exception = None
+        _send(responses, ("error", exception, details), cloudpickle.dumps)
+
+
+class _Worker:
+    """A worker interpreter of a virtual environment"""
+
+    def __init__(self, python: str) -> None:
+        parent_sys_path = [os.path.abspath(path or os.curdir) for path in sys.path]
+        env = dict(os.environ)
+        env[_PARENT_SYS_PATH_ENV] = json.dumps(parent_sys_path)
+        self.process = subprocess.Popen(
+            [python, "-c", _BOOTSTRAP],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        # keys of the functions the worker already received
+        self.functions: set[str] = set()
+        self.broken = False
+
+    def call(self, key: str, payload: bytes, args: tuple, kwargs: dict) -> Any:
+        import cloudpickle
+
+        message = (
+            "call",
+            key,
+            None if key in self.functions else payload,
+            args,
+            kwargs,
+        )
+        try:
+            _send(self.process.stdin, message, cloudpickle.dumps)
+            self.functions.add(key)
+            response = _receive(self.process.stdout, cloudpickle.loads)
+        except (EOFError, BrokenPipeError):
+            self.broken = True
+            raise VenvWorkerError(
+                "Virtual environment worker exited with code %s" % self.process.wait()
+            )
+        if response[0] == "ok":
+            return response[1]
+        _, exception, details = response
+        remote = VenvWorkerError("Raised in the virtual environment:\n%s" % details)
+        try:
+            error = cloudpickle.loads(exception) if exception is not None else None
+        except Exception:
+            # e.g. an exception class only installed in the virtual environment
+            error = None
+        if error is None:
+            raise remote
+        raise error from remote
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+class _WorkerPool:
+    """Workers of one virtual environment, started on demand up to `max_workers`"""
+
+    def __init__(self, python: str, max_workers: int) -> None:
+        self.python = python
+        self.max_workers = max_workers
+        self.idle: list[_Worker] = []
+        self.count = 0
+        self.condition = threading.Condition()
+
+    def acquire(self) -> _Worker:
+        with self.condition:
+            while not self.idle and self.count >= self.max_workers:
+                self.condition.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.count += 1
+        try:
+            return _Worker(self.python)
+        except BaseException:
+            with self.condition:
+                self.count -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, worker: _Worker):
+        with self.condition:
+            if worker.broken:
+                self.count -= 1
+            else:
+                self.idle.append(worker)
+            self.condition.notify()
+        if worker.broken:
+            worker.close()
+
+    def close(self):
+        with self.condition:
+            workers, self.idle = self.idle, []
+            self.count -= len(workers)
+        for worker in workers:
+            worker.close()
+
+
+_lock = threading.Lock()
+_venv_locks: dict[str, threading.Lock] = {}
+_pools: dict[str, _WorkerPool] = {}
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path` across processes, held until the block exits"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            # `LK_LOCK` gives up after 10 seconds, creating an environment takes longer
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _create_venv(venv_dir: str, pip_dependencies: list[str], verbose: bool):
+    venv.EnvBuilder(clear=True, with_pip=True, symlinks=os.name != "nt").create(
+        venv_dir
+    )
+    if pip_dependencies:
+        command = [_venv_python(venv_dir), "-m", "pip", "install"]
+        command += ["--disable-pip-version-check", *pip_dependencies]
+        process = subprocess.run(command, capture_output=not verbose, text=True)
+        if process.returncode != 0:
+            raise VenvWorkerError(
+                "Failed to install %s in %s:\n%s"
+                % (pip_dependencies, venv_dir, process.stderr or "")
+            )
+    # only complete environments are reused
+    open(os.path.join(venv_dir, _READY_MARKER), "w").close()
+
+
+def _get_pool(
+    pip_dependencies: list[str], verbose: bool, max_workers: Optional[int]
+) -> _WorkerPool:
+    venv_dir = os.path.join(_get_venv_cache_dir(), _venv_hash(pip_dependencies))
+    ready = os.path.exists(os.path.join(venv_dir, _READY_MARKER))
+    with _lock:
+        pool = _pools.get(venv_dir)
+        if pool is not None and ready:
+            return pool
+        venv_lock = _venv_locks.setdefault(venv_dir, threading.Lock())
+    with venv_lock:
+        if not os.path.exists(os.path.join(venv_dir, _READY_MARKER)):
+            # the environment was never created, or deleted under running workers
+            with _lock:
+                stale = _pools.pop(venv_dir, None)
+            if stale is not None:
+                stale.close()
+            os.makedirs(os.path.dirname(venv_dir), exist_ok=True)
+            # other processes may be creating the same environment
+            with _file_lock(venv_dir + ".lock"):
+                if not os.path.exists(os.path.join(venv_dir, _READY_MARKER)):
+                    _create_venv(venv_dir, pip_dependencies, verbose)
+        with _lock:
+            if venv_dir not in _pools:
+                _pools[venv_dir] = _WorkerPool(
+                    _venv_python(venv_dir), max_workers or min(os.cpu_count() or 1, 4)
+                )
+            return _pools[venv_dir]
+
+
+def _dump_function(func: Callable) -> bytes:
+    import cloudpickle
+
+    # the module defining the node is usually not importable from the environment,
+    # so what the function refers to in it is sent by value as well
+    module = sys.modules.get(func.__module__)
+    by_value = (
+        module is not None
+        and func.__module__ != "__main__"
+        and func.__module__.split(".")[0] != "flojoy"
+        and func.__module__ not in cloudpickle.list_registry_pickle_by_value()
+    )
+    with _lock:
+        if by_value:
+            cloudpickle.register_pickle_by_value(module)
+        try:
+            return cloudpickle.dumps(func, protocol=5)
+        finally:
+            if by_value:
+                cloudpickle.unregister_pickle_by_value(module)
+
+
+def run_in_venv(
+    pip_dependencies: Optional[list[str]] = None,
+    verbose: bool = False,
+    max_workers: Optional[int] = None,
+):
+    """
+    Decorator running a function in a virtual environment with the given pip
+    dependencies installed, see the module documentation. `verbose` shows the output
+    of pip, `max_workers` bounds the number of worker interpreters of the environment
+    (4 or the number of CPUs, by default).
+    """
+    dependencies = list(pip_dependencies or [])
+
+    def decorator(func: Callable):
+        try:
+            import cloudpickle  # noqa: F401
+        except ImportError:
+            raise ValueError(
+                "run_in_venv needs the cloudpickle package, install flojoy[venv]"
+            )
+        dumped: list = []
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            pool = _get_pool(dependencies, verbose, max_workers)
+            if not dumped:
+                payload = _dump_function(func)
+                dumped[:] = [payload, hashlib.sha256(payload).hexdigest()]
+            payload, key = dumped
+            worker = pool.acquire()
+            try:
+                return worker.call(key, payload, args, kwargs)
+            finally:
+                pool.release(worker)
+
+        return wrapper
+
+    return decorator
+
+
+@atexit.register
+def _close_pools():
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -1,12 +1,32 @@
-from flojoy.node_init import NodeInitService
+import copy
+import functools
+import inspect
 from typing import Callable, Any, Optional
 from .job_result_utils import get_dc_from_result
-from .config import logger
-from .parameter_types import format_param_value
+from .data_container import DataContainer
+from .streaming import DataStream
+from .config import FlojoyConfig
+from .log import get_logger
+from .parameter_types import _unshared, parse_ctrl_value
+from .dao import Dao
 from .job_service import JobService
+from .result_cache import ResultCache
+from .batching import stack_args, unstack_container
+from .instrumentation import (
+    CACHE_LOOKUP,
+    CALL,
+    FETCH_INPUTS,
+    INJECT_INIT_CONTAINER,
+    PARSE_CTRLS,
+    POST_RESULT,
+    NodeSpan,
+    node_span,
+)
 
 __all__ = ["flojoy", "DefaultParams"]
 
+log = get_logger(__name__)
+
 
 def fetch_inputs(previous_jobs: list):
     """
@@ -22,25 +42,37 @@ def fetch_inputs(previous_jobs: list):
     -------
     inputs : list of DataContainer objects
     """
+    return _fetch_inputs(_input_edges(previous_jobs))
+
+
+def _input_edges(previous_jobs: list) -> list[tuple[str, str, bool, str]]:
+    """`(job_id, input_name, multiple, edge)` of each previous job"""
+    return [
+        (
+            prev_job.get("job_id"),
+            prev_job.get("input_name", ""),
+            prev_job.get("multiple", False),
+            prev_job.get("edge", ""),
+        )
+        for prev_job in previous_jobs
+    ]
+
+
+def _fetch_inputs(edges: list[tuple[str, str, bool, str]]):
     dict_inputs = dict()
 
     try:
-        for prev_job in previous_jobs:
-            prev_job_id = prev_job.get("job_id")
-            input_name = prev_job.get("input_name", "")
-            multiple = prev_job.get("multiple", False)
-            edge = prev_job.get("edge", "")
-
-            logger(
-                "fetching input from prev job id:",
+        for prev_job_id, input_name, multiple, edge in edges:
+            log.debug(
+                "fetching input from prev job id: %s for input: %s edge: %s",
                 prev_job_id,
-                " for input:",
                 input_name,
-                "edge: ",
                 edge,
             )
 
             job_result = JobService().get_job_result(prev_job_id)
+            # frees the result once every registered consumer fetched it
+            JobService().release_job_result(prev_job_id)
             if not job_result:
                 raise ValueError(
                     "Tried to get job result from %s but it was None" % prev_job_id
@@ -52,7 +84,7 @@ def fetch_inputs(previous_jobs: list):
                 else get_dc_from_result(job_result)
             )
             if result is not None:
-                logger("got job result from %s" % prev_job_id)
+                log.debug("got job result from %s", prev_job_id)
                 if multiple:
                     if input_name not in dict_inputs:
                         dict_inputs[input_name] = [result]
@@ -62,7 +94,7 @@ def fetch_inputs(previous_jobs: list):
                     dict_inputs[input_name] = result
 
     except Exception as e:
-        logger("error occured while fetching inputs", e)
+        log.warning("error occured while fetching inputs: %s", e)
 
     return dict_inputs
 
@@ -77,12 +109,223 @@ class DefaultParams:
         self.node_type = node_type
 
 
+class CallPlan:
+    """
+    A node invocation resolved once, so that it can be executed many times (e.g. by
+    the jobs of a loop): the ctrls are parsed and filtered by `function_parameters`,
+    the edges of the previous jobs are unpacked and the `DefaultParams` are built.
+    Executing the plan only fetches the inputs and the init container, calls the node
+    and posts its result.
+
+    Plans are returned by `wrapper.compile(...)`, which takes the arguments of the
+    wrapper, and are called without arguments. `JobsetExecutor` compiles every job
+    once and executes its plan in each run, until the ctrls or edges of the job
+    change (see `compiled_from`).
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        node_id: str,
+        job_id: str,
+        jobset_id: str,
+        previous_jobs: list,
+        function_parameters: set,
+        ctrls: Optional[dict],
+        inject_node_metadata: bool,
+        span: Optional[NodeSpan] = None,
+        runner: Optional[Callable] = None,
+    ) -> None:
+        self.func = func
+        self.name = func.__name__
+        self.node_id = node_id
+        self.job_id = job_id
+        self.jobset_id = jobset_id
+        # copy of what the plan was compiled from, compared by `compiled_from`: the
+        # ctrls of a job may be edited in place between runs
+        self.sources = (
+            copy.deepcopy((previous_jobs, function_parameters, ctrls))
+            if runner is not None
+            else None
+        )
+        self.runner = runner
+
+        log.debug("previous jobs: %s", previous_jobs)
+        # Get command parameters set by the user through the control panel
+        if span is not None:
+            span.begin(PARSE_CTRLS)
+        func_params = {}
+        if ctrls is not None:
+            for _, input in ctrls.items():
+                param = input["param"]
+                value = input["value"]
+                func_params[param] = parse_ctrl_value(node_id, value, input["type"])
+        func_params["type"] = "default"
+        self.params = {
+            param: value
+            for param, value in func_params.items()
+            if param in function_parameters
+        }
+        # lists are copied for each call, so that a node changing them doesn't
+        # change the plan
+        self.copied_params = [
+            param
+            for param, value in self.params.items()
+            if _unshared(value) is not value
+        ]
+        self.edges = _input_edges(previous_jobs)
+        self.default_params = (
+            DefaultParams(
+                job_id=job_id,
+                node_id=node_id,
+                jobset_id=jobset_id,
+                node_type="default",
+            )
+            if inject_node_metadata
+            else None
+        )
+
+    def compiled_from(
+        self,
+        func: Callable,
+        node_id: str,
+        jobset_id: str,
+        previous_jobs: list,
+        function_parameters: set,
+        ctrls: Optional[dict],
+    ) -> bool:
+        """Whether the plan was compiled from the same node, edges and ctrls"""
+        return (
+            getattr(func, "__wrapped__", func) is self.func
+            and node_id == self.node_id
+            and jobset_id == self.jobset_id
+            and self.sources == (previous_jobs, function_parameters, ctrls)
+        )
+
+    def build_args(self, span: Optional[NodeSpan] = None) -> dict[str, Any]:
+        """
+        Builds the keyword arguments the node function is called with: the results
+        of the previous jobs, the parameters set through the control panel, the node
+        metadata and the init container of the node. Each step is recorded as a phase
+        of `span`.
+        """
+        log.debug(
+            "executing node_id: %s previous_jobs: %s",
+            self.node_id,
+            self.edges,
+            extra={"node_id": self.node_id, "job_id": self.job_id},
+        )
+        if span is not None:
+            span.begin(FETCH_INPUTS)
+        dict_inputs = _fetch_inputs(self.edges)
+        if span is not None:
+            span.end()
+            span.set_input_nbytes(dict_inputs)
+
+        # constructing the inputs
+        log.debug("constructing inputs for %s", self.name)
+        args = dict_inputs
+
+        args.update(self.params)
+        for param in self.copied_params:
+            args[param] = _unshared(args[param])
+        if self.default_params is not None:
+            args["default_params"] = self.default_params
+
+        log.debug("%s params: %s", self.node_id, args.keys())
+
+        # check if node has an init container and if so, inject it
+        if span is not None:
+            span.begin(INJECT_INIT_CONTAINER)
+        # looked up on every call, the init function of the node may run again
+        dao = Dao.get_instance()
+        if dao.has_init_container(self.node_id):
+            args["init_container"] = dao.get_init_container(self.node_id)
+
+        return args
+
+    def __call__(self):
+        if self.runner is None:
+            raise ValueError("%s: only plain nodes can be compiled" % self.name)
+        return self.runner(self, node_span(self.node_id, self.job_id, self.name))
+
+
+def build_node_args(
+    func: Callable,
+    node_id: str,
+    job_id: str,
+    jobset_id: str,
+    previous_jobs: list,
+    function_parameters: set,
+    ctrls: Optional[dict],
+    inject_node_metadata: bool,
+    span: Optional[NodeSpan] = None,
+) -> dict[str, Any]:
+    """Keyword arguments of a single call of a node, see `CallPlan.build_args`"""
+    return CallPlan(
+        func,
+        node_id,
+        job_id,
+        jobset_id,
+        previous_jobs,
+        function_parameters,
+        ctrls,
+        inject_node_metadata,
+        span,
+    ).build_args(span)
+
+
+def lookup_cached_result(func: Callable, args: dict, span: Optional[NodeSpan]):
+    """Returns the cache key of the call and the cached result, if any"""
+    if span is not None:
+        span.begin(CACHE_LOOKUP)
+    result_cache = ResultCache.get_instance()
+    key = result_cache.key(func, args)
+    return key, (result_cache.get(key) if key is not None else None)
+
+
+def finish_node(span: Optional[NodeSpan], job_id: str, dc_obj):
+    """Posts the result of a node, recording it as the last phase of `span`"""
+    if span is None:
+        return post_node_result(job_id, dc_obj)
+    span.begin(POST_RESULT)
+    post_node_result(job_id, dc_obj)
+    span.end()
+    span.set_output_nbytes(dc_obj)
+    span.finish()
+    return dc_obj
+
+
+def post_node_result(job_id: str, dc_obj):
+    if FlojoyConfig.get_instance().validate_results:
+        # some special nodes like LOOP return dict instead of `DataContainer`
+        if isinstance(dc_obj, DataContainer):
+            dc_obj.validate()  # Validate returned DataContainer object
+        elif isinstance(dc_obj, dict):
+            for value in dc_obj.values():
+                if isinstance(value, DataContainer):
+                    value.validate()
+    JobService().post_job_result(
+        job_id, dc_obj
+    )  # post result to the job service before sending result to socket
+    if FlojoyConfig.get_instance().preview_results:
+        JobService().get_job_preview(job_id)
+    return dc_obj
+
+
+def streaming_function(func: Callable) -> bool:
+    return inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+
+
 def flojoy(
     original_function = None,
     *,
     node_type: Optional[str] = None,
     deps = None,
     inject_node_metadata: bool = False,
+    cache: bool = False,
+    prefetch: int = 0,
+    batch: bool = False,
 ):
     """
     Decorator to turn Python functions with numerical return
@@ -98,11 +341,25 @@ def flojoy(
     Parameters
     ----------
     `func`: Python function that returns DataContainer object
+    `cache`: reuse the result of a previous call with the same inputs and parameters
+    instead of calling `func` again, see `result_cache`. Only for nodes whose result
+    depends on nothing else.
+    `prefetch`: for generator nodes, number of chunks produced ahead of the consumer
+    in a background thread, see `streaming`.
+    `batch`: `func` takes stacked inputs and returns a stacked result, so that
+    `JobsetExecutor` can run many jobs of the node with a single call, see `batching`.
 
     Returns
     -------
     A dict containing DataContainer object
 
+    When `func` is an `async def` function the returned wrapper is a coroutine
+    function as well, which can be awaited directly or run by `AsyncJobsetRunner`.
+
+    When `func` is a generator (or async generator) function, the wrapper returns and
+    posts a `DataStream` of the chunks it yields, without running it: the chunks are
+    produced as the downstream node reads them.
+
     Usage Example
     -------------
     ```
@@ -128,6 +385,79 @@ def flojoy(
     """
 
     def decorator(func):
+        streaming = streaming_function(func)
+        if batch:
+            return batch_decorator(func)
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(
+                node_id: str,
+                job_id: str,
+                jobset_id: str,
+                previous_jobs: list = [],
+                function_parameters: set = set(),
+                ctrls=None,
+            ):
+                span = node_span(node_id, job_id, func.__name__)
+                try:
+                    args = build_node_args(
+                        func,
+                        node_id,
+                        job_id,
+                        jobset_id,
+                        previous_jobs,
+                        function_parameters,
+                        ctrls,
+                        inject_node_metadata,
+                        span,
+                    )
+                    cache_key, dc_obj = None, None
+                    if cache:
+                        cache_key, dc_obj = lookup_cached_result(func, args, span)
+                    if dc_obj is None:
+                        if span is not None:
+                            span.begin(CALL)
+                        dc_obj = await func(**args)  # DataContainer object from node
+                        if cache_key is not None:
+                            ResultCache.get_instance().put(cache_key, dc_obj, args)
+                    return finish_node(span, job_id, dc_obj)
+                except BaseException as e:
+                    if span is not None:
+                        span.finish(e)
+                    raise
+
+            return async_wrapper
+
+        def run(plan: CallPlan, span: Optional[NodeSpan]):
+            try:
+                args = plan.build_args(span)
+
+                ##########################
+                # calling the node function
+                ##########################
+                cache_key, dc_obj = None, None
+                if cache:
+                    cache_key, dc_obj = lookup_cached_result(func, args, span)
+                if dc_obj is None:
+                    if span is not None:
+                        span.begin(CALL)
+                    dc_obj = func(**args)  # DataContainer object from node
+                    if streaming:
+                        dc_obj = DataStream(dc_obj, prefetch)
+                    elif cache_key is not None:
+                        ResultCache.get_instance().put(cache_key, dc_obj, args)
+                ##########################
+                # end calling the node function
+                ##########################
+
+                return finish_node(span, plan.job_id, dc_obj)
+            except BaseException as e:
+                if span is not None:
+                    span.finish(e)
+                raise
+
+        @functools.wraps(func)
         def wrapper(
             node_id: str,
             job_id: str,
@@ -136,69 +466,139 @@ def flojoy(
             function_parameters: set = set(),
             ctrls = None,
         ):
-            FN = func.__name__
-
-            logger("previous jobs:", previous_jobs)
-            # Get command parameters set by the user through the control panel
-            func_params = {}
-            if ctrls is not None:
-                for _, input in ctrls.items():
-                    param = input["param"]
-                    value = input["value"]
-                    func_params[param] = format_param_value(value, input["type"])
-            func_params["type"] = "default"
-
-            logger(
-                "executing node_id:",
+            span = node_span(node_id, job_id, func.__name__)
+            try:
+                plan = CallPlan(
+                    func,
+                    node_id,
+                    job_id,
+                    jobset_id,
+                    previous_jobs,
+                    function_parameters,
+                    ctrls,
+                    inject_node_metadata,
+                    span,
+                )
+            except BaseException as e:
+                if span is not None:
+                    span.finish(e)
+                raise
+            return run(plan, span)
+
+        def compile(
+            node_id: str,
+            job_id: str,
+            jobset_id: str,
+            previous_jobs: list = [],
+            function_parameters: set = set(),
+            ctrls = None,
+        ) -> CallPlan:
+            """Resolves an invocation of the node once, see `CallPlan`"""
+            return CallPlan(
+                func,
                 node_id,
-                "previous_jobs:",
+                job_id,
+                jobset_id,
                 previous_jobs,
+                function_parameters,
+                ctrls,
+                inject_node_metadata,
+                runner=run,
             )
-            dict_inputs = fetch_inputs(previous_jobs)
-
-            # constructing the inputs
-            logger("constructing inputs for %s" % func.__name__)
-            args = {}
-
-            args = dict_inputs
-
-            for param, value in func_params.items():
-                if param in function_parameters:
-                    args[param] = value
-            if inject_node_metadata:
-                args["default_params"] = DefaultParams(
-                    job_id=job_id,
-                    node_id=node_id,
-                    jobset_id=jobset_id,
-                    node_type="default",
-                )
 
-            logger(node_id, " params: ", args.keys())
-
-            # check if node has an init container and if so, inject it
-            if NodeInitService().has_init_store(node_id):
-                args["init_container"] = NodeInitService().get_init_store(node_id)
-
-            ##########################
-            # calling the node function
-            ##########################
-            dc_obj = func(**args)  # DataContainer object from node
-            ##########################
-            # end calling the node function
-            ##########################
-
-            # # some special nodes like LOOP return dict instead of `DataContainer`
-            # if isinstance(dc_obj, DataContainer):
-            #     dc_obj.validate()  # Validate returned DataContainer object
-            # else:
-            #     for value in dc_obj.values():
-            #         if isinstance(value, DataContainer):
-            #             value.validate()
-            JobService().post_job_result(
-                job_id, dc_obj
-            )  # post result to the job service before sending result to socket
-            return dc_obj
+        wrapper.compile = compile  # type: ignore
+        return wrapper
+
+    def batch_decorator(func):
+        if inspect.iscoroutinefunction(func) or streaming_function(func):
+            raise ValueError(
+                "%s: only plain functions can be batched" % func.__name__
+            )
+        if cache or inject_node_metadata:
+            raise ValueError(
+                "%s: batch can't be combined with cache or inject_node_metadata"
+                % func.__name__
+            )
 
+        def run_batch(invocations: list[dict]) -> list:
+            """
+            Runs the node for several jobs, given as the keyword arguments of the
+            wrapper, and returns their results
+            """
+            job_ids = [invocation["job_id"] for invocation in invocations]
+            span = node_span(
+                invocations[0]["node_id"], ",".join(job_ids), func.__name__
+            )
+            try:
+                calls = [
+                    build_node_args(
+                        func,
+                        invocation["node_id"],
+                        invocation["job_id"],
+                        invocation["jobset_id"],
+                        invocation.get("previous_jobs", []),
+                        invocation.get("function_parameters", set()),
+                        invocation.get("ctrls"),
+                        inject_node_metadata,
+                        span,
+                    )
+                    for invocation in invocations
+                ]
+                if span is not None:
+                    span.set_input_nbytes(dict(enumerate(calls)))
+                args = stack_args(calls)
+                if args is not None:
+                    groups = [(job_ids, args)]
+                else:
+                    log.debug("can't stack the inputs of jobs %s", job_ids)
+                    groups = [
+                        ([job_id], stack_args([call]))
+                        for job_id, call in zip(job_ids, calls)
+                    ]
+                results = []
+                for group_job_ids, group_args in groups:
+                    if span is not None:
+                        span.begin(CALL)
+                    dc_obj = func(**group_args)
+                    if span is not None:
+                        span.begin(POST_RESULT)
+                    for job_id, result in zip(
+                        group_job_ids, unstack_container(dc_obj, len(group_job_ids))
+                    ):
+                        results.append(post_node_result(job_id, result))
+                if span is not None:
+                    span.end()
+                    span.set_output_nbytes(results)
+                    span.finish()
+                return results
+            except BaseException as e:
+                if span is not None:
+                    span.finish(e)
+                raise
+
+        @functools.wraps(func)
+        def wrapper(
+            node_id: str,
+            job_id: str,
+            jobset_id: str,
+            previous_jobs: list = [],
+            function_parameters: set = set(),
+            ctrls = None,
+        ):
+            return run_batch(
+                [
+                    {
+                        "node_id": node_id,
+                        "job_id": job_id,
+                        "jobset_id": jobset_id,
+                        "previous_jobs": previous_jobs,
+                        "function_parameters": function_parameters,
+                        "ctrls": ctrls,
+                    }
+                ]
+            )[0]
+
+        wrapper.run_batch = run_batch  # type: ignore
         return wrapper
 
     if original_function:
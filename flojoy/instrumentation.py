@@ -0,0 +1,321 @@
+"""
+Per node timing and memory instrumentation of the `flojoy` wrapper.
+
+Every node execution goes through the same phases: parsing the ctrls, fetching the
+inputs, injecting the init container, calling the node function and posting its
+result. Once a `Tracer` is enabled, the wrapper records the wall time and CPU time of
+each phase, the size of the inputs and of the result, and, when `trace_memory` is set,
+the peak of the memory allocated during the phase (measured by `tracemalloc`, only for
+phases which don't overlap another one, see `Tracer`).
+
+Usage Example
+-------------
+```
+tracer = enable_tracing(trace_memory=True)
+JobsetExecutor(jobs).run()
+disable_tracing()
+
+tracer.save_chrome_trace("jobset.trace.json")  # open in Perfetto or chrome://tracing
+for node in tracer.slowest_nodes(10):
+    print(node.node_id, node.wall_time, node.framework_time)
+```
+
+When no tracer is enabled the wrapper only pays for a lookup of the global tracer and
+a `None` check per phase.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+__all__ = ["Tracer", "enable_tracing", "disable_tracing", "get_tracer"]
+
+PARSE_CTRLS = "parse_ctrls"
+FETCH_INPUTS = "fetch_inputs"
+INJECT_INIT_CONTAINER = "inject_init_container"
+# only recorded for nodes decorated with `cache=True`
+CACHE_LOOKUP = "cache_lookup"
+CALL = "call"
+POST_RESULT = "post_result"
+# the only phase running user code, everything else is framework overhead
+USER_PHASES = (CALL,)
+
+
+class PhaseRecord:
+    """Measurements of one phase of one node execution"""
+
+    def __init__(self, phase: str, start: float) -> None:
+        self.phase = phase
+        self.start = start
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_alloc: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class NodeRecord:
+    """Measurements of one node execution, with the records of its phases"""
+
+    def __init__(self, node_id: str, job_id: str, func_name: str) -> None:
+        self.node_id = node_id
+        self.job_id = job_id
+        self.func_name = func_name
+        self.pid = os.getpid()
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.wall_time = 0.0
+        self.input_nbytes = 0
+        self.output_nbytes = 0
+        self.error: Optional[str] = None
+        self.phases: list[PhaseRecord] = []
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(phase.cpu_time for phase in self.phases)
+
+    @property
+    def user_time(self) -> float:
+        return sum(p.wall_time for p in self.phases if p.phase in USER_PHASES)
+
+    @property
+    def framework_time(self) -> float:
+        return self.wall_time - self.user_time
+
+    def to_dict(self) -> dict:
+        record = {k: v for k, v in vars(self).items() if k != "phases"}
+        record["phases"] = [phase.to_dict() for phase in self.phases]
+        return record
+
+
+class NodeSpan:
+    """
+    Records the phases of one node execution. Phases are delimited by `begin` and
+    `end` calls rather than context managers, so the wrapper pays a single `None`
+    check per phase while tracing is disabled.
+    """
+
+    def __init__(self, tracer: "Tracer", record: NodeRecord) -> None:
+        self.tracer = tracer
+        self.record = record
+        self.current: Optional[PhaseRecord] = None
+
+    def begin(self, phase: str):
+        if self.current is not None:
+            self.end()
+        if self.tracer.trace_memory:
+            self.tracer._begin_memory_phase(self)
+        self.cpu_start = time.thread_time()
+        self.current = PhaseRecord(phase, time.perf_counter())
+
+    def end(self):
+        phase = self.current
+        if phase is None:
+            return
+        self.current = None
+        phase.wall_time = time.perf_counter() - phase.start
+        phase.cpu_time = time.thread_time() - self.cpu_start
+        if self.tracer.trace_memory:
+            phase.peak_alloc = self.tracer._end_memory_phase(self)
+        self.record.phases.append(phase)
+        self.tracer._notify(self.record, phase)
+
+    def set_input_nbytes(self, inputs: dict):
+        from .job_result_utils import get_result_nbytes  # avoid circular import
+
+        self.record.input_nbytes = get_result_nbytes(inputs)
+
+    def set_output_nbytes(self, result: Any):
+        from .job_result_utils import get_result_nbytes  # avoid circular import
+
+        self.record.output_nbytes = get_result_nbytes(result)
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Ends the current phase (the failing one, on error) and the node"""
+        self.end()
+        record = self.record
+        record.wall_time = time.perf_counter() - record.start
+        if error is not None:
+            record.error = repr(error)
+        self.tracer._add(record)
+
+
+class Tracer:
+    """
+    Collects a `NodeRecord` for every node executed while it is enabled.
+
+    `hooks` are called with `(node_record, phase_record)` as each phase ends, and with
+    `(node_record, None)` once the node finished. They run on the thread executing the
+    node and should return quickly.
+
+    CPU times are measured per thread, so they are exact for sync nodes even when the
+    executor runs several nodes at once. `tracemalloc` peaks are process wide though:
+    a phase which overlaps the phase of another node (with a thread pool executor or
+    async nodes) has no `peak_alloc`, only phases running alone are measured.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        # set when `enable_tracing` started tracemalloc, which is stopped with it
+        self.owns_tracemalloc = False
+        self.records: list[NodeRecord] = []
+        self.hooks: list[Callable[[NodeRecord, Optional[PhaseRecord]], None]] = []
+        self.lock = threading.Lock()
+        # trace timestamps are relative to the creation of the tracer
+        self.origin = time.perf_counter()
+        # number of memory traced phases running, and of phases which began while
+        # another one was running
+        self.memory_phases = 0
+        self.memory_overlaps = 0
+
+    def _begin_memory_phase(self, span: NodeSpan):
+        with self.lock:
+            self.memory_phases += 1
+            span.memory_alone = self.memory_phases == 1
+            if not span.memory_alone:
+                self.memory_overlaps += 1
+            else:
+                tracemalloc.reset_peak()
+            span.memory_overlaps = self.memory_overlaps
+            span.alloc_start = tracemalloc.get_traced_memory()[0]
+
+    def _end_memory_phase(self, span: NodeSpan) -> Optional[int]:
+        """Peak allocated by the phase, `None` if another phase overlapped it"""
+        with self.lock:
+            self.memory_phases -= 1
+            if not span.memory_alone or self.memory_overlaps != span.memory_overlaps:
+                return None
+            return max(tracemalloc.get_traced_memory()[1] - span.alloc_start, 0)
+
+    def add_hook(self, hook: Callable[[NodeRecord, Optional[PhaseRecord]], None]):
+        self.hooks.append(hook)
+
+    def node_span(self, node_id: str, job_id: str, func_name: str) -> NodeSpan:
+        return NodeSpan(self, NodeRecord(node_id, job_id, func_name))
+
+    def _notify(self, node: NodeRecord, phase: Optional[PhaseRecord]):
+        for hook in self.hooks:
+            hook(node, phase)
+
+    def _add(self, record: NodeRecord):
+        with self.lock:
+            self.records.append(record)
+        self._notify(record, None)
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+
+    def slowest_nodes(self, count: int = 10) -> list[NodeRecord]:
+        with self.lock:
+            records = list(self.records)
+        return sorted(records, key=lambda r: r.wall_time, reverse=True)[:count]
+
+    def summary(self) -> dict[str, dict]:
+        """Total wall, user and framework time of the traced nodes, by node id"""
+        totals: dict[str, dict] = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(
+                record.node_id,
+                {"calls": 0, "wall_time": 0.0, "user_time": 0.0, "framework_time": 0.0},
+            )
+            total["calls"] += 1
+            total["wall_time"] += record.wall_time
+            total["user_time"] += record.user_time
+            total["framework_time"] += record.framework_time
+        return totals
+
+    def _us(self, seconds: float) -> float:
+        return round(seconds * 1e6, 3)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Trace Event Format (as read by Perfetto and chrome://tracing): one complete
+        event per node execution, with one nested event per phase
+        """
+        events = []
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            events.append(
+                {
+                    "name": record.node_id,
+                    "cat": "node",
+                    "ph": "X",
+                    "ts": self._us(record.start - self.origin),
+                    "dur": self._us(record.wall_time),
+                    "pid": record.pid,
+                    "tid": record.thread_id,
+                    "args": {
+                        "job_id": record.job_id,
+                        "func": record.func_name,
+                        "cpu_time_us": self._us(record.cpu_time),
+                        "framework_time_us": self._us(record.framework_time),
+                        "input_nbytes": record.input_nbytes,
+                        "output_nbytes": record.output_nbytes,
+                        "error": record.error,
+                    },
+                }
+            )
+            for phase in record.phases:
+                args: dict[str, Any] = {"cpu_time_us": self._us(phase.cpu_time)}
+                if phase.peak_alloc is not None:
+                    args["peak_alloc"] = phase.peak_alloc
+                events.append(
+                    {
+                        "name": phase.phase,
+                        "cat": "phase",
+                        "ph": "X",
+                        "ts": self._us(phase.start - self.origin),
+                        "dur": self._us(phase.wall_time),
+                        "pid": record.pid,
+                        "tid": record.thread_id,
+                        "args": args,
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def enable_tracing(trace_memory: bool = False) -> Tracer:
+    """Starts recording every node execution of this process in a new `Tracer`"""
+    global _tracer
+    tracer = Tracer(trace_memory)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        tracer.owns_tracemalloc = True
+    _tracer = tracer
+    return tracer
+
+
+def disable_tracing() -> Optional[Tracer]:
+    """Stops recording and returns the tracer that was enabled"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and tracer.owns_tracemalloc:
+        tracemalloc.stop()
+    return tracer
+
+
+def node_span(node_id: str, job_id: str, func_name: str) -> Optional[NodeSpan]:
+    """Span of the enabled tracer, `None` when tracing is disabled"""
+    tracer = _tracer
+    if tracer is None:
+        return None
+    return tracer.node_span(node_id, job_id, func_name)
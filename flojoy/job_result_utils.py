@@ -1,9 +1,19 @@
 from .flojoy_instruction import FLOJOY_INSTRUCTION
-from .data_container import DataContainer
+from .box import Box
+from .data_container import DataContainer, Lazy
+from .streaming import DataStream
 from .dao import Dao
+from .shared_memory import SharedResult
+import numpy as np
 from typing import Any, cast
 
-__all__ = ["get_job_result", "get_next_directions", "get_next_nodes", "get_job_result"]
+__all__ = [
+    "get_job_result",
+    "get_next_directions",
+    "get_next_nodes",
+    "get_job_result",
+    "get_result_nbytes",
+]
 
 
 def is_flow_controled(result):
@@ -44,7 +54,7 @@ def get_dc_from_result(
 ):
     if not result:
         return None
-    if isinstance(result, DataContainer):
+    if isinstance(result, (DataContainer, DataStream)):
         return result
     if result.get(FLOJOY_INSTRUCTION.RESULT_FIELD):
         return result[result[FLOJOY_INSTRUCTION.RESULT_FIELD]]
@@ -67,3 +77,57 @@ def get_text_blob_from_dc(dc: DataContainer):
         return dc.b.decode("utf-8")
     else:
         return None
+
+
+def get_result_nbytes(result) -> int:
+    """
+    Returns the number of bytes held by the arrays of a job result, which may be a
+    DataContainer or an instruction dict (possibly nesting other containers). A view
+    counts the size of the array it is a view of, once per result. Lazy keys which
+    were not materialized count the size of the array of their `.npy` file, read
+    from its header; those computed by a callable can't be measured and count as
+    empty. A result posted to shared memory counts the size of its block.
+    """
+    return _nbytes(result, set())
+
+
+def _nbytes(value, seen: set) -> int:
+    if isinstance(value, np.ndarray):
+        while isinstance(value.base, np.ndarray):
+            value = value.base
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, Lazy):
+        return _lazy_nbytes(value, seen)
+    if isinstance(value, SharedResult):
+        return value.nbytes
+    if isinstance(value, DataContainer):
+        return sum(_nbytes(field, seen) for _, field in value._items(materialize=False))
+    if isinstance(value, (Box, dict)):
+        return sum(_nbytes(field, seen) for field in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item, seen) for item in value)
+    return 0
+
+
+def _lazy_nbytes(lazy: Lazy, seen: set) -> int:
+    if lazy.loaded:
+        # loaded through another container sharing it
+        return _nbytes(lazy.value, seen)
+    source = lazy.source
+    if source is None or callable(source):
+        return 0
+    try:
+        with open(source, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+    except (OSError, ValueError):
+        return 0
+    return int(np.prod(shape)) * dtype.itemsize
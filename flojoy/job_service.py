@@ -1,5 +1,6 @@
-from typing import Any
+from typing import Any, Optional
 from .dao import Dao
+from .spill import SpillStore
 
 """
 Service that allows to manage jobs
@@ -24,6 +25,58 @@ class JobService:
     def delete_job(self, job_id: str):
         self.dao.delete_job(job_id)
 
+    def set_job_results_budget(self, max_bytes: Optional[int]):
+        self.dao.set_job_results_budget(max_bytes)
+
+    def enable_spill(self, directory: Optional[str] = None, min_nbytes: int = 0):
+        """
+        Writes results evicted by the job results budget to `.npy` files in a
+        temporary directory (created under `directory` when given) instead of
+        dropping them. Results smaller than `min_nbytes` are still dropped.
+        """
+        self.dao.set_spill_store(SpillStore(directory, min_nbytes))
+
+    def disable_spill(self):
+        self.dao.set_spill_store(None)
+
+    def register_consumers(self, previous_jobs_by_job: dict[str, list]):
+        """
+        Counts the edges leaving every job (given the `previous_jobs` of each job of a
+        jobset), so that each result is released once all of its consumers fetched it
+        """
+        counts: dict[str, int] = {}
+        for previous_jobs in previous_jobs_by_job.values():
+            for prev_job in previous_jobs:
+                prev_job_id = prev_job.get("job_id")
+                counts[prev_job_id] = counts.get(prev_job_id, 0) + 1
+        for job_id, count in counts.items():
+            self.dao.set_job_consumers(job_id, count)
+
+    def release_job_result(self, job_id: str):
+        self.dao.release_job_result(job_id)
+
+    def set_job_signature(self, job_id: str, signature: bytes):
+        """
+        Records what a posted result was computed from, see
+        `JobsetExecutor(incremental=True)`. Deleting the job forgets it.
+        """
+        self.dao.set_job_signature(job_id, signature)
+
+    def get_job_signature(self, job_id: str) -> Optional[bytes]:
+        return self.dao.get_job_signature(job_id)
+
+    def get_job_preview(self, job_id: str) -> Any:
+        """
+        Result of a job reduced to display resolution, to send to the front end
+        instead of the full resolution result, see `preview`
+        """
+        return self.dao.get_job_preview(job_id)
+
+    def invalidate_jobs(self, job_ids):
+        """Deletes the results of the given jobs, so that they run again"""
+        for job_id in job_ids:
+            self.dao.delete_job(job_id)
+
     def reset(self):
         self.dao.clear_job_results()
         self.dao.clear_small_memory()
@@ -0,0 +1,501 @@
+"""
+Runs a whole jobset instead of a single node.
+
+Each node of a jobset is described by a `Job`, whose `previous_jobs` carry the same
+edges the `@flojoy` wrapper already understands (`job_id`, `input_name`, `edge`,
+`multiple`). The executor orders the jobs topologically and submits every job whose
+predecessors have finished to a thread pool (or a process pool), so independent
+branches of the graph run at the same time.
+"""
+
+import asyncio
+import inspect
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Optional
+
+from .log import get_logger
+from .dao import Dao
+from .job_result_utils import get_next_directions, is_flow_controled
+from .job_service import JobService
+from .shared_memory import SharedMemoryJobResults, SharedResult, share_result
+
+__all__ = ["Job", "JobsetExecutor", "topological_sort", "invalidate_downstream"]
+
+log = get_logger(__name__)
+
+
+class Job:
+    """A single invocation of a `@flojoy` wrapped node inside a jobset"""
+
+    def __init__(
+        self,
+        job_id: str,
+        func: Callable,
+        node_id: Optional[str] = None,
+        previous_jobs: Optional[list] = None,
+        ctrls: Optional[dict] = None,
+        function_parameters: Optional[set] = None,
+    ) -> None:
+        self.job_id = job_id
+        self.func = func
+        self.node_id = node_id if node_id is not None else job_id
+        self.previous_jobs = previous_jobs if previous_jobs is not None else []
+        self.ctrls = ctrls
+        self.function_parameters = (
+            function_parameters if function_parameters is not None else set()
+        )
+
+    def predecessor_ids(self) -> list[str]:
+        return [prev_job.get("job_id") for prev_job in self.previous_jobs]
+
+    def kwargs(self, jobset_id: str) -> dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "job_id": self.job_id,
+            "jobset_id": jobset_id,
+            "previous_jobs": self.previous_jobs,
+            "function_parameters": self.function_parameters,
+            "ctrls": self.ctrls,
+        }
+
+
+def _successors(jobs: dict[str, Job]) -> dict[str, list[str]]:
+    successors: dict[str, list[str]] = {job_id: [] for job_id in jobs}
+    for job in jobs.values():
+        for prev_job_id in set(job.predecessor_ids()):
+            # predecessors outside of the jobset are expected to already have
+            # their results in the job service
+            if prev_job_id in jobs:
+                successors[prev_job_id].append(job.job_id)
+    return successors
+
+
+def topological_sort(jobs: list[Job]) -> list[str]:
+    """
+    Returns the job ids ordered so that every job comes after all of its predecessors.
+    Raises a ValueError if the jobs contain a cycle.
+    """
+    jobs_by_id = {job.job_id: job for job in jobs}
+    successors = _successors(jobs_by_id)
+    pending = {
+        job_id: len(set(p for p in job.predecessor_ids() if p in jobs_by_id))
+        for job_id, job in jobs_by_id.items()
+    }
+    ready = [job_id for job_id, count in pending.items() if count == 0]
+    order = []
+    while ready:
+        job_id = ready.pop(0)
+        order.append(job_id)
+        for next_job_id in successors[job_id]:
+            pending[next_job_id] -= 1
+            if pending[next_job_id] == 0:
+                ready.append(next_job_id)
+    if len(order) != len(jobs_by_id):
+        cyclic = [job_id for job_id in jobs_by_id if job_id not in order]
+        raise ValueError("Jobset contains a cycle between jobs %s" % cyclic)
+    return order
+
+
+def downstream_jobs(jobs: dict[str, Job], job_ids) -> set[str]:
+    """The given jobs and every job of the jobset depending on them, transitively"""
+    successors = _successors(jobs)
+    found = set()
+    stack = [job_id for job_id in job_ids if job_id in jobs]
+    while stack:
+        job_id = stack.pop()
+        if job_id in found:
+            continue
+        found.add(job_id)
+        stack.extend(successors[job_id])
+    return found
+
+
+def invalidate_downstream(jobs: list[Job], job_ids) -> set[str]:
+    """
+    Deletes the results of the given jobs and of everything downstream of them, e.g.
+    after changing the ctrls of a node, and returns the invalidated job ids. Results
+    upstream stay in `JobService`.
+    """
+    invalidated = downstream_jobs({job.job_id: job for job in jobs}, job_ids)
+    JobService().invalidate_jobs(invalidated)
+    return invalidated
+
+
+def job_signature(job: Job) -> bytes:
+    """Hash of everything a job's result depends on, besides its input results"""
+    from .result_cache import fingerprint  # avoid circular import
+
+    func = getattr(job.func, "__wrapped__", job.func)
+    code = getattr(func, "__code__", None)
+    return fingerprint(
+        [
+            "%s.%s" % (func.__module__, func.__qualname__),
+            code.co_code if code is not None else None,
+            job.node_id,
+            job.ctrls,
+            sorted(job.function_parameters),
+            job.previous_jobs,
+        ]
+    )
+
+
+def register_consumers(jobs: dict[str, Job]):
+    """Registers the consumers of every job result produced inside the jobset"""
+    JobService().register_consumers(
+        {
+            job_id: [
+                prev_job
+                for prev_job in job.previous_jobs
+                if prev_job.get("job_id") in jobs
+            ]
+            for job_id, job in jobs.items()
+        }
+    )
+
+
+def is_edge_active(prev_job_id: str, edge: str) -> bool:
+    """Whether the result of a finished job flows through the given edge"""
+    if edge in ("", "default"):
+        return True
+    try:
+        result = JobService().get_job_result(prev_job_id)
+    except ValueError:
+        return True
+    if not isinstance(result, dict):
+        return True
+    if not is_flow_controled(result):
+        return True
+    directions = get_next_directions(result)
+    return directions is None or edge in directions
+
+
+def _call_node(func: Callable, kwargs: dict[str, Any]) -> Any:
+    """Calls a wrapped node, `async def` nodes on an event loop of their own"""
+    if inspect.iscoroutinefunction(func):
+        return asyncio.run(func(**kwargs))
+    return func(**kwargs)
+
+
+def _run_job_in_process(
+    func: Callable, kwargs: dict[str, Any], inputs: dict[str, Any], init_container
+):
+    """
+    Entry point of process pool workers. The worker process has its own `Dao`, so the
+    results of the predecessors (and the init container of the node, if any) are
+    seeded into it before calling the node and removed again afterwards.
+
+    Inputs sent as `SharedResult` handles are read as views over shared memory, and
+    the result is then written to shared memory as well instead of being pickled.
+    """
+    dao = Dao.get_instance()
+    node_id = kwargs["node_id"]
+    shared = any(isinstance(result, SharedResult) for result in inputs.values())
+    for prev_job_id, result in inputs.items():
+        if isinstance(result, SharedResult):
+            result = result.load()
+        dao.post_job_result(prev_job_id, result)
+    if init_container is not None:
+        dao.set_init_container(node_id, init_container)
+    try:
+        result = _call_node(func, kwargs)
+        return share_result(result) if shared else result
+    finally:
+        for prev_job_id, result in inputs.items():
+            dao.delete_job(prev_job_id)
+            if isinstance(result, SharedResult):
+                result.close()
+        dao.delete_job(kwargs["job_id"])
+        dao.node_init_container.pop(node_id, None)
+
+
+class JobsetExecutor:
+    """
+    Executes the jobs of a jobset, running independent branches concurrently.
+
+    Usage Example
+    -------------
+    ```
+    executor = JobsetExecutor(
+        [
+            Job("linspace", LINSPACE),
+            Job("sine", SINE, previous_jobs=[{"job_id": "linspace", "input_name": "default", "edge": "default"}]),
+            Job("fft", FFT, previous_jobs=[{"job_id": "linspace", "input_name": "default", "edge": "default"}]),
+        ],
+        max_workers=8,
+    )
+    results = executor.run()
+    ```
+
+    `run` returns the results of the jobs that no other job of the jobset consumes,
+    every other result is available through `JobService` as usual.
+
+    With `use_processes=True` the nodes run in a `ProcessPoolExecutor`, so the wrapped
+    node functions and their results have to be picklable. Call
+    `Dao.get_instance().use_shared_memory()` beforehand to hand the arrays of the
+    results to the workers through shared memory instead of pickling them.
+
+    With `release_results=True` every intermediate result is deleted from
+    `JobService` as soon as all of the jobs consuming it fetched it, which keeps the
+    memory of long jobsets bounded.
+
+    With `incremental=True` the executor remembers what every result was computed
+    from (the node, its ctrls and its edges). Running the jobset again only runs the
+    jobs that changed since, or whose result is missing, and everything downstream of
+    them; the other results are reused from `JobService`. `invalidate_downstream`
+    forces a part of the graph to run again.
+
+    Jobs of nodes decorated with `@flojoy(batch=True)` which become ready at the same
+    time, with the same ctrls and edges, are run together by a single call of the
+    node, in groups of at most `max_batch_size` jobs (see `batching`). Batching is
+    not used with `use_processes=True`.
+
+    Nodes decorated on an `async def` function are run to completion on an event loop
+    of their own in the worker; `AsyncJobsetRunner` awaits them on one shared loop
+    instead.
+
+    The jobs of other plain nodes are compiled into call plans the first time they
+    run (see `compile` and `flojoy_python.CallPlan`), so running the same executor
+    again, e.g. for each iteration of a loop, doesn't resolve them again.
+    """
+
+    def __init__(
+        self,
+        jobs: list[Job],
+        jobset_id: str = "",
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        release_results: bool = False,
+        incremental: bool = False,
+        max_batch_size: int = 1024,
+    ) -> None:
+        if release_results and incremental:
+            raise ValueError(
+                "Incremental runs reuse intermediate results, they can't be released"
+            )
+        self.jobs = {job.job_id: job for job in jobs}
+        self.jobset_id = jobset_id
+        self.max_workers = max_workers if max_workers else (os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self.release_results = release_results
+        self.incremental = incremental
+        self.max_batch_size = max_batch_size
+        self.order = topological_sort(jobs)
+        self.successors = _successors(self.jobs)
+        # compiled `CallPlan` of each job, see `compile`
+        self.plans: dict[str, Any] = {}
+
+    def _create_pool(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _plan(self, job: Job) -> Optional[Callable]:
+        """The compiled plan of a job, compiled again if the job changed since"""
+        if self.use_processes or not hasattr(job.func, "compile"):
+            return None
+        plan = self.plans.get(job.job_id)
+        if plan is None or not plan.compiled_from(
+            job.func,
+            job.node_id,
+            self.jobset_id,
+            job.previous_jobs,
+            job.function_parameters,
+            job.ctrls,
+        ):
+            plan = job.func.compile(**job.kwargs(self.jobset_id))  # type: ignore
+            self.plans[job.job_id] = plan
+        return plan
+
+    def compile(self):
+        """
+        Compiles the jobs of plain nodes into `CallPlan`s, which every run executes
+        instead of parsing the ctrls and edges of each job again. `run` compiles the
+        jobs it doesn't have a plan for, and the jobs whose ctrls, edges or function
+        changed since, in place or not.
+        """
+        for job in self.jobs.values():
+            self._plan(job)
+
+    def _submit(self, pool: Executor, job: Job) -> Future:
+        log.debug("submitting job: %s", job.job_id)
+        plan = self._plan(job)
+        if plan is not None:
+            return pool.submit(plan)
+        kwargs = job.kwargs(self.jobset_id)
+        if not self.use_processes:
+            return pool.submit(_call_node, job.func, kwargs)
+        dao = Dao.get_instance()
+        if isinstance(dao.job_results, SharedMemoryJobResults):
+            # only send the names of the shared memory blocks holding the inputs
+            inputs = {
+                prev_job_id: dao.job_results.handle(prev_job_id)
+                for prev_job_id in set(job.predecessor_ids())
+            }
+        else:
+            job_service = JobService()
+            inputs = {
+                prev_job_id: job_service.get_job_result(prev_job_id)
+                for prev_job_id in set(job.predecessor_ids())
+            }
+        init_container = (
+            dao.get_init_container(job.node_id)
+            if dao.has_init_container(job.node_id)
+            else None
+        )
+        return pool.submit(
+            _run_job_in_process, job.func, kwargs, inputs, init_container
+        )
+
+    def _batch_key(self, job: Job) -> Optional[tuple]:
+        """
+        Jobs with the same key can run in one batch, `None` if the job can't. The
+        batched node checks again that the inputs of the jobs can be stacked.
+        """
+        if self.use_processes or not hasattr(job.func, "run_batch"):
+            return None
+        edges = tuple(
+            (p.get("input_name"), p.get("edge", ""), p.get("multiple", False))
+            for p in job.previous_jobs
+        )
+        return (
+            job.func,
+            repr(job.ctrls),
+            tuple(sorted(job.function_parameters)),
+            edges,
+        )
+
+    def _submit_batch(self, pool: Executor, jobs: list[Job]) -> Future:
+        log.debug("submitting batch of jobs: %s", [job.job_id for job in jobs])
+        return pool.submit(
+            jobs[0].func.run_batch,  # type: ignore
+            [job.kwargs(self.jobset_id) for job in jobs],
+        )
+
+    def _release_inputs(self, job: Job):
+        job_service = JobService()
+        for prev_job_id in job.predecessor_ids():
+            job_service.release_job_result(prev_job_id)
+
+    def dirty_jobs(self, signatures: Optional[dict[str, bytes]] = None) -> set[str]:
+        """
+        Jobs an incremental run has to run: the ones whose signature changed since
+        their result was posted or whose result is missing, and their downstream jobs
+        """
+        job_service = JobService()
+        if signatures is None:
+            signatures = {
+                job_id: job_signature(job) for job_id, job in self.jobs.items()
+            }
+        changed = [
+            job_id
+            for job_id in self.jobs
+            if job_service.get_job_signature(job_id) != signatures[job_id]
+            or not job_service.job_exists(job_id)
+        ]
+        return downstream_jobs(self.jobs, changed)
+
+    def run(self) -> dict[str, Any]:
+        if self.release_results:
+            register_consumers(self.jobs)
+        signatures: dict[str, bytes] = {}
+        clean: set[str] = set()
+        if self.incremental:
+            signatures = {
+                job_id: job_signature(job) for job_id, job in self.jobs.items()
+            }
+            dirty = self.dirty_jobs(signatures)
+            JobService().invalidate_jobs(dirty)
+            clean = set(self.jobs) - dirty
+        pending = {
+            job_id: len(set(p for p in job.predecessor_ids() if p in self.jobs))
+            for job_id, job in self.jobs.items()
+        }
+        skipped: set[str] = set()
+        results: dict[str, Any] = {}
+        # job ids of each future, and whether it runs a batch
+        running: dict[Future, tuple[list[str], bool]] = {}
+        batches: dict[tuple, list[Job]] = {}
+
+        with self._create_pool() as pool:
+
+            def on_finished(job_id: str):
+                for next_job_id in self.successors[job_id]:
+                    pending[next_job_id] -= 1
+                    if pending[next_job_id] == 0:
+                        schedule(next_job_id)
+
+            def schedule(job_id: str):
+                job = self.jobs[job_id]
+                if job_id in clean:
+                    log.debug("reusing result of job: %s", job_id)
+                    if not self.successors[job_id]:
+                        results[job_id] = JobService().get_job_result(job_id)
+                    on_finished(job_id)
+                    return
+                for prev_job in job.previous_jobs:
+                    prev_job_id = prev_job.get("job_id")
+                    if prev_job_id in skipped or (
+                        prev_job_id in self.jobs
+                        and not is_edge_active(prev_job_id, prev_job.get("edge", ""))
+                    ):
+                        log.debug("skipping job: %s", job_id)
+                        skipped.add(job_id)
+                        self._release_inputs(job)
+                        on_finished(job_id)
+                        return
+                key = self._batch_key(job)
+                if key is None:
+                    running[self._submit(pool, job)] = ([job_id], False)
+                else:
+                    batches.setdefault(key, []).append(job)
+
+            def submit_batches():
+                for group in batches.values():
+                    for start in range(0, len(group), self.max_batch_size):
+                        jobs = group[start : start + self.max_batch_size]
+                        running[self._submit_batch(pool, jobs)] = (
+                            [job.job_id for job in jobs],
+                            True,
+                        )
+                batches.clear()
+
+            # reused and skipped jobs finish right away, which may bring the pending
+            # count of their successors to 0, so collect the roots first
+            roots = [job_id for job_id in self.order if pending[job_id] == 0]
+            for job_id in roots:
+                schedule(job_id)
+            submit_batches()
+
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_ids, batched = running.pop(future)
+                    try:
+                        outputs = future.result() if batched else [future.result()]
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    for job_id, result in zip(job_ids, outputs):
+                        if self.use_processes:
+                            JobService().post_job_result(job_id, result)
+                            if isinstance(result, SharedResult):
+                                result = JobService().get_job_result(job_id)
+                            # workers fetch their inputs from their own job service
+                            self._release_inputs(self.jobs[job_id])
+                        if self.incremental:
+                            JobService().set_job_signature(job_id, signatures[job_id])
+                        if not self.successors[job_id]:
+                            results[job_id] = result
+                        on_finished(job_id)
+                submit_batches()
+
+        return results
@@ -0,0 +1,170 @@
+"""
+Leveled, structured logging of the flojoy package, built on the standard `logging`
+module.
+
+Every module logs through `get_logger(__name__)` with %-style arguments, e.g.
+`log.debug("running job: %s", job_id)`: as long as the level of the module is not
+enabled, a call costs a level check and the message is never formatted. Nothing is
+output until `configure_logging` is called (or `set_debug_on`, which prints
+to stdout like the former `logger`).
+
+`configure_logging` routes the records through a `QueueHandler`: the thread running a
+node only formats the message and puts the record on a queue, a `QueueListener`
+thread encodes it as a JSON line and writes it out, so workers never wait on the
+output stream.
+
+Usage Example
+-------------
+```
+configure_logging(
+    level="INFO",
+    path="flojoy.jsonl",
+    levels={"jobset_executor": "DEBUG"},
+)
+...
+shutdown_logging()
+```
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Optional, TextIO, Union
+
+__all__ = [
+    "get_logger",
+    "set_log_level",
+    "configure_logging",
+    "shutdown_logging",
+    "JsonLinesFormatter",
+]
+
+ROOT_LOGGER = "flojoy"
+
+# a library only outputs logs once the application asks for them
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+# attributes every `LogRecord` has, anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(module: str) -> logging.Logger:
+    """Logger of a flojoy module, `module` is its `__name__` (or the short name)"""
+    if module != ROOT_LOGGER and not module.startswith(ROOT_LOGGER + "."):
+        module = "%s.%s" % (ROOT_LOGGER, module)
+    return logging.getLogger(module)
+
+
+def set_log_level(level: Union[int, str], module: Optional[str] = None):
+    """Sets the level of one module, or of the whole package by default"""
+    if isinstance(level, str):
+        level = level.upper()
+    get_logger(module or ROOT_LOGGER).setLevel(level)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record as a single line JSON object, including its `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # formatted by `_QueueHandler` before crossing the queue
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records with their message merged, keeping the traceback apart in
+    `exc_text`: `QueueHandler.prepare` would append it to the message
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # tracebacks can't be pickled by process queues
+        record.exc_info = None
+        return record
+
+
+def configure_logging(
+    level: Union[int, str] = "INFO",
+    stream: Optional[TextIO] = None,
+    path: Optional[str] = None,
+    levels: Optional[dict[str, Union[int, str]]] = None,
+    json_lines: bool = True,
+) -> logging.handlers.QueueListener:
+    """
+    Outputs the records of the flojoy loggers to `path` (appending) or `stream`
+    (stderr by default), as JSON lines unless `json_lines` is unset. `levels` sets the
+    level of single modules, e.g. `{"flojoy_python": "DEBUG"}`. Calling it again
+    replaces the previous configuration.
+    """
+    global _handler, _listener
+    if path is not None:
+        target: logging.Handler = logging.FileHandler(path)
+    else:
+        target = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    target.setFormatter(
+        JsonLinesFormatter() if json_lines else logging.Formatter("%(message)s")
+    )
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, target)
+    handler = _QueueHandler(records)
+
+    with _lock:
+        _remove_handler()
+        root = get_logger(ROOT_LOGGER)
+        set_log_level(level)
+        for module, module_level in (levels or {}).items():
+            set_log_level(module_level, module)
+        root.addHandler(handler)
+        # records are output here, applications' root handlers would duplicate them
+        root.propagate = False
+        listener.start()
+        _handler, _listener = handler, listener
+    return listener
+
+
+def _remove_handler():
+    global _handler, _listener
+    if _listener is not None:
+        # flushes the records still in the queue
+        _listener.stop()
+        for target in _listener.handlers:
+            target.close()
+    if _handler is not None:
+        root = get_logger(ROOT_LOGGER)
+        root.removeHandler(_handler)
+        root.propagate = True
+    _handler, _listener = None, None
+
+
+def shutdown_logging():
+    """Writes the pending records and stops outputting logs"""
+    with _lock:
+        _remove_handler()
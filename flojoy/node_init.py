@@ -30,6 +30,8 @@ class NodeInit:
         res = self.func()
         if res is not None:
             daemon_container.set(res)
+            # backends other than the in-memory one store a copy of the container
+            Dao.get_instance().set_init_container(node_id, daemon_container)
 
 
 # Wrapper for node_init functions, maps the node to the function that will initialize it.
@@ -1,5 +1,8 @@
+import functools
 from typing import Any, Union
 
+import numpy as np
+
 
 class NodeReference:
     """Node parameter type"""
@@ -46,21 +49,35 @@ def format_param_value(value: Any, value_type: str):
         return value
 
 
+# numeric list items are parsed with numpy first, which is faster than casting them
+# one by one, and returned as a list like any other items
+_NUMPY_DTYPES = {int: np.int64, float: np.float64}
+
 
 def parse_array(
     str_value: str, type_list: list, param_type: str
 ) -> list:
+    """
+    Parses comma separated items with the first type of `type_list` all of them can
+    be cast into.
+    """
     if not str_value:
         return []
 
-    val_list = [val.strip() for val in str_value.split(",")]
+    items = str_value.split(",")
     # First try to cast into int, then float, then keep as string if all else fails
     for t in type_list:
+        if t in _NUMPY_DTYPES:
+            try:
+                return np.array(items, dtype=_NUMPY_DTYPES[t]).tolist()
+            except (ValueError, OverflowError):
+                # e.g. ints too large for int64, cast by Python below
+                pass
         try:
-            return list(map(t, val_list))
+            return [t(val.strip()) for val in items]
         except ValueError:
             continue
-    
+
     val1 = ','.join([str(t) for t in type_list])
     val2 = ' | '.join([t.__name__ for t in type_list])
 
@@ -68,3 +85,31 @@ def parse_array(
         "Couldn't parse list items with type %s." % val1
         + "Value should be comma (',') separated %s for parameter type %s." % (val2, param_type)
     )
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _parse_ctrl_value_cached(node_id: str, value: Any, value_type: str):
+    return format_param_value(value, value_type)
+
+
+def parse_ctrl_value(node_id: str, value: Any, value_type: str):
+    """
+    `format_param_value` of a ctrl of a node, cached by node and value: a node
+    invoked again with the same ctrls (e.g. in a loop) doesn't parse them again.
+    Parsed lists are copied for each invocation.
+    """
+    try:
+        parsed = _parse_ctrl_value_cached(node_id, value, value_type)
+    except TypeError:
+        # unhashable value, e.g. a list sent as it is
+        return format_param_value(value, value_type)
+    return _unshared(parsed)
+
+
+def _unshared(parsed: Any) -> Any:
+    """Copy of a parsed value shared between invocations, if it is mutable"""
+    if isinstance(parsed, list):
+        return list(parsed)
+    if isinstance(parsed, Array):
+        return Array(list(parsed.unwrap()))
+    return parsed
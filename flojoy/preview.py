@@ -0,0 +1,176 @@
+"""
+Display resolution previews of job results.
+
+A result can hold far more samples than a plot can show, e.g. a 10M points
+`OrderedPair`. `preview_result` returns a copy of the result whose containers are
+reduced to a bounded size, to be sent to the front end instead of the full resolution
+result:
+
+- `ordered_pair` and `vector`: at most `max_points` points, keeping the minimum and
+  the maximum of each bucket of samples ("minmax", which preserves peaks and the
+  envelope of the signal) or with Largest-Triangle-Three-Buckets ("lttb", which
+  preserves the visual shape of smooth curves).
+- `matrix`, `grayscale` and `image`: sides of at most `max_side` pixels, averaging
+  square blocks of pixels.
+
+Other types, and containers which are already small enough, are returned as they are.
+`JobService().get_job_preview(job_id)` computes the preview of a job result once and
+caches it until the result is posted again or deleted. The default sizes and method
+are set on `FlojoyConfig` (`preview_max_points`, `preview_max_side`,
+`preview_method`), and `FlojoyConfig.preview_results` computes the previews as soon
+as the results are posted.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+
+from .config import FlojoyConfig
+from .data_container import DataContainer, replace_fields
+
+__all__ = ["preview_result", "preview_container", "minmax_indices", "lttb_indices"]
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Sorted indices of the minimum and the maximum of `max_points // 2` buckets of
+    consecutive samples of `y`
+    """
+    n = len(y)
+    buckets = max(max_points // 2, 1)
+    if n <= max_points:
+        return np.arange(n)
+    size = -(-n // buckets)
+    full = n // size * size
+    blocks = y[:full].reshape(-1, size)
+    starts = np.arange(0, full, size)
+    lows = [blocks.argmin(axis=1) + starts]
+    highs = [blocks.argmax(axis=1) + starts]
+    if full < n:
+        lows.append([full + int(y[full:].argmin())])
+        highs.append([full + int(y[full:].argmax())])
+    pairs = np.stack([np.concatenate(lows), np.concatenate(highs)], axis=1)
+    # the extremes of a bucket are kept in the order they occur
+    return np.sort(pairs, axis=1).ravel()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the `max_points` points picked by Largest-Triangle-Three-Buckets: the
+    first and last points, and in each bucket the point forming the largest triangle
+    with the point picked in the previous bucket and the average of the next one
+    """
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    indices = np.empty(max_points, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    picked = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        px, py = x[picked], y[picked]
+        areas = np.abs(
+            (px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py)
+        )
+        picked = start + int(areas.argmax())
+        indices[i + 1] = picked
+    return indices
+
+
+def _decimation_indices(
+    x: Optional[np.ndarray], y: np.ndarray, max_points: int, method: str
+) -> np.ndarray:
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    if method == "lttb":
+        return lttb_indices(np.arange(len(y)) if x is None else x, y, max_points)
+    raise ValueError("Unknown preview method %s, expected minmax or lttb" % method)
+
+
+def _block_average(image: np.ndarray, max_side: int) -> np.ndarray:
+    height, width = image.shape[:2]
+    factor = -(-max(height, width) // max_side)
+    if factor <= 1:
+        return image
+    # the last rows and columns which don't fill a whole block are dropped
+    height, width = height // factor * factor, width // factor * factor
+    blocks = image[:height, :width].reshape(
+        height // factor, factor, width // factor, factor, *image.shape[2:]
+    )
+    averaged = blocks.mean(axis=(1, 3))
+    if np.issubdtype(image.dtype, np.integer):
+        return np.rint(averaged).astype(image.dtype)
+    return averaged.astype(image.dtype, copy=False)
+
+
+def _is_1d(value: Any) -> bool:
+    return isinstance(value, np.ndarray) and value.ndim == 1
+
+
+def preview_container(
+    dc: DataContainer,
+    max_points: Optional[int] = None,
+    max_side: Optional[int] = None,
+    method: Optional[str] = None,
+) -> DataContainer:
+    """
+    Display resolution version of a container, see the module documentation. The
+    defaults of the arguments are read from `FlojoyConfig`.
+    """
+    config = FlojoyConfig.get_instance()
+    max_points = max_points or config.preview_max_points
+    max_side = max_side or config.preview_max_side
+    method = method or config.preview_method
+    # only the keys which are decimated are read, the others (possibly `Lazy`) are
+    # shared with the preview as they are
+    dc_type = dc.get("type")
+    fields = {}
+
+    if dc_type == "ordered_pair":
+        x, y = dc.get("x"), dc.get("y")
+        if not (_is_1d(x) and _is_1d(y) and len(x) == len(y) > max_points):
+            return dc
+        indices = _decimation_indices(x, y, max_points, method)
+        fields["x"], fields["y"] = x[indices], y[indices]
+    elif dc_type == "vector":
+        v = dc.get("v")
+        if not (_is_1d(v) and len(v) > max_points):
+            return dc
+        fields["v"] = v[_decimation_indices(None, v, max_points, method)]
+    elif dc_type in ("matrix", "grayscale", "image"):
+        for key in DataContainer.type_keys_map[dc_type]:
+            value = dc.get(key)
+            if isinstance(value, np.ndarray) and value.ndim >= 2:
+                averaged = _block_average(value, max_side)
+                if averaged is not value:
+                    fields[key] = averaged
+        if not fields:
+            return dc
+    else:
+        return dc
+    return replace_fields(dc, fields)
+
+
+def preview_result(result: Any, **kwargs) -> Any:
+    """
+    Preview of a job result: a container, or an instruction dict (or list) holding
+    containers, which are replaced by their `preview_container`
+    """
+    if isinstance(result, DataContainer):
+        return preview_container(result, **kwargs)
+    if isinstance(result, dict):
+        previews = {
+            key: preview_result(value, **kwargs) for key, value in result.items()
+        }
+        if all(previews[key] is value for key, value in result.items()):
+            return result
+        return previews
+    if isinstance(result, list):
+        return [preview_result(value, **kwargs) for value in result]
+    return result
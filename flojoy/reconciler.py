@@ -3,9 +3,28 @@ Nodes should try to accomodate any reasonable combination of inputs that a first
 
 For example, the ADD node should make a best effort to do something reasonable when a matrix is added to a dataframe, or a 2 matrices of a different size are added.
 
-For this reason, we've created the `Reconciler` class to handle the process of turning different data types into compatible, easily added objects. 
+For this reason, we've created the `Reconciler` class to handle the process of turning different data types into compatible, easily added objects.
+
+Supported combinations:
+
+- two matrices: the smaller matrix is padded with `pad`, inside a single new buffer
+  holding every padded matrix. Matrices of the same shape are returned as they are.
+- a matrix and a scalar: the scalar becomes a read-only view broadcasting it to the
+  shape of the matrix, no array is filled.
+- two ordered pairs: both are resampled onto the union of their `x` values with linear
+  interpolation, points outside of the range of one of them take the value `pad`.
+  Ordered pairs already sharing the same `x` are returned as they are.
+- two dataframes: returned as they are, as pandas operations align them already.
+- a dataframe and a scalar: the scalar becomes a dataframe with the same labels.
+- a dataframe and a matrix: the matrix becomes a dataframe, with the labels of the
+  other dataframe where the sizes match.
+
+`reconcile_many` reconciles a list of containers (e.g. a `multiple` input) in one
+pass, writing them into one stacked array, and `stack` returns that array for
+reductions over the inputs.
 """
-from typing import Tuple
+
+from typing import List, Optional, Tuple
 import numpy
 
 from .data_container import DataContainer
@@ -29,6 +48,10 @@ class Reconciler:
             return self.reconcile__ordered_pair(lhs, rhs)
         elif types_to_reconcile == set(["matrix", "scalar"]):
             return self.reconcile__matrix_scalar(lhs, rhs)
+        elif types_to_reconcile == set(["dataframe"]):
+            return self.reconcile__dataframe(lhs, rhs)
+        elif types_to_reconcile == set(["dataframe", "scalar"]):
+            return self.reconcile__dataframe_scalar(lhs, rhs)
         elif types_to_reconcile == set(["matrix", "dataframe"]):
             return self.reconcile__dataframe_matrix(lhs, rhs)
         else:
@@ -37,42 +60,190 @@ class Reconciler:
                 % (lhs.type, rhs.type)
             )
 
+    def reconcile_many(self, dcs: List[DataContainer]) -> List[DataContainer]:
+        """
+        Reconciles any number of containers at once, e.g. the list of a `multiple`
+        input. The target shape (or `x` grid) is found once, and every container which
+        has to change is written into one stacked array: the returned containers are
+        views of it. Supports matrices and scalars, ordered pairs and dataframes, other
+        pairs of containers go through `reconcile`.
+        """
+        types_to_reconcile = set(dc.type for dc in dcs)
+        if types_to_reconcile in (set(["matrix"]), set(["matrix", "scalar"])):
+            shape = self.__target_shape(dcs)
+            if all(dc.type == "matrix" and dc.m.shape == shape for dc in dcs):
+                return list(dcs)
+            return [
+                DataContainer(type="matrix", m=m) for m in self.__stack_matrices(dcs)
+            ]
+        elif types_to_reconcile == set(["ordered_pair"]):
+            xs = [numpy.asarray(dc.x) for dc in dcs]
+            if all(x.shape == xs[0].shape and numpy.array_equal(x, xs[0]) for x in xs):
+                return list(dcs)
+            x, ys = self.__stack_ordered_pairs(dcs)
+            return [DataContainer(type="ordered_pair", x=x, y=y) for y in ys]
+        elif types_to_reconcile == set(["dataframe"]):
+            return list(dcs)
+        elif len(dcs) == 2:
+            return list(self.reconcile(dcs[0], dcs[1]))
+        else:
+            raise IrreconcilableContainersException(
+                "FloJoy doesn't know how to reconcile data containers of types %s"
+                % ", ".join(sorted(types_to_reconcile))
+            )
+
+    def stack(self, dcs: List[DataContainer]) -> numpy.ndarray:
+        """
+        Reconciled values of matrices and scalars (`m`) or of ordered pairs (`y`)
+        stacked along a new first axis, in a single allocation. Reductions over the
+        inputs then run on the stack, e.g. `reconciler.stack(inputs).sum(axis=0)`.
+        """
+        types_to_reconcile = set(dc.type for dc in dcs)
+        if types_to_reconcile in (set(["matrix"]), set(["matrix", "scalar"])):
+            return self.__stack_matrices(dcs)
+        elif types_to_reconcile == set(["ordered_pair"]):
+            return self.__stack_ordered_pairs(dcs)[1]
+        else:
+            raise IrreconcilableContainersException(
+                "FloJoy doesn't know how to stack data containers of types %s"
+                % ", ".join(sorted(types_to_reconcile))
+            )
+
+    def __target_shape(self, dcs: List[DataContainer]) -> Tuple[int, int]:
+        shapes = [dc.m.shape for dc in dcs if dc.type == "matrix"]
+        return (max(shape[0] for shape in shapes), max(shape[1] for shape in shapes))
+
+    def __stack_matrices(self, dcs: List[DataContainer]) -> numpy.ndarray:
+        final_r, final_c = self.__target_shape(dcs)
+        values = [dc.m if dc.type == "matrix" else dc.c for dc in dcs]
+        stacked = numpy.empty(
+            (len(dcs), final_r, final_c), dtype=numpy.result_type(*values, self.pad)
+        )
+        for out, dc, value in zip(stacked, dcs, values):
+            if dc.type == "scalar":
+                out[...] = value
+                continue
+            r, c = value.shape
+            out[:r, :c] = value
+            # only the margins are padded, the rest is written once
+            out[r:, :] = self.pad
+            out[:r, c:] = self.pad
+        return stacked
+
+    def __stack_ordered_pairs(
+        self, dcs: List[DataContainer]
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        xs = [numpy.asarray(dc.x) for dc in dcs]
+        x = self.__union_grid(xs)
+        stacked = numpy.empty(
+            (len(dcs), len(x)),
+            dtype=numpy.result_type(*[dc.y for dc in dcs], self.pad, numpy.float64),
+        )
+        for out, xp, dc in zip(stacked, xs, dcs):
+            self.__resample(xp, dc.y, x, out=out)
+        return x, stacked
+
     def reconcile__matrix(
         self, lhs: DataContainer, rhs: DataContainer
     ) -> Tuple[DataContainer, DataContainer]:
+        if lhs.m.shape == rhs.m.shape:
+            return lhs, rhs
+
         # make the matrices equal sizes, by padding
         final_r = max(lhs.m.shape[0], rhs.m.shape[0])
         final_c = max(lhs.m.shape[1], rhs.m.shape[1])
+        to_pad = [dc for dc in (lhs, rhs) if dc.m.shape != (final_r, final_c)]
 
-        new_lhs = numpy.pad(
-            lhs.m,
-            ((0, final_r - lhs.m.shape[0]), (0, final_c - lhs.m.shape[1])),
-            "constant",
-            constant_values=self.pad,
-        )
-        new_rhs = numpy.pad(
-            rhs.m,
-            ((0, final_r - rhs.m.shape[0]), (0, final_c - rhs.m.shape[1])),
-            "constant",
-            constant_values=self.pad,
+        # one allocation for all of the padded matrices
+        buffer = numpy.full(
+            (len(to_pad), final_r, final_c),
+            self.pad,
+            dtype=numpy.result_type(lhs.m, rhs.m, self.pad),
         )
+        padded = {}
+        for i, dc in enumerate(to_pad):
+            buffer[i, : dc.m.shape[0], : dc.m.shape[1]] = dc.m
+            padded[id(dc)] = DataContainer(type="matrix", m=buffer[i])
 
-        return (
-            DataContainer(type="matrix", m=new_lhs),
-            DataContainer(type="matrix", m=new_rhs),
-        )
+        return padded.get(id(lhs), lhs), padded.get(id(rhs), rhs)
 
     def reconcile__ordered_pair(
         self, lhs: DataContainer, rhs: DataContainer
     ) -> Tuple[DataContainer, DataContainer]:
-        raise NotImplementedError("TODO")
+        lhs_x, rhs_x = numpy.asarray(lhs.x), numpy.asarray(rhs.x)
+        if lhs_x.shape == rhs_x.shape and numpy.array_equal(lhs_x, rhs_x):
+            return lhs, rhs
+
+        x = self.__union_grid([lhs_x, rhs_x])
+        return (
+            DataContainer(type="ordered_pair", x=x, y=self.__resample(lhs_x, lhs.y, x)),
+            DataContainer(type="ordered_pair", x=x, y=self.__resample(rhs_x, rhs.y, x)),
+        )
+
+    def __union_grid(self, xs: List[numpy.ndarray]) -> numpy.ndarray:
+        # sorted union of the grids, a stable sort merges the runs of already sorted
+        # grids in linear time
+        x = numpy.concatenate([xp.ravel() for xp in xs])
+        x.sort(kind="stable")
+        if x.size > 1:
+            x = x[numpy.concatenate([[True], x[1:] != x[:-1]])]
+        return x
+
+    def __resample(self, xp, fp, x, out: Optional[numpy.ndarray] = None):
+        xp, fp = numpy.asarray(xp), numpy.asarray(fp)
+        if xp.size > 1 and numpy.any(xp[1:] < xp[:-1]):
+            order = numpy.argsort(xp, kind="stable")
+            xp, fp = xp[order], fp[order]
+        resampled = numpy.interp(x, xp, fp, left=self.pad, right=self.pad)
+        if out is None:
+            return resampled
+        out[...] = resampled
+        return out
 
     def reconcile__matrix_scalar(
         self, lhs: DataContainer, rhs: DataContainer
     ) -> Tuple[DataContainer, DataContainer]:
-        raise NotImplementedError("TODO")
+        matrix, scalar = (lhs, rhs) if lhs.type == "matrix" else (rhs, lhs)
+        # read-only view, no matrix of the scalar is allocated
+        expanded = DataContainer(
+            type="matrix", m=numpy.broadcast_to(numpy.asarray(scalar.c), matrix.m.shape)
+        )
+        return (matrix, expanded) if lhs is matrix else (expanded, matrix)
+
+    def reconcile__dataframe(
+        self, lhs: DataContainer, rhs: DataContainer
+    ) -> Tuple[DataContainer, DataContainer]:
+        # pandas operations are quite permissive already
+        return lhs, rhs
+
+    def reconcile__dataframe_scalar(
+        self, lhs: DataContainer, rhs: DataContainer
+    ) -> Tuple[DataContainer, DataContainer]:
+        import pandas  # optional, only needed for dataframes
+
+        df, scalar = (lhs, rhs) if lhs.type == "dataframe" else (rhs, lhs)
+        expanded = DataContainer(
+            type="dataframe",
+            m=pandas.DataFrame(
+                {column: numpy.full(len(df.m), scalar.c) for column in df.m.columns},
+                index=df.m.index,
+            ),
+        )
+        return (df, expanded) if lhs is df else (expanded, df)
 
     def reconcile__dataframe_matrix(
         self, lhs: DataContainer, rhs: DataContainer
     ) -> Tuple[DataContainer, DataContainer]:
-        raise NotImplementedError("TODO")
+        import pandas  # optional, only needed for dataframes
+
+        df, matrix = (lhs, rhs) if lhs.type == "dataframe" else (rhs, lhs)
+        rows, columns = matrix.m.shape[:2]
+        converted = DataContainer(
+            type="dataframe",
+            m=pandas.DataFrame(
+                matrix.m,
+                index=df.m.index if rows == len(df.m.index) else None,
+                columns=df.m.columns if columns == len(df.m.columns) else None,
+            ),
+        )
+        return (df, converted) if lhs is df else (converted, df)
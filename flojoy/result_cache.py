@@ -0,0 +1,256 @@
+"""
+Memoization of node results, enabled per node with `@flojoy(cache=True)`.
+
+A result is looked up by a key made of the identity of the node function (its
+qualified name and bytecode), the parameters it is called with and a content hash of
+its inputs. Arrays are hashed over their raw buffers with xxhash (XXH3, when the
+optional `xxhash` package is installed) or BLAKE2b, together with their dtype and
+shape.
+
+Cached results are made read-only: they are handed to every later run, so a consumer
+modifying them in place would corrupt the cache. Arrays a node passes through from its
+inputs are cached as read-only copies instead, the inputs are left alone. Read-only arrays can't change either,
+so their hashes are computed once and remembered for as long as the array lives, which
+makes hashing the inputs of a node fed by a cached node almost free.
+
+Nodes with an init container are never cached, as their result depends on state kept
+between runs.
+"""
+
+import hashlib
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .box import Box
+from .data_container import DataContainer
+
+try:
+    import xxhash
+
+    def _hasher():
+        return xxhash.xxh3_128()
+
+except ImportError:  # optional dependency
+
+    def _hasher():
+        return hashlib.blake2b(digest_size=16)
+
+
+__all__ = ["ResultCache", "fingerprint"]
+
+# inputs injected by the wrapper which don't change the result of a node
+_IGNORED_ARGS = ("default_params",)
+
+# digests of immutable arrays by `id`, arrays aren't hashable: each entry is removed
+# by a `weakref.finalize` when its array is freed, before the id can be reused
+_array_hashes: dict[int, bytes] = {}
+_array_hashes_lock = threading.Lock()
+
+
+def _forget_array(key: int):
+    with _array_hashes_lock:
+        _array_hashes.pop(key, None)
+
+
+def _is_immutable(array: np.ndarray) -> bool:
+    """Whether neither the array nor any array it is a view of can be written to"""
+    value: Any = array
+    while isinstance(value, np.ndarray):
+        if value.flags.writeable:
+            return False
+        value = value.base
+    return value is None or isinstance(value, bytes)
+
+
+def _array_digest(array: np.ndarray) -> bytes:
+    cacheable = _is_immutable(array)
+    if cacheable:
+        digest = _array_hashes.get(id(array))
+        if digest is not None:
+            return digest
+    h = _hasher()
+    h.update(("%s%s" % (array.dtype.str, array.shape)).encode())
+    if array.dtype.hasobject:
+        h.update(pickle.dumps(array.tolist(), protocol=5))
+    else:
+        h.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+    digest = h.digest()
+    if cacheable:
+        with _array_hashes_lock:
+            if id(array) not in _array_hashes:
+                weakref.finalize(array, _forget_array, id(array))
+            _array_hashes[id(array)] = digest
+    return digest
+
+
+def _update(h, value: Any):
+    if isinstance(value, np.ndarray):
+        h.update(b"nd")
+        h.update(_array_digest(value))
+    elif value is None or isinstance(value, (bool, int, float, str, np.generic)):
+        h.update(("%s:%r;" % (type(value).__name__, value)).encode())
+    elif isinstance(value, (bytes, bytearray)):
+        h.update(b"b%d;" % len(value))
+        h.update(value)
+    elif isinstance(value, (Box, dict)):
+        # DataContainers keep their keys in slots, boxes in their `__dict__`
+        items = (
+            vars(value).items()
+            if isinstance(value, Box) and not isinstance(value, DataContainer)
+            else value.items()
+        )
+        h.update(("%s{" % type(value).__name__).encode())
+        for key, field in items:
+            _update(h, key)
+            _update(h, field)
+        h.update(b"}")
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value, key=repr)
+        h.update(("%s[" % type(value).__name__).encode())
+        for item in value:
+            _update(h, item)
+        h.update(b"]")
+    elif hasattr(value, "__dict__"):
+        # parameter types (Array, NodeReference, ...)
+        h.update(("%s(" % type(value).__qualname__).encode())
+        _update(h, vars(value))
+        h.update(b")")
+    else:
+        h.update(pickle.dumps(value, protocol=5))
+
+
+def fingerprint(value: Any) -> bytes:
+    """Content hash of a result, a parameter or any nesting of them"""
+    h = _hasher()
+    _update(h, value)
+    return h.digest()
+
+
+def _arrays(value: Any):
+    """The arrays nested in `value`, without materializing lazy keys"""
+    if isinstance(value, np.ndarray):
+        yield value
+    elif isinstance(value, DataContainer):
+        for _, field in value._items(materialize=False):
+            yield from _arrays(field)
+    elif isinstance(value, (Box, dict)):
+        for field in vars(value).values() if isinstance(value, Box) else value.values():
+            yield from _arrays(field)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _arrays(item)
+
+
+def _freeze(value: Any, inputs: list[np.ndarray]) -> Any:
+    """
+    Makes the arrays of `value` read-only. Those which may share memory with one of
+    the `inputs` (e.g. a key passed through unchanged) are replaced by read-only
+    copies, the inputs belong to other nodes.
+    """
+    if isinstance(value, np.ndarray):
+        if any(np.may_share_memory(value, array) for array in inputs):
+            value = value.copy()
+        value.flags.writeable = False
+    elif isinstance(value, (Box, dict)):
+        fields = (
+            vars(value)
+            if isinstance(value, Box) and not isinstance(value, DataContainer)
+            else value
+        )
+        for key, field in list(fields.items()):
+            frozen = _freeze(field, inputs)
+            if frozen is not field:
+                value[key] = frozen
+    elif isinstance(value, list):
+        value[:] = [_freeze(item, inputs) for item in value]
+    elif isinstance(value, tuple):
+        value = tuple(_freeze(item, inputs) for item in value)
+    return value
+
+
+class ResultCache:
+    """
+    Least recently used cache of node results, bounded by the number of entries and
+    optionally by the total size of their arrays.
+    """
+
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = ResultCache()
+        return cls._instance
+
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[bytes, tuple[Any, int]]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, func: Callable, args: dict[str, Any]) -> Optional[bytes]:
+        """Cache key of a call of `func`, `None` when the call can't be cached"""
+        if "init_container" in args:
+            return None
+        code = getattr(func, "__code__", None)
+        h = _hasher()
+        _update(h, "%s.%s" % (func.__module__, func.__qualname__))
+        if code is not None:
+            h.update(code.co_code)
+            _update(h, [c for c in code.co_consts if not hasattr(c, "co_code")])
+        for name in sorted(args):
+            if name not in _IGNORED_ARGS:
+                _update(h, name)
+                _update(h, args[name])
+        return h.digest()
+
+    def get(self, key: bytes) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, result: Any, inputs: Any = None):
+        """
+        Caches the result of a call, `inputs` are its arguments: arrays of the result
+        sharing memory with them are cached as copies, so that the inputs stay
+        writable
+        """
+        from .job_result_utils import get_result_nbytes  # avoid circular import
+
+        # read-only inputs (e.g. cached upstream results) can be shared as they are
+        writable = [a for a in _arrays(inputs) if not _is_immutable(a)]
+        result = _freeze(result, writable)
+        nbytes = get_result_nbytes(result)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self.entries[key] = (result, nbytes)
+            self.nbytes += nbytes
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                _, (_, evicted_nbytes) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,323 @@
+"""
+Binary encoding of job results.
+
+A result (a `DataContainer`, an instruction dict built by `JobResultBuilder`, or any
+nesting of dicts/lists of them) is encoded as a small JSON header describing its
+structure followed by the raw buffers of its arrays, each aligned to `ALIGNMENT`
+bytes. Decoding rebuilds the structure with `numpy.frombuffer` views over the encoded
+buffer, so no array data is copied when the buffer lives in shared memory or in a
+memory-mapped file.
+
+Layout
+------
+```
+| MAGIC (4) | header size (uint32 little endian) | header (utf-8 json) | padding |
+| buffer 0 | padding | buffer 1 | padding | ...
+```
+
+Buffer offsets are relative to the end of the padded header, so the header is
+serialized once.
+
+With `compression` ("zlib", "lz4" or "zstd") every buffer of at least `min_nbytes`
+bytes is compressed on its own, and stored compressed only when that makes it
+smaller: fields that don't compress (e.g. noisy float arrays) keep their zero-copy
+decoding, the others decode into a fresh array. "lz4" and "zstd" need the optional
+`lz4` and `zstandard` packages.
+
+Values of any other type are pickled. Buffers read from a source other processes can
+write to should be decoded with `allow_pickle=False`: their pickled values may then
+only refer to the data types of flojoy, NumPy arrays and builtin types, as unpickling
+can run arbitrary code otherwise.
+"""
+
+import io
+import json
+import pickle
+import struct
+import zlib
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from . import data_container
+from .box import Box
+from .data_container import DataContainer
+
+__all__ = ["encode", "encode_into", "encoded_size", "decode"]
+
+MAGIC = b"FJR2"
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sI")
+# buffers smaller than this are never worth compressing
+DEFAULT_MIN_COMPRESSED_NBYTES = 4096
+
+
+def _codec(name: str) -> tuple[Callable, Callable]:
+    """`(compress(data, level), decompress(data))` functions of a compression codec"""
+    if name == "zlib":
+        return (
+            lambda data, level: zlib.compress(data, 6 if level is None else level),
+            zlib.decompress,
+        )
+    try:
+        if name == "lz4":
+            import lz4.frame
+
+            return (
+                lambda data, level: lz4.frame.compress(
+                    data, compression_level=level or 0
+                ),
+                lz4.frame.decompress,
+            )
+        if name == "zstd":
+            import zstandard
+
+            return (
+                lambda data, level: zstandard.ZstdCompressor(
+                    level=3 if level is None else level
+                ).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data),
+            )
+    except ImportError:
+        raise ValueError(
+            "%s compression needs the %s package"
+            % (name, "lz4" if name == "lz4" else "zstandard")
+        )
+    raise ValueError("Unknown compression %s, expected zlib, lz4 or zstd" % name)
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+_CONTAINER_CLASSES = {
+    name: cls
+    for name, cls in vars(data_container).items()
+    if isinstance(cls, type) and issubclass(cls, DataContainer)
+}
+
+# globals pickled values may refer to when decoded with `allow_pickle=False`
+_SAFE_GLOBALS = (
+    {("flojoy.data_container", name) for name in _CONTAINER_CLASSES}
+    | {
+        ("flojoy.box", "Box"),
+        ("flojoy.node_init", "NodeInitContainer"),
+        ("flojoy.parameter_types", "Array"),
+        ("flojoy.parameter_types", "NodeReference"),
+        ("numpy", "ndarray"),
+        ("numpy", "dtype"),
+        ("collections", "OrderedDict"),
+    }
+    | {
+        ("builtins", name)
+        for name in ("set", "frozenset", "complex", "slice", "range", "bytearray")
+    }
+    # array reconstruction functions, moved to `numpy._core` by NumPy 2
+    | {
+        (package + module, name)
+        for package in ("numpy.core.", "numpy._core.")
+        for module, name in (
+            ("multiarray", "_reconstruct"),
+            ("multiarray", "scalar"),
+            ("numeric", "_frombuffer"),
+        )
+    }
+)
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        if (module, name) not in _SAFE_GLOBALS:
+            raise pickle.UnpicklingError(
+                "%s.%s can't be decoded without allow_pickle" % (module, name)
+            )
+        return super().find_class(module, name)
+
+
+class _Plan:
+    """Walks a result once and collects its header and the buffers to write"""
+
+    def __init__(
+        self,
+        obj: Any,
+        compression: Optional[str] = None,
+        level: Optional[int] = None,
+        min_nbytes: int = DEFAULT_MIN_COMPRESSED_NBYTES,
+    ) -> None:
+        self.buffers: list[memoryview] = []
+        self.compression = compression
+        self.compress = _codec(compression)[0] if compression is not None else None
+        self.level = level
+        self.min_nbytes = min_nbytes
+        root = self._node(obj)
+        offsets = []
+        offset = 0
+        for buffer in self.buffers:
+            offsets.append(offset)
+            offset = _align(offset + buffer.nbytes)
+        self.header_bytes = json.dumps(
+            {
+                "root": root,
+                "buffers": [buffer.nbytes for buffer in self.buffers],
+                "offsets": offsets,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        header_end = _PREFIX.size + len(self.header_bytes)
+        if not self.buffers:
+            self.nbytes = header_end
+            self.offsets = []
+        else:
+            start = _align(header_end)
+            self.offsets = [start + offset for offset in offsets]
+            self.nbytes = start + offset
+
+    def _add_buffer(self, node: dict, buffer) -> dict:
+        view = memoryview(buffer).cast("B")
+        if self.compress is not None and view.nbytes >= self.min_nbytes:
+            compressed = self.compress(view, self.level)
+            if len(compressed) < view.nbytes:
+                view = memoryview(compressed)
+                node["z"] = self.compression
+        self.buffers.append(view)
+        node["buf"] = len(self.buffers) - 1
+        return node
+
+    def _node(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, str)):
+            return {"t": "v", "v": value}
+        if isinstance(value, (int, float)) and not isinstance(value, np.generic):
+            return {"t": "v", "v": value}
+        if isinstance(value, (np.ndarray, np.generic)):
+            array = np.asarray(value)
+            if array.dtype.hasobject or array.dtype.fields is not None:
+                return self._pickled(value)
+            node = {
+                "t": "nd" if isinstance(value, np.ndarray) else "np",
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+            return self._add_buffer(node, np.ascontiguousarray(array).view(np.uint8))
+        if isinstance(value, bytes):
+            return self._add_buffer({"t": "bytes"}, value)
+        if isinstance(value, DataContainer):
+            return {
+                "t": "dc",
+                "cls": type(value).__name__,
+                "fields": self._fields(value.to_dict().items()),
+            }
+        if isinstance(value, Box):
+            return {"t": "box", "fields": self._fields(value.to_dict().items())}
+        if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+            return {"t": "dict", "fields": self._fields(value.items())}
+        if isinstance(value, (list, tuple)):
+            return {
+                "t": "list" if isinstance(value, list) else "tuple",
+                "items": [self._node(v) for v in value],
+            }
+        return self._pickled(value)
+
+    def _fields(self, items) -> list:
+        return [[key, self._node(value)] for key, value in items]
+
+    def _pickled(self, value: Any) -> dict:
+        return self._add_buffer({"t": "pickle"}, pickle.dumps(value, protocol=5))
+
+    def write_into(self, target) -> None:
+        target = memoryview(target).cast("B")
+        if target.nbytes < self.nbytes:
+            raise ValueError(
+                "Buffer of %d bytes is too small for a result of %d bytes"
+                % (target.nbytes, self.nbytes)
+            )
+        _PREFIX.pack_into(target, 0, MAGIC, len(self.header_bytes))
+        start = _PREFIX.size
+        target[start : start + len(self.header_bytes)] = self.header_bytes
+        for offset, buffer in zip(self.offsets, self.buffers):
+            target[offset : offset + buffer.nbytes] = buffer
+
+
+def encoded_size(obj: Any) -> int:
+    return _Plan(obj).nbytes
+
+
+def encode_into(obj: Any, target) -> int:
+    """Encodes `obj` into a writable buffer and returns the number of bytes used"""
+    plan = _Plan(obj)
+    plan.write_into(target)
+    return plan.nbytes
+
+
+def encode(
+    obj: Any,
+    compression: Optional[str] = None,
+    level: Optional[int] = None,
+    min_nbytes: int = DEFAULT_MIN_COMPRESSED_NBYTES,
+) -> bytearray:
+    """
+    Encodes `obj`, compressing its buffers of at least `min_nbytes` bytes with
+    `compression` at the codec's default level unless `level` is given
+    """
+    plan = _Plan(obj, compression, level, min_nbytes)
+    target = bytearray(plan.nbytes)
+    plan.write_into(target)
+    return target
+
+
+def decode(buffer, copy: bool = False, allow_pickle: bool = True) -> Any:
+    """
+    Rebuilds an encoded result. Arrays are views over `buffer` unless `copy` is set,
+    so the buffer has to outlive the decoded result. Compressed buffers are always
+    decompressed into new arrays. Without `allow_pickle`, pickled values referring to
+    other types than those listed in the module documentation are rejected.
+    """
+    buffer = memoryview(buffer).cast("B")
+    magic, header_size = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Buffer does not contain an encoded job result")
+    start = _PREFIX.size
+    header = json.loads(bytes(buffer[start : start + header_size]))
+    sizes = header["buffers"]
+    base = _align(start + header_size)
+    offsets = [base + offset for offset in header["offsets"]]
+
+    def raw(node: dict):
+        index = node["buf"]
+        data = buffer[offsets[index] : offsets[index] + sizes[index]]
+        if "z" in node:
+            return bytearray(_codec(node["z"])[1](data))
+        return data
+
+    def build(node: dict) -> Any:
+        kind = node["t"]
+        if kind == "v":
+            return node["v"]
+        if kind in ("nd", "np"):
+            array = np.frombuffer(raw(node), dtype=np.dtype(node["dtype"]))
+            array = array.reshape(tuple(node["shape"]))
+            if copy and "z" not in node:
+                array = array.copy()
+            return array if kind == "nd" else array[()]
+        if kind == "bytes":
+            return bytes(raw(node))
+        if kind == "pickle":
+            if allow_pickle:
+                return pickle.loads(raw(node))
+            return _SafeUnpickler(io.BytesIO(raw(node))).load()
+        if kind == "dict":
+            return {key: build(value) for key, value in node["fields"]}
+        if kind == "list":
+            return [build(value) for value in node["items"]]
+        if kind == "tuple":
+            return tuple(build(value) for value in node["items"])
+        if kind == "box":
+            return Box({key: build(value) for key, value in node["fields"]})
+        if kind == "dc":
+            cls = _CONTAINER_CLASSES[node["cls"]]
+            container = cls.__new__(cls)
+            for key, value in node["fields"]:
+                setattr(container, key, build(value))
+            return container
+        raise ValueError("Unknown node type %s in encoded job result" % kind)
+
+    return build(header["root"])
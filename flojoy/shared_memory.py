@@ -0,0 +1,153 @@
+"""
+Job results kept in `multiprocessing.shared_memory` blocks.
+
+`post_job_result` encodes a result (see `serialization`) into a shared memory block
+once; any process that knows the name of the block rebuilds the result as NumPy views
+over it, so arrays are never copied when a `DataContainer` crosses a process boundary.
+Only the tiny `SharedResult` handle is pickled.
+"""
+
+import threading
+from collections.abc import MutableMapping
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterator
+
+from .serialization import decode, encode_into, encoded_size
+
+__all__ = ["SharedResult", "SharedMemoryJobResults", "share_result"]
+
+_lock = threading.Lock()
+# blocks attached by this process, kept open while decoded arrays may still point
+# into them
+_attached: dict[str, SharedMemory] = {}
+# blocks that were released but still had live views the last time we tried to close
+_closing: list[SharedMemory] = []
+
+
+def _close_released():
+    for shm in list(_closing):
+        try:
+            shm.close()
+        except BufferError:
+            continue
+        _closing.remove(shm)
+
+
+def _attach(name: str) -> SharedMemory:
+    with _lock:
+        shm = _attached.get(name)
+        if shm is None:
+            shm = SharedMemory(name=name)
+            _attached[name] = shm
+        return shm
+
+
+def _detach(name: str, unlink: bool):
+    with _lock:
+        shm = _attached.pop(name, None)
+        if shm is None:
+            if not unlink:
+                return
+            shm = SharedMemory(name=name)
+        if unlink:
+            shm.unlink()
+        _closing.append(shm)
+        _close_released()
+
+
+class SharedResult:
+    """Picklable handle to a job result stored in a shared memory block"""
+
+    def __init__(self, name: str, nbytes: int) -> None:
+        self.name = name
+        self.nbytes = nbytes
+
+    def load(self) -> Any:
+        """Rebuilds the result with arrays viewing the shared memory block"""
+        shm = _attach(self.name)
+        return decode(shm.buf[: self.nbytes])
+
+    def close(self):
+        """Releases this process' mapping of the block once no views are left"""
+        _detach(self.name, unlink=False)
+
+    def unlink(self):
+        """Frees the block, processes that still map it keep their views valid"""
+        _detach(self.name, unlink=True)
+
+    def __repr__(self):
+        return "SharedResult(name=%r, nbytes=%d)" % (self.name, self.nbytes)
+
+
+def share_result(result: Any) -> SharedResult:
+    """Writes a result to a new shared memory block, which the caller has to unlink"""
+    # the block may outlive the (worker) process creating it, so make sure it is
+    # tracked by the resource tracker shared with the parent process
+    resource_tracker.ensure_running()
+    nbytes = encoded_size(result)
+    shm = SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        encode_into(result, shm.buf)
+    finally:
+        shm.close()
+    return SharedResult(shm.name, nbytes)
+
+
+class SharedMemoryJobResults(MutableMapping):
+    """
+    Drop-in replacement for the `Dao.job_results` dict storing every result in shared
+    memory, enabled with `Dao.get_instance().use_shared_memory()`. Results are decoded
+    once per process and cached, `handle` gives the `SharedResult` to send to another
+    process instead of the result itself.
+    """
+
+    def __init__(self) -> None:
+        self.handles: dict[str, SharedResult] = {}
+        self.decoded: dict[str, Any] = {}
+
+    def __getitem__(self, job_id: str) -> Any:
+        if job_id not in self.decoded:
+            self.decoded[job_id] = self.handles[job_id].load()
+        return self.decoded[job_id]
+
+    def __setitem__(self, job_id: str, result: Any):
+        if isinstance(result, SharedResult):
+            self.adopt(job_id, result)
+            return
+        handle = share_result(result)
+        self._release(job_id)
+        # results are decoded lazily so the posted arrays can be garbage collected
+        self.handles[job_id] = handle
+
+    def __delitem__(self, job_id: str):
+        if job_id not in self.handles:
+            raise KeyError(job_id)
+        self._release(job_id)
+
+    def __contains__(self, job_id) -> bool:
+        return job_id in self.handles
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.handles)
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def adopt(self, job_id: str, handle: SharedResult):
+        """Takes ownership of a block written by another process"""
+        self._release(job_id)
+        self.handles[job_id] = handle
+
+    def handle(self, job_id: str) -> SharedResult:
+        return self.handles[job_id]
+
+    def _release(self, job_id: str):
+        self.decoded.pop(job_id, None)
+        handle = self.handles.pop(job_id, None)
+        if handle is not None:
+            handle.unlink()
+
+    def clear(self):
+        for job_id in list(self.handles):
+            self._release(job_id)
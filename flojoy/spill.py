@@ -0,0 +1,128 @@
+"""
+Second tier of the job result store.
+
+Results evicted from memory (see `Dao.set_job_results_budget`) are written to a
+scratch directory instead of being thrown away: every array goes to its own `.npy`
+file and the rest of the result (container types, keys, instructions) to a small
+pickle. Reading a spilled result memory-maps the `.npy` files, so only the pages a
+downstream node actually touches are loaded.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import urllib.parse
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .box import Box
+
+__all__ = ["SpillStore"]
+
+SKELETON_FILE = "result.pkl"
+
+
+class _SpilledArray:
+    """Placeholder for an array written to its own `.npy` file"""
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+
+
+def _map_arrays(value: Any, func: Callable[[Any], Any]) -> Any:
+    """Rebuilds a result with `func` applied to every array (or placeholder) in it"""
+    from .data_container import DataContainer  # avoid circular import
+
+    if isinstance(value, (np.ndarray, _SpilledArray)):
+        return func(value)
+    if isinstance(value, DataContainer):
+        container = type(value).__new__(type(value))
+        for key, field in value.to_dict().items():
+            setattr(container, key, _map_arrays(field, func))
+        return container
+    if isinstance(value, Box):
+        return Box({k: _map_arrays(v, func) for k, v in value.to_dict().items()})
+    if isinstance(value, dict):
+        return {k: _map_arrays(v, func) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_arrays(v, func) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_map_arrays(v, func) for v in value)
+    return value
+
+
+class SpillStore:
+    """
+    Keeps job results as `.npy` files in a new temporary directory, created under
+    `directory` when given. Only that directory is ever written to or removed, other
+    files under `directory` are left alone. Only results whose arrays take at least
+    `min_nbytes` are spilled, see `JobService.enable_spill`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, min_nbytes: int = 0) -> None:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="flojoy-spill-", dir=directory or None)
+        self.min_nbytes = min_nbytes
+        self.lock = threading.Lock()
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, urllib.parse.quote(job_id, safe=""))
+
+    def contains(self, job_id: str) -> bool:
+        return os.path.exists(os.path.join(self._job_dir(job_id), SKELETON_FILE))
+
+    def spill(self, job_id: str, result: Any):
+        job_dir = self._job_dir(job_id)
+        with self.lock:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            os.makedirs(job_dir)
+            count = 0
+
+            def write_array(array: np.ndarray):
+                nonlocal count
+                # empty and object arrays can't be memory-mapped, keep them inline
+                if array.size == 0 or array.dtype.hasobject:
+                    return array
+                file_name = "%d.npy" % count
+                count += 1
+                np.save(os.path.join(job_dir, file_name), array)
+                return _SpilledArray(file_name)
+
+            skeleton = _map_arrays(result, write_array)
+            with open(os.path.join(job_dir, SKELETON_FILE), "wb") as f:
+                pickle.dump(skeleton, f)
+
+    def load(self, job_id: str) -> Any:
+        """
+        Rebuilds a spilled result over copy-on-write memory maps: nodes can modify
+        their inputs in place without touching the files
+        """
+        job_dir = self._job_dir(job_id)
+        with open(os.path.join(job_dir, SKELETON_FILE), "rb") as f:
+            skeleton = pickle.load(f)
+        return _map_arrays(
+            skeleton,
+            lambda value: (
+                np.load(os.path.join(job_dir, value.file_name), mmap_mode="c")
+                if isinstance(value, _SpilledArray)
+                else value
+            ),
+        )
+
+    def delete(self, job_id: str):
+        with self.lock:
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def clear(self):
+        with self.lock:
+            for entry in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    def close(self):
+        """Removes the spilled results and their directory"""
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
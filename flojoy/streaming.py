@@ -0,0 +1,220 @@
+"""
+Streaming of unbounded signals through a jobset.
+
+A node written as a generator (or async generator) function yields chunks, e.g.
+`OrderedPair` blocks of N samples, instead of returning one container. The `flojoy`
+wrapper posts a `DataStream` over the generator right away, so the job finishes
+immediately and downstream nodes receive the stream as their input:
+
+```
+@flojoy
+def ACQUIRE(samples_per_chunk: int = 4096):
+    while True:
+        yield OrderedPair(x=..., y=daq.read(samples_per_chunk))
+
+@flojoy(prefetch=4)
+def LOWPASS(default: DataStream):
+    for chunk in default:
+        yield OrderedPair(x=chunk.x, y=filter(chunk.y))
+
+@flojoy
+def AVERAGE(default: DataStream):
+    total, count = 0.0, 0
+    for chunk in default:
+        ...
+    return Scalar(c=total / count)
+```
+
+Chunks are pulled by the consumer, so a stage never runs ahead of the one reading
+it. With `prefetch=N` a stage runs in its own thread (or task, for async
+generators) and produces at most N chunks ahead: stages of a pipeline overlap, and a
+slow consumer blocks the producer once the buffer is full. Nothing but the buffered
+chunks is ever held in memory.
+
+A stream can be consumed once, by a single downstream node, and only in the process
+that created it (i.e. not with `JobsetExecutor(use_processes=True)`).
+"""
+
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .data_container import DataContainer, replace_fields
+
+__all__ = ["DataStream", "iter_chunks", "concat_chunks"]
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class DataStream:
+    """
+    Single use stream of chunks (usually `DataContainer`s) produced by `source`, an
+    iterable or an async iterable. `prefetch` is the number of chunks a background
+    producer may buffer ahead of the consumer, 0 means chunks are produced on demand.
+    """
+
+    def __init__(self, source, prefetch: int = 0) -> None:
+        self.source = source
+        self.prefetch = prefetch
+        self.consumed = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_async(self) -> bool:
+        return hasattr(self.source, "__aiter__")
+
+    def _take(self):
+        with self.lock:
+            if self.consumed:
+                raise ValueError("A DataStream can only be consumed once")
+            self.consumed = True
+
+    def __iter__(self) -> Iterator[Any]:
+        self._take()
+        if self.is_async:
+            raise TypeError(
+                "Stream produced by an async generator, iterate it with `async for`"
+            )
+        if not self.prefetch:
+            return iter(self.source)
+        return self._prefetched(self.source)
+
+    def _prefetched(self, source: Iterable) -> Iterator[Any]:
+        buffer: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # gives up when the consumer went away, instead of blocking forever
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for chunk in source:
+                    if not put(chunk):
+                        break
+                else:
+                    put(_END)
+            except BaseException as e:
+                put(_Failure(e))
+            finally:
+                close = getattr(source, "close", None)
+                if stop.is_set() and close is not None:
+                    close()
+
+        def consume():
+            producer = threading.Thread(target=produce, daemon=True)
+            producer.start()
+            try:
+                while True:
+                    item = buffer.get()
+                    if item is _END:
+                        return
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    yield item
+            finally:
+                stop.set()
+
+        return consume()
+
+    async def __aiter__(self):
+        # not imported by the module, it slows down `import flojoy` noticeably
+        import asyncio
+
+        self._take()
+        if not self.is_async:
+            # sync producers run in a worker thread, so they never block the loop
+            iterator = (
+                self._prefetched(self.source) if self.prefetch else iter(self.source)
+            )
+            while True:
+                chunk = await asyncio.to_thread(next, iterator, _END)
+                if chunk is _END:
+                    return
+                yield chunk
+        elif not self.prefetch:
+            async for chunk in self.source:
+                yield chunk
+        else:
+            buffer: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+
+            async def produce():
+                try:
+                    async for chunk in self.source:
+                        await buffer.put(chunk)
+                    await buffer.put(_END)
+                except Exception as e:
+                    await buffer.put(_Failure(e))
+
+            producer = asyncio.ensure_future(produce())
+            try:
+                while True:
+                    item = await buffer.get()
+                    if item is _END:
+                        return
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    yield item
+            finally:
+                producer.cancel()
+
+    def __repr__(self):
+        return "DataStream(source=%r, prefetch=%d, consumed=%s)" % (
+            self.source,
+            self.prefetch,
+            self.consumed,
+        )
+
+
+def iter_chunks(dc: DataContainer, chunk_size: int) -> Iterator[DataContainer]:
+    """
+    Splits a container into containers of `chunk_size` samples: every array key is
+    sliced along its first axis (as views), the other keys are shared by all chunks
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1, got %d" % chunk_size)
+    fields = dict(dc.items())
+    lengths = [len(v) for v in fields.values() if isinstance(v, np.ndarray) and v.ndim]
+    if not lengths:
+        yield dc
+        return
+    for start in range(0, max(lengths), chunk_size):
+        yield replace_fields(
+            dc,
+            {
+                key: (
+                    value[start : start + chunk_size]
+                    if isinstance(value, np.ndarray) and value.ndim
+                    else value
+                )
+                for key, value in fields.items()
+            },
+        )
+
+
+def concat_chunks(chunks: Iterable[DataContainer]) -> Optional[DataContainer]:
+    """Joins chunks back into one container, the inverse of `iter_chunks`"""
+    chunks = list(chunks)
+    if not chunks:
+        return None
+    first = dict(chunks[0].items())
+    fields = {}
+    for key, value in first.items():
+        if isinstance(value, np.ndarray) and value.ndim:
+            fields[key] = np.concatenate([chunk[key] for chunk in chunks])
+        else:
+            fields[key] = value
+    return replace_fields(chunks[0], fields)
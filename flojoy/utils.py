@@ -1,6 +1,9 @@
+import logging
+import sys
 from typing import Any, Callable
 from .dao import Dao
 from .config import FlojoyConfig
+from .log import configure_logging, set_log_level, shutdown_logging
 from .node_init import NodeInit, NodeInitService
 
 
@@ -26,14 +29,32 @@ def set_online():
 def set_debug_on():
     """
     Sets the print_on flag to True, which means that the print statements will be executed.
+    Debug logs of the flojoy modules are printed to stdout as well.
     """
     FlojoyConfig.get_instance().to_print = True
+    configure_logging(level=logging.DEBUG, stream=sys.stdout, json_lines=False)
 
 def set_debug_off():
     """
     Sets the print_on flag to False, which means that the print statements will not be executed.
     """
     FlojoyConfig.get_instance().to_print = False
+    shutdown_logging()
+    set_log_level(logging.NOTSET)
+
+def set_validation_on():
+    """
+    Sets the validate_results flag to True, which means that the DataContainers returned by nodes are validated before being posted.
+    """
+    FlojoyConfig.get_instance().validate_results = True
+
+
+def set_validation_off():
+    """
+    Sets the validate_results flag to False, which means that node results are posted without validation.
+    """
+    FlojoyConfig.get_instance().validate_results = False
+
 
 def clear_flojoy_memory():
     Dao.get_instance().clear_job_results()
@@ -6,7 +6,7 @@ def read_requirements():
 
 setup(
     name="flojoy",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     package_data={"flojoy": ["__init__.pyi"]},
     version="0.1.5-dev15",
     license="MIT",
@@ -25,6 +25,12 @@ setup(
     ],
     python_requires=">=3.10",
     install_requires=read_requirements(),
+    extras_require={
+        "fast-hash": ["xxhash"],
+        "lz4": ["lz4"],
+        "zstd": ["zstandard"],
+        "venv": ["cloudpickle"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
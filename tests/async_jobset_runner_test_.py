@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import numpy
+import pytest
+
+from flojoy import DataContainer, JobService, flojoy
+from flojoy.async_jobset_runner import AsyncJobsetRunner, run_jobset_async
+from flojoy.jobset_executor import Job, JobsetExecutor
+from flojoy.utils import clear_flojoy_memory
+
+
+@flojoy
+def SOURCE():
+    x = numpy.arange(10)
+    return DataContainer(x=x, y=x)
+
+
+@flojoy
+async def POLL(default: DataContainer):
+    await asyncio.sleep(0.2)
+    return DataContainer(x=default.x, y=default.y + 1)
+
+
+@flojoy
+def COMBINE(a: DataContainer, b: DataContainer):
+    return DataContainer(x=a.x, y=a.y + b.y)
+
+
+@flojoy
+async def FAIL():
+    await asyncio.sleep(0)
+    raise RuntimeError("instrument unreachable")
+
+
+def edge(job_id, input_name="default"):
+    return {"job_id": job_id, "input_name": input_name, "edge": "default"}
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    clear_flojoy_memory()
+    yield
+    clear_flojoy_memory()
+
+
+def test_async_node_can_be_awaited_directly():
+    SOURCE(node_id="src", job_id="src", jobset_id="")
+    result = asyncio.run(
+        POLL(node_id="poll", job_id="poll", jobset_id="", previous_jobs=[edge("src")])
+    )
+    assert numpy.array_equal(result.y, numpy.arange(10) + 1)
+    assert JobService().get_job_result("poll") is result
+
+
+def test_async_nodes_wait_concurrently():
+    jobs = [Job("src", SOURCE)] + [
+        Job("poll%d" % i, POLL, previous_jobs=[edge("src")]) for i in range(100)
+    ]
+    start = time.perf_counter()
+    results = run_jobset_async(jobs)
+    assert time.perf_counter() - start < 2
+    assert len(results) == 100
+
+
+def test_async_and_sync_nodes_mix():
+    jobs = [
+        Job("src", SOURCE),
+        Job("a", POLL, previous_jobs=[edge("src")]),
+        Job("b", POLL, previous_jobs=[edge("src")]),
+        Job("sum", COMBINE, previous_jobs=[edge("a", "a"), edge("b", "b")]),
+    ]
+    results = asyncio.run(AsyncJobsetRunner(jobs, max_concurrency=1).run())
+    assert list(results) == ["sum"]
+    assert numpy.array_equal(results["sum"].y, (numpy.arange(10) + 1) * 2)
+
+
+def test_intermediate_results_can_be_released():
+    jobs = [
+        Job("src", SOURCE),
+        Job("a", POLL, previous_jobs=[edge("src")]),
+        Job("b", POLL, previous_jobs=[edge("src")]),
+    ]
+    results = run_jobset_async(jobs, release_results=True)
+    assert sorted(results) == ["a", "b"]
+    assert not JobService().job_exists("src")
+    assert JobService().job_exists("a") and JobService().job_exists("b")
+
+
+def test_jobs_downstream_of_a_failure_do_not_run():
+    calls = []
+
+    @flojoy
+    def CONSUMER(default: DataContainer):
+        calls.append(default)
+        return default
+
+    jobs = [
+        Job("fail", FAIL),
+        Job("consumer", CONSUMER, previous_jobs=[edge("fail")]),
+        Job("next", CONSUMER, previous_jobs=[edge("consumer")]),
+    ]
+    with pytest.raises(RuntimeError):
+        run_jobset_async(jobs)
+    assert calls == []
+    assert not JobService().job_exists("consumer")
+
+
+def test_executor_runs_async_nodes():
+    jobs = [
+        Job("src", SOURCE),
+        Job("a", POLL, previous_jobs=[edge("src")]),
+        Job("b", POLL, previous_jobs=[edge("src")]),
+        Job("sum", COMBINE, previous_jobs=[edge("a", "a"), edge("b", "b")]),
+    ]
+    results = JobsetExecutor(jobs).run()
+    assert list(results) == ["sum"]
+    assert numpy.array_equal(results["sum"].y, (numpy.arange(10) + 1) * 2)
+    assert JobService().job_exists("a")
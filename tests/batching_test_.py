@@ -0,0 +1,109 @@
+import numpy
+import pytest
+
+from flojoy import JobService, OrderedPair, Scalar, flojoy
+from flojoy.batching import stack_containers, unstack_container
+from flojoy.jobset_executor import Job, JobsetExecutor
+from flojoy.utils import clear_flojoy_memory
+
+calls = []
+
+
+@flojoy
+def SOURCE(default_params=None, offset: float = 0.0, samples: int = 4):
+    x = numpy.arange(samples, dtype=float)
+    return OrderedPair(x=x, y=x + offset)
+
+
+@flojoy(batch=True)
+def GAIN(default: OrderedPair, gain: float = 2.0):
+    calls.append(default.y.shape)
+    return OrderedPair(x=default.x, y=default.y * gain)
+
+
+def source_job(i, samples=4):
+    return Job(
+        "source-%d" % i,
+        SOURCE,
+        ctrls={
+            "offset": {"param": "offset", "value": i, "type": "float"},
+            "samples": {"param": "samples", "value": samples, "type": "int"},
+        },
+        function_parameters={"offset", "samples"},
+    )
+
+
+def gain_job(i):
+    return Job(
+        "gain-%d" % i,
+        GAIN,
+        previous_jobs=[
+            {"job_id": "source-%d" % i, "input_name": "default", "edge": "default"}
+        ],
+        ctrls={"gain": {"param": "gain", "value": 3, "type": "float"}},
+        function_parameters={"gain"},
+    )
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    clear_flojoy_memory()
+    calls.clear()
+    yield
+    clear_flojoy_memory()
+
+
+def test_stack_and_unstack_containers():
+    stacked = stack_containers([Scalar(c=1), Scalar(c=2), Scalar(c=3)])
+    assert stacked.c.shape == (3,) and stacked.type == "scalar"
+    parts = unstack_container(stacked, 3)
+    assert [part.c for part in parts] == [1, 2, 3]
+    with pytest.raises(ValueError, match="shapes"):
+        stack_containers([OrderedPair(x=[1, 2], y=[1, 2]), OrderedPair(x=[1], y=[1])])
+    with pytest.raises(ValueError, match="rows"):
+        unstack_container(OrderedPair(x=[1, 2], y=[1, 2]), 3)
+
+
+def test_executor_runs_ready_jobs_in_one_batch():
+    count = 8
+    # the sources ran before, so that all of the gain jobs are ready at once
+    JobsetExecutor([source_job(i) for i in range(count)]).run()
+    results = JobsetExecutor([gain_job(i) for i in range(count)]).run()
+
+    assert calls == [(count, 4)]
+    for i in range(count):
+        numpy.testing.assert_array_equal(
+            results["gain-%d" % i].y, (numpy.arange(4) + i) * 3
+        )
+        assert JobService().get_job_result("gain-%d" % i) is results["gain-%d" % i]
+
+
+def test_unstackable_jobs_run_one_by_one():
+    jobs = [source_job(0, samples=4), source_job(1, samples=5)]
+    jobs += [gain_job(0), gain_job(1)]
+    results = JobsetExecutor(jobs, max_workers=2).run()
+
+    assert sorted(calls) == [(1, 4), (1, 5)]
+    assert results["gain-1"].y.shape == (5,)
+
+
+def test_batched_node_called_directly():
+    JobService().post_job_result("source", OrderedPair(x=[0, 1], y=[1, 2]))
+    result = GAIN(
+        node_id="GAIN",
+        job_id="gain",
+        jobset_id="",
+        previous_jobs=[
+            {"job_id": "source", "input_name": "default", "edge": "default"}
+        ],
+    )
+    assert calls == [(1, 2)]
+    assert result.y.tolist() == [2, 4]
+
+
+def test_batch_rejects_unsupported_nodes():
+    with pytest.raises(ValueError):
+
+        @flojoy(batch=True, cache=True)
+        def CACHED(default: OrderedPair):
+            return default
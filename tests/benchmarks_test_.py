@@ -0,0 +1,31 @@
+import json
+
+from benchmarks import compare, load, registered, run, save
+
+
+def test_every_benchmark_runs(tmp_path):
+    results = run(sizes=[16], repeat=1, number=1)
+    names = set(result["name"] for result in results)
+    assert names == set(bench.name for bench in registered())
+    assert all(result["best"] > 0 for result in results)
+
+    path = str(tmp_path / "results.json")
+    save(results, path)
+    with open(path) as f:
+        assert "environment" in json.load(f)
+    assert load(path) == json.loads(json.dumps(results))
+
+
+def test_compare_reports_regressions():
+    baseline = [
+        {"name": "a", "param": None, "best": 1.0},
+        {"name": "b", "param": 10, "best": 1.0},
+    ]
+    current = [
+        {"name": "a", "param": None, "best": 1.05},
+        {"name": "b", "param": 10, "best": 2.0},
+        {"name": "c", "param": None, "best": 1.0},
+    ]
+    rows, regressions = compare(baseline, current, threshold=0.1)
+    assert [row[0] for row in rows] == ["a", "b[10]"]
+    assert regressions == ["b[10]"]
@@ -0,0 +1,132 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pytest
+
+from flojoy import JobResultBuilder, OrderedPair, SmallMemory
+from flojoy.dao import Dao
+from flojoy.dao_backends import DiskBackend, InMemoryBackend, RedisBackend
+from flojoy.node_init import NodeInit, NodeInitContainer, NodeInitService
+
+from .fake_redis_server import FakeRedisServer
+
+
+@pytest.fixture(params=["memory", "disk", "disk+zlib", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryBackend()
+    elif request.param == "disk":
+        yield DiskBackend(str(tmp_path))
+    elif request.param == "disk+zlib":
+        yield DiskBackend(str(tmp_path), compression="zlib")
+    else:
+        with FakeRedisServer() as server:
+            backend = RedisBackend(port=server.port)
+            yield backend
+            backend.close()
+
+
+@pytest.fixture
+def dao(backend):
+    dao = Dao.get_instance()
+    dao.set_backend(backend)
+    yield dao
+    dao.set_backend(InMemoryBackend())
+
+
+def test_job_results_round_trip(dao):
+    result = (
+        JobResultBuilder()
+        .from_data(OrderedPair(x=numpy.arange(4), y=numpy.ones((4, 2))))
+        .flow_to_nodes(["next"])
+        .build()
+    )
+    dao.post_job_result("job", result)
+    assert dao.job_exists("job")
+    stored = dao.get_job_result("job")
+    assert stored["__flow_to_nodes__"] == ["next"]
+    assert stored["data"].type == "ordered_pair"
+    assert numpy.array_equal(stored["data"].y, numpy.ones((4, 2)))
+    # nodes may modify their inputs in place
+    stored["data"].y[0, 0] = 5
+    dao.delete_job("job")
+    assert not dao.job_exists("job")
+    with pytest.raises(ValueError):
+        dao.get_job_result("job")
+
+
+def test_small_memory_and_sets(dao):
+    memory = SmallMemory()
+    memory.write_to_memory("job", "array", numpy.arange(6).reshape(2, 3))
+    memory.write_to_memory("job", "dict", {"a": 1})
+    assert numpy.array_equal(
+        memory.read_memory("job", "array"), numpy.arange(6).reshape(2, 3)
+    )
+    assert memory.read_memory("job", "dict") == {"a": 1}
+
+    dao.add_to_set("ids", "a")
+    dao.add_to_set("ids", "b")
+    dao.remove_item_from_set("ids", "a")
+    assert dao.get_set_list("ids") == ["b"]
+    dao.clear_small_memory()
+    assert dao.get_set_list("ids") is None
+
+
+def test_init_container(dao):
+    NodeInit(lambda: {"connected": True}).run("node")
+    assert NodeInitService().get_init_store("node").get() == {"connected": True}
+    dao.clear_node_init_containers()
+    assert not dao.has_init_container("node")
+
+
+class Payload:
+    """Stand-in for an arbitrary object, pickled when stored"""
+
+
+def _post_from_worker(directory: str):
+    backend = DiskBackend(directory)
+    backend.namespace("job_results")["worker"] = OrderedPair(
+        x=numpy.arange(3), y=numpy.arange(3) * 2
+    )
+
+
+def test_disk_backend_is_shared_between_processes(tmp_path):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(_post_from_worker, str(tmp_path)).result()
+    dao = Dao(DiskBackend(str(tmp_path)))
+    assert numpy.array_equal(dao.get_job_result("worker").y, [0, 2, 4])
+
+
+def test_redis_backend_is_shared_between_connections():
+    with FakeRedisServer() as server:
+        writer = Dao(RedisBackend(port=server.port))
+        reader = Dao(RedisBackend(port=server.port))
+        writer.post_job_result("job", OrderedPair(x=[1, 2], y=[3, 4]))
+        assert numpy.array_equal(reader.get_job_result("job").y, [3, 4])
+        reader.clear_job_results()
+        assert not writer.job_exists("job")
+
+
+def test_redis_key_prefixes_are_matched_literally():
+    with FakeRedisServer() as server:
+        starred = RedisBackend(port=server.port, key_prefix="a*")
+        other = RedisBackend(port=server.port, key_prefix="ab")
+        starred.namespace("job_results")["job"] = 1
+        other.namespace("job_results")["other"] = 2
+        assert list(starred.namespace("job_results")) == ["job"]
+        starred.namespace("job_results").clear()
+        assert list(other.namespace("job_results")) == ["other"]
+
+
+def test_redis_backend_only_unpickles_known_types():
+    with FakeRedisServer() as server:
+        backend = RedisBackend(port=server.port)
+        values = backend.namespace("small_memory")
+        values["container"] = NodeInitContainer({"connected": True})
+        assert values["container"].get() == {"connected": True}
+        values["payload"] = Payload()
+        with pytest.raises(pickle.UnpicklingError):
+            values["payload"]
+        trusted = RedisBackend(port=server.port, allow_pickle=True)
+        assert isinstance(trusted.namespace("small_memory")["payload"], Payload)
@@ -0,0 +1,170 @@
+import pickle
+
+import numpy
+import pytest
+
+from flojoy import (
+    DataContainer,
+    Image,
+    Lazy,
+    Matrix,
+    OrderedPair,
+    ParametricVector,
+    Scalar,
+    Vector,
+)
+from flojoy.job_result_utils import get_result_nbytes
+
+
+def test_typed_containers_store_keys_in_slots():
+    dc = OrderedPair(x=[1, 2], y=[3, 4])
+    assert "x" in OrderedPair.__slots__
+    assert dc.__dict__ == {}
+    assert numpy.array_equal(dc.x, [1, 2])
+    assert numpy.array_equal(dc["y"], [3, 4])
+    assert dc.keys() == ["type", "x", "y", "extra"]
+
+
+def test_item_and_attribute_api_is_unchanged():
+    dc = OrderedPair(x=[1, 2], y=[3, 4])
+    dc["t"] = [0, 1]
+    dc.y = numpy.zeros(2)
+    assert numpy.array_equal(dc.t, [0, 1])
+    assert numpy.array_equal(dc["y"], [0, 0])
+    assert dc.get("z") is None
+    assert "t" in dc and "z" not in dc
+    with pytest.raises(KeyError):
+        dc["z"]
+    assert list(dc.to_dict()) == ["type", "x", "y", "extra", "t"]
+
+
+def test_generic_container_accepts_any_key():
+    dc = DataContainer(type="matrix", m=numpy.eye(2))
+    assert dc.type == "matrix"
+    assert dc.to_dict()["m"].shape == (2, 2)
+    copied = dc.copy()
+    assert copied.m is dc.m
+
+
+def test_containers_can_be_pickled():
+    dc = pickle.loads(pickle.dumps(Scalar(c=3, extra={"unit": "V"})))
+    assert isinstance(dc, Scalar)
+    assert dc.c == 3 and dc.extra == {"unit": "V"}
+
+
+def test_from_arrays_stores_arrays_without_copy():
+    x = numpy.arange(5.0)
+    y = numpy.ones(5)
+    dc = OrderedPair.from_arrays(x, y)
+    assert isinstance(dc, OrderedPair) and dc.type == "ordered_pair"
+    assert dc.x is x and dc.y is y and dc.extra is None
+    copied = OrderedPair.from_arrays(x, y, copy=True)
+    assert copied.x is not x and numpy.array_equal(copied.x, x)
+
+
+def test_from_arrays_checks_its_arguments():
+    with pytest.raises(TypeError):
+        OrderedPair.from_arrays(numpy.arange(3))
+    with pytest.raises(TypeError):
+        Scalar.from_arrays(numpy.arange(3))
+    with pytest.raises(ValueError):
+        Matrix.from_arrays(numpy.array([object()]))
+    image = Image.from_arrays(*(numpy.zeros((2, 2)) for _ in range(3)))
+    assert image.a is None
+    with pytest.raises(ValueError):
+        OrderedPair.from_arrays(numpy.arange(3), numpy.arange(4))
+    with pytest.raises(ValueError):
+        Image.from_arrays(numpy.zeros((2, 2)), numpy.zeros((2, 2)), numpy.zeros(4))
+    with pytest.raises(ValueError):
+        ParametricVector.from_arrays(numpy.zeros((2, 3)), numpy.arange(3))
+
+
+def test_numpy_scalars_and_array_subclasses_are_accepted():
+    dc = DataContainer(x=numpy.int64(3), y=numpy.ma.masked_array([1, 2]))
+    assert numpy.array_equal(dc.x, [3])
+    assert isinstance(dc.y, numpy.ma.MaskedArray)
+    assert Vector.from_arrays(numpy.float32(2)).v.shape == (1,)
+
+
+def test_validate_accepts_well_formed_containers():
+    OrderedPair(x=[1, 2, 3], y=[4, 5, 6]).validate()
+    Image(
+        r=numpy.zeros((2, 2)), g=numpy.zeros((2, 2)), b=numpy.zeros((2, 2))
+    ).validate()
+    dc = DataContainer(
+        type="parametric_ordered_pair",
+        t=numpy.arange(3),
+        x=numpy.zeros((3, 5)),
+        y=numpy.ones((3, 5)),
+    )
+    dc.validate()
+
+
+def test_validate_rejects_malformed_containers():
+    with pytest.raises(ValueError, match="ascending"):
+        DataContainer(
+            type="parametric_scalar", t=numpy.array([0, 2, 1]), c=numpy.zeros(3)
+        ).validate()
+    with pytest.raises(ValueError, match="one per t value"):
+        DataContainer(
+            type="parametric_matrix", t=numpy.arange(3), m=numpy.zeros((2, 2))
+        ).validate()
+    with pytest.raises(ValueError, match="matching shapes"):
+        OrderedPair(x=[1, 2, 3], y=[4, 5]).validate()
+    with pytest.raises(ValueError, match="matching shapes"):
+        Image(
+            r=numpy.zeros((2, 2)), g=numpy.zeros((2, 3)), b=numpy.zeros((2, 2))
+        ).validate()
+    with pytest.raises(ValueError, match="together"):
+        DataContainer(type="matrix", m=numpy.zeros((2, 2)), x=[1, 2]).validate()
+    with pytest.raises(KeyError):
+        DataContainer(type="ordered_pair", x=[1, 2]).validate()
+
+
+def test_validation_can_be_disabled_per_container():
+    dc = OrderedPair(x=[1, 2, 3], y=[4, 5])
+    dc.disable_validation()
+    dc.validate()
+    assert "_skip_validation" not in dc.keys()
+    assert "_skip_validation" not in dc
+    assert "_skip_validation" not in dc.to_dict()
+    dc.enable_validation()
+    with pytest.raises(ValueError):
+        dc.validate()
+
+
+def test_lazy_keys_are_computed_on_first_read():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return numpy.arange(4)
+
+    dc = Matrix(m=Lazy(compute))
+    assert dc.is_lazy("m")
+    assert "m" in dc and dc.keys() == ["type", "extra", "m"]
+    dc.validate()
+    assert get_result_nbytes(dc) == 0
+    assert calls == []
+    assert list(dc.m) == [0, 1, 2, 3]
+    assert list(dc["m"]) == [0, 1, 2, 3]
+    assert calls == [1] and not dc.is_lazy("m")
+
+    dc = DataContainer(type="vector")
+    dc["v"] = Lazy(lambda: [1, 2])
+    copied = dc.copy()
+    assert list(dc.v) == [1, 2]
+    assert copied.is_lazy("v")
+    dc.set_lazy("v", lambda: [3])
+    dc["v"] = [4]
+    assert list(dc.v) == [4]
+
+
+def test_lazy_npy_path_is_memory_mapped(tmp_path):
+    path = tmp_path / "m.npy"
+    numpy.save(path, numpy.eye(3))
+    dc = Matrix(m=Lazy(str(path)))
+    assert isinstance(dc.m, numpy.memmap)
+    assert numpy.array_equal(dc.m, numpy.eye(3))
+    dc.m[0, 0] = 5
+    assert numpy.load(path)[0, 0] == 1
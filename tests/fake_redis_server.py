@@ -0,0 +1,109 @@
+"""
+In-process stand-in for a Redis server, speaking just enough of the RESP protocol
+for `RedisBackend`.
+"""
+
+import fnmatch
+import re
+import socketserver
+import threading
+
+
+def _fnmatch_pattern(pattern: str) -> str:
+    # Redis glob patterns escape characters with a backslash, fnmatch with brackets
+    return re.sub(r"\\(.)", lambda m: "[%s]" % m.group(1), pattern)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line[:1] == b"*"
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size))
+            self.rfile.read(2)
+        return args
+
+    def _write(self, reply):
+        if reply is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(reply, str):
+            self.wfile.write(b"+%s\r\n" % reply.encode())
+        elif isinstance(reply, int):
+            self.wfile.write(b":%d\r\n" % reply)
+        elif isinstance(reply, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(reply), reply))
+        elif isinstance(reply, list):
+            self.wfile.write(b"*%d\r\n" % len(reply))
+            for item in reply:
+                self._write(item)
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command, args = args[0].upper(), args[1:]
+            with server.lock:
+                reply = server.execute(command, args)
+            self._write(reply)
+            self.wfile.flush()
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def execute(self, command, args):
+        data = self.data
+        if command == b"SELECT":
+            return "OK"
+        if command == b"GET":
+            value = data.get(args[0])
+            return value if isinstance(value, bytes) else None
+        if command == b"SET":
+            data[args[0]] = args[1]
+            return "OK"
+        if command == b"DEL":
+            return sum(1 for key in args if data.pop(key, None) is not None)
+        if command == b"EXISTS":
+            return int(args[0] in data)
+        if command == b"SCAN":
+            pattern = _fnmatch_pattern(args[args.index(b"MATCH") + 1].decode())
+            keys = [k for k in data if fnmatch.fnmatchcase(k.decode(), pattern)]
+            return [b"0", keys]
+        if command == b"SADD":
+            members = data.setdefault(args[0], set())
+            added = len(set(args[1:]) - members)
+            members.update(args[1:])
+            return added
+        if command == b"SREM":
+            members = data.get(args[0], set())
+            removed = len(members & set(args[1:]))
+            members.difference_update(args[1:])
+            return removed
+        if command == b"SMEMBERS":
+            return list(data.get(args[0], set()))
+        return "OK"
@@ -121,3 +121,61 @@ def test_run_in_venv_does_not_hang_on_error(mock_venv_cache_dir):
     # Run the function and expect an error
     with pytest.raises(ZeroDivisionError):
         empty_function_with_error()
+
+
+def test_run_in_venv_reuses_warm_workers(mock_venv_cache_dir):
+    import numpy
+
+    from flojoy import OrderedPair, run_in_venv
+
+    @run_in_venv(pip_dependencies=[], max_workers=1)
+    def scale(dc, factor):
+        import os
+
+        print("printed output does not corrupt the protocol")
+        return OrderedPair(x=dc.x, y=dc.y * factor), os.getpid()
+
+    dc = OrderedPair(x=numpy.arange(1_000_000.0), y=numpy.ones(1_000_000))
+    first, first_pid = scale(dc, 2)
+    second, second_pid = scale(first, 3)
+    assert first_pid == second_pid
+    numpy.testing.assert_array_equal(second.y, numpy.full(1_000_000, 6.0))
+
+
+def _pid_in_venv(_):
+    from flojoy import run_in_venv
+
+    @run_in_venv(pip_dependencies=[])
+    def pid():
+        import os
+
+        return os.getpid()
+
+    return pid()
+
+
+def test_processes_starting_together_share_one_environment(mock_venv_cache_dir):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # forked, so that the workers see the patched cache directory
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(3, mp_context=context) as pool:
+        pids = list(pool.map(_pid_in_venv, range(3)))
+    assert len(set(pids)) == 3
+    assert len(os.listdir(mock_venv_cache_dir)) == 2  # the environment and its lock
+
+
+def test_run_in_venv_prefers_the_numpy_of_the_environment(mock_venv_cache_dir):
+    import numpy
+
+    from flojoy import OrderedPair, run_in_venv
+
+    @run_in_venv(pip_dependencies=["numpy==1.26.4"])
+    def numpy_version(dc):
+        import numpy
+
+        return numpy.__version__, float(dc.y.sum())
+
+    dc = OrderedPair(x=numpy.arange(2.0), y=numpy.array([3.0, 4.0]))
+    assert numpy_version(dc) == ("1.26.4", 7.0)
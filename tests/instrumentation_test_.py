@@ -0,0 +1,96 @@
+import json
+
+import numpy
+import pytest
+
+from flojoy import DataContainer, Vector, disable_tracing, enable_tracing, flojoy
+from flojoy.job_service import JobService
+
+
+@flojoy
+def DOUBLE(default: DataContainer) -> DataContainer:
+    return Vector(v=default.v * 2)
+
+
+@flojoy
+def FAIL() -> DataContainer:
+    raise RuntimeError("node failed")
+
+
+@pytest.fixture
+def tracer():
+    tracer = enable_tracing(trace_memory=True)
+    yield tracer
+    disable_tracing()
+
+
+def test_tracer_records_every_phase(tracer, tmp_path):
+    JobService().post_job_result("SOURCE-1", Vector(v=numpy.arange(1000.0)))
+    seen = []
+    tracer.add_hook(lambda node, phase: seen.append(phase and phase.phase))
+    DOUBLE(
+        node_id="DOUBLE-1",
+        job_id="DOUBLE-1",
+        jobset_id="",
+        previous_jobs=[
+            {"job_id": "SOURCE-1", "input_name": "default", "edge": "default"}
+        ],
+    )
+
+    (record,) = tracer.records
+    assert [phase.phase for phase in record.phases] == [
+        "parse_ctrls",
+        "fetch_inputs",
+        "inject_init_container",
+        "call",
+        "post_result",
+    ]
+    assert seen == [phase.phase for phase in record.phases] + [None]
+    assert record.input_nbytes == 8000 and record.output_nbytes == 8000
+    assert record.wall_time >= sum(phase.wall_time for phase in record.phases)
+    call = record.phases[3]
+    assert call.peak_alloc >= 8000
+    assert record.framework_time == pytest.approx(record.wall_time - call.wall_time)
+
+    path = str(tmp_path / "trace.json")
+    tracer.save_chrome_trace(path)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert [event["name"] for event in events][:2] == ["DOUBLE-1", "parse_ctrls"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+def test_failing_node_is_recorded(tracer):
+    with pytest.raises(RuntimeError):
+        FAIL(node_id="FAIL-1", job_id="FAIL-1", jobset_id="")
+    (record,) = tracer.records
+    assert "node failed" in record.error
+    assert record.phases[-1].phase == "call"
+
+
+def test_nothing_is_recorded_when_disabled(tracer):
+    disable_tracing()
+    JobService().post_job_result("SOURCE-1", Vector(v=numpy.arange(10.0)))
+    DOUBLE(
+        node_id="DOUBLE-1",
+        job_id="DOUBLE-1",
+        jobset_id="",
+        previous_jobs=[
+            {"job_id": "SOURCE-1", "input_name": "default", "edge": "default"}
+        ],
+    )
+    assert tracer.records == []
+
+
+def test_peaks_of_overlapping_phases_are_not_recorded(tracer):
+    first = tracer.node_span("A-1", "A-1", "A")
+    second = tracer.node_span("B-1", "B-1", "B")
+    first.begin("call")
+    second.begin("call")
+    first.finish()
+    second.finish()
+    alone = tracer.node_span("C-1", "C-1", "C")
+    alone.begin("call")
+    alone.finish()
+    peaks = [record.phases[0].peak_alloc for record in tracer.records]
+    assert peaks[:2] == [None, None] and peaks[2] is not None
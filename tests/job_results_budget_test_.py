@@ -0,0 +1,162 @@
+import numpy
+import pytest
+
+from flojoy import DataContainer, JobService, OrderedPair, flojoy
+from flojoy.dao import Dao
+from flojoy.job_result_utils import get_result_nbytes
+from flojoy.shared_memory import SharedResult
+from flojoy.jobset_executor import Job, JobsetExecutor
+from flojoy.utils import clear_flojoy_memory
+
+
+@flojoy
+def SOURCE():
+    x = numpy.arange(100, dtype=numpy.float64)
+    return OrderedPair(x=x, y=x)
+
+
+@flojoy
+def DOUBLE(default: DataContainer):
+    return OrderedPair(x=default.x, y=default.y * 2)
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    clear_flojoy_memory()
+    yield
+    JobService().set_job_results_budget(None)
+    clear_flojoy_memory()
+
+
+def result(size: int):
+    return OrderedPair(x=numpy.zeros(size, dtype=numpy.uint8), y=numpy.zeros(0))
+
+
+def test_result_nbytes_counts_nested_arrays():
+    dc = OrderedPair(x=numpy.zeros(10), y=numpy.zeros(5, dtype=numpy.int32))
+    assert get_result_nbytes(dc) == 100
+    assert get_result_nbytes({"data": dc, "__result_field__": "data"}) == 100
+
+
+def test_result_nbytes_counts_the_buffers_kept_alive(tmp_path):
+    # views keep the whole array they are a view of alive, counted once
+    base = numpy.zeros(1000, dtype=numpy.uint8)
+    assert get_result_nbytes(OrderedPair(x=base[:10], y=base[10:20])) == 1000
+
+    numpy.save(tmp_path / "m.npy", numpy.zeros((10, 10)))
+    dc = OrderedPair(x=numpy.zeros(0), y=numpy.zeros(0))
+    dc.set_lazy("x", str(tmp_path / "m.npy"))
+    dc.set_lazy("y", lambda: numpy.zeros(10))
+    assert get_result_nbytes(dc) == 800
+    dc.y
+    assert get_result_nbytes(dc) == 880
+
+    assert get_result_nbytes(SharedResult("block", 123)) == 123
+
+
+def test_least_recently_used_results_are_evicted():
+    job_service = JobService()
+    job_service.set_job_results_budget(250)
+    for job_id in ["a", "b"]:
+        job_service.post_job_result(job_id, result(100))
+    job_service.get_job_result("a")
+    job_service.post_job_result("c", result(100))
+    assert job_service.job_exists("a")
+    assert not job_service.job_exists("b")
+    assert job_service.job_exists("c")
+    assert Dao.get_instance().job_results_nbytes == 200
+
+
+def test_newest_result_is_kept_even_above_budget():
+    job_service = JobService()
+    job_service.set_job_results_budget(50)
+    job_service.post_job_result("big", result(100))
+    assert job_service.job_exists("big")
+
+
+def test_results_waiting_for_consumers_are_not_dropped(caplog):
+    job_service = JobService()
+    job_service.set_job_results_budget(150)
+    job_service.post_job_result("a", result(100))
+    Dao.get_instance().set_job_consumers("a", 1)
+    job_service.post_job_result("b", result(100))
+    assert job_service.job_exists("a")
+    assert "above the budget" in caplog.text
+
+    job_service.release_job_result("a")
+    assert not job_service.job_exists("a")
+
+
+def test_results_released_once_all_consumers_fetched():
+    edge = {"job_id": "src", "input_name": "default", "edge": "default"}
+    jobs = [
+        Job("src", SOURCE),
+        Job("a", DOUBLE, previous_jobs=[edge]),
+        Job("b", DOUBLE, previous_jobs=[edge]),
+    ]
+    results = JobsetExecutor(jobs, release_results=True).run()
+    assert sorted(results) == ["a", "b"]
+    assert not JobService().job_exists("src")
+    assert JobService().job_exists("a") and JobService().job_exists("b")
+
+
+def test_evicted_results_are_spilled_to_disk(tmp_path):
+    job_service = JobService()
+    job_service.enable_spill(str(tmp_path), min_nbytes=50)
+    try:
+        job_service.set_job_results_budget(150)
+        job_service.post_job_result("small", result(10))
+        job_service.post_job_result("a", result(100))
+        job_service.post_job_result("b", result(100))
+        job_service.post_job_result("c", result(100))
+
+        # "small" is under min_nbytes and dropped, "a" and "b" are spilled
+        assert not job_service.job_exists("small")
+        spilled = job_service.get_job_result("a")
+        assert isinstance(spilled, OrderedPair)
+        assert isinstance(spilled.x, numpy.memmap)
+        assert spilled.x.shape == (100,) and spilled.y.shape == (0,)
+        (spill_dir,) = tmp_path.iterdir()
+        assert len(list(spill_dir.iterdir())) == 2
+
+        job_service.delete_job("a")
+        assert not job_service.job_exists("a")
+        job_service.reset()
+        assert list(spill_dir.iterdir()) == []
+    finally:
+        job_service.disable_spill()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spilling_leaves_other_files_alone(tmp_path):
+    (tmp_path / "project").mkdir()
+    (tmp_path / "project" / "data.txt").write_text("keep")
+    job_service = JobService()
+    job_service.enable_spill(str(tmp_path), min_nbytes=50)
+    job_service.set_job_results_budget(150)
+    job_service.post_job_result("project", result(100))
+    job_service.post_job_result("b", result(100))
+    job_service.reset()
+    job_service.disable_spill()
+    assert [path.name for path in tmp_path.iterdir()] == ["project"]
+    assert (tmp_path / "project" / "data.txt").read_text() == "keep"
+
+
+def test_reposted_results_replace_their_spilled_copy(tmp_path):
+    job_service = JobService()
+    job_service.enable_spill(str(tmp_path), min_nbytes=50)
+    try:
+        job_service.set_job_results_budget(150)
+        job_service.post_job_result("a", result(100))
+        job_service.post_job_result("b", result(100))
+        (spill_dir,) = tmp_path.iterdir()
+        assert len(list(spill_dir.iterdir())) == 1
+
+        # the new result of "a" is under min_nbytes, it is dropped when evicted
+        job_service.post_job_result("a", OrderedPair(x=numpy.ones(3), y=numpy.ones(3)))
+        assert list(spill_dir.iterdir()) == []
+        assert job_service.get_job_result("a").x.tolist() == [1, 1, 1]
+        Dao.get_instance().evict_job_result("a")
+        assert not job_service.job_exists("a")
+    finally:
+        job_service.disable_spill()
@@ -0,0 +1,249 @@
+import threading
+import time
+
+import numpy
+import pytest
+
+from flojoy import DataContainer, JobResultBuilder, JobService, flojoy
+from flojoy.jobset_executor import (
+    Job,
+    JobsetExecutor,
+    invalidate_downstream,
+    topological_sort,
+)
+from flojoy.dao import Dao
+from flojoy.node_init import NodeInitContainer
+from flojoy.utils import clear_flojoy_memory
+
+
+@flojoy
+def LINSPACE():
+    x = numpy.linspace(0, 10, 100)
+    return DataContainer(x=x, y=x)
+
+
+@flojoy
+def SCALE(default: DataContainer, factor: float = 2.0):
+    return DataContainer(x=default.x, y=default.y * factor)
+
+
+@flojoy
+def SUM(a: DataContainer, b: DataContainer):
+    return DataContainer(x=a.x, y=a.y + b.y)
+
+
+@flojoy
+def CONDITIONAL(default: DataContainer):
+    return (
+        JobResultBuilder()
+        .from_data(default)
+        .flow_by_flag(True, ["true"], ["false"])
+        .build()
+    )
+
+
+def edge(job_id, input_name="default", edge="default"):
+    return {"job_id": job_id, "input_name": input_name, "edge": edge}
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    clear_flojoy_memory()
+    yield
+    clear_flojoy_memory()
+
+
+def test_topological_sort_orders_predecessors_first():
+    jobs = [
+        Job("sum", SUM, previous_jobs=[edge("a", "a"), edge("b", "b")]),
+        Job("a", SCALE, previous_jobs=[edge("src")]),
+        Job("b", SCALE, previous_jobs=[edge("src")]),
+        Job("src", LINSPACE),
+    ]
+    order = topological_sort(jobs)
+    assert order.index("src") < order.index("a") < order.index("sum")
+    assert order.index("b") < order.index("sum")
+
+
+def test_topological_sort_rejects_cycles():
+    jobs = [
+        Job("a", SCALE, previous_jobs=[edge("b")]),
+        Job("b", SCALE, previous_jobs=[edge("a")]),
+    ]
+    with pytest.raises(ValueError):
+        topological_sort(jobs)
+
+
+def test_independent_branches_run_concurrently():
+    barrier = threading.Barrier(4, timeout=5)
+
+    @flojoy
+    def WAIT_FOR_SIBLINGS(default: DataContainer):
+        barrier.wait()
+        return default
+
+    jobs = [Job("src", LINSPACE)] + [
+        Job("branch%d" % i, WAIT_FOR_SIBLINGS, previous_jobs=[edge("src")])
+        for i in range(4)
+    ]
+    results = JobsetExecutor(jobs, max_workers=4).run()
+    assert sorted(results) == ["branch0", "branch1", "branch2", "branch3"]
+
+
+def test_fan_in_receives_all_inputs():
+    jobs = [
+        Job("src", LINSPACE),
+        Job(
+            "a",
+            SCALE,
+            previous_jobs=[edge("src")],
+            ctrls={"factor": {"param": "factor", "value": 3, "type": "float"}},
+            function_parameters={"factor"},
+        ),
+        Job("b", SCALE, previous_jobs=[edge("src")]),
+        Job("sum", SUM, previous_jobs=[edge("a", "a"), edge("b", "b")]),
+    ]
+    results = JobsetExecutor(jobs, max_workers=2).run()
+    x = numpy.linspace(0, 10, 100)
+    assert list(results) == ["sum"]
+    assert numpy.allclose(results["sum"].y, x * 5)
+    assert numpy.allclose(JobService().get_job_result("a").y, x * 3)
+
+
+def test_inactive_flow_direction_is_skipped():
+    jobs = [
+        Job("src", LINSPACE),
+        Job("cond", CONDITIONAL, previous_jobs=[edge("src")]),
+        Job("on_true", LINSPACE, previous_jobs=[edge("cond", edge="true")]),
+        Job("on_false", LINSPACE, previous_jobs=[edge("cond", edge="false")]),
+        Job("after_false", SCALE, previous_jobs=[edge("on_false")]),
+    ]
+    results = JobsetExecutor(jobs).run()
+    assert "on_true" in results
+    assert "on_false" not in results and "after_false" not in results
+    assert not JobService().job_exists("on_false")
+
+
+def test_process_pool_execution():
+    jobs = [
+        Job("src", LINSPACE),
+        Job("a", SCALE, previous_jobs=[edge("src")]),
+        Job("b", SCALE, previous_jobs=[edge("src")]),
+        Job("sum", SUM, previous_jobs=[edge("a", "a"), edge("b", "b")]),
+    ]
+    results = JobsetExecutor(jobs, max_workers=2, use_processes=True).run()
+    x = numpy.linspace(0, 10, 100)
+    assert numpy.allclose(results["sum"].y, x * 4)
+    assert numpy.allclose(JobService().get_job_result("a").y, x * 2)
+
+
+def test_incremental_run_only_reruns_changed_branch():
+    calls = []
+
+    @flojoy
+    def COUNTED(default: DataContainer, factor: float = 2.0):
+        calls.append(factor)
+        return DataContainer(x=default.x, y=default.y * factor)
+
+    def jobs(factor):
+        ctrls = {"factor": {"param": "factor", "value": factor, "type": "float"}}
+        return [
+            Job("src", LINSPACE),
+            Job("left", COUNTED, previous_jobs=[edge("src")]),
+            Job(
+                "right",
+                COUNTED,
+                previous_jobs=[edge("src")],
+                ctrls=ctrls,
+                function_parameters={"factor"},
+            ),
+            Job("sum", SUM, previous_jobs=[edge("left", "a"), edge("right", "b")]),
+        ]
+
+    first = JobsetExecutor(jobs(3), incremental=True).run()
+    assert sorted(calls) == [2.0, 3.0]
+    assert numpy.allclose(first["sum"].y, numpy.linspace(0, 10, 100) * 5)
+
+    calls.clear()
+    JobsetExecutor(jobs(3), incremental=True).run()
+    assert calls == []
+
+    second = JobsetExecutor(jobs(4), incremental=True).run()
+    assert calls == [4.0]
+    assert numpy.allclose(second["sum"].y, numpy.linspace(0, 10, 100) * 6)
+
+    calls.clear()
+    assert invalidate_downstream(jobs(4), ["left"]) == {"left", "sum"}
+    assert not JobService().job_exists("sum")
+    JobsetExecutor(jobs(4), incremental=True).run()
+    assert calls == [2.0]
+
+
+def test_compiled_plans_are_reused_across_runs():
+    ctrls = {"factor": {"param": "factor", "value": 3, "type": "float"}}
+    jobs = [
+        Job("src", LINSPACE),
+        Job("scale", SCALE, previous_jobs=[edge("src")], ctrls=ctrls),
+    ]
+    jobs[1].function_parameters = {"factor"}
+    executor = JobsetExecutor(jobs)
+    executor.compile()
+    plan = executor.plans["scale"]
+    assert plan.params == {"factor": 3.0}
+
+    first = executor.run()["scale"]
+    second = executor.run()["scale"]
+    assert executor.plans["scale"] is plan
+    numpy.testing.assert_array_equal(second.y, first.y)
+    numpy.testing.assert_array_equal(first.y, numpy.linspace(0, 10, 100) * 3)
+
+    # new ctrls are compiled again
+    jobs[1].ctrls = {"factor": {"param": "factor", "value": 4, "type": "float"}}
+    result = executor.run()["scale"]
+    assert executor.plans["scale"] is not plan
+    numpy.testing.assert_array_equal(result.y, numpy.linspace(0, 10, 100) * 4)
+
+
+def test_compiled_plan_fetches_fresh_inputs():
+    plan = SCALE.compile(
+        node_id="scale", job_id="scale", jobset_id="", previous_jobs=[edge("src")]
+    )
+    for value in (1.0, 2.0):
+        JobService().post_job_result("src", DataContainer(x=[0], y=[value]))
+        assert plan().y.tolist() == [value * 2]
+        assert JobService().get_job_result("scale").y.tolist() == [value * 2]
+
+
+def test_plans_follow_ctrls_edited_in_place():
+    ctrls = {"factor": {"param": "factor", "value": 3, "type": "float"}}
+    jobs = [
+        Job("src", LINSPACE),
+        Job(
+            "scale",
+            SCALE,
+            previous_jobs=[edge("src")],
+            ctrls=ctrls,
+            function_parameters={"factor"},
+        ),
+    ]
+    executor = JobsetExecutor(jobs, incremental=True)
+    executor.run()
+
+    ctrls["factor"]["value"] = 5
+    result = executor.run()["scale"]
+    numpy.testing.assert_array_equal(result.y, numpy.linspace(0, 10, 100) * 5)
+
+
+@flojoy
+def READ_INIT(init_container: NodeInitContainer):
+    return DataContainer(type="scalar", c=init_container.get())
+
+
+def test_plans_read_the_current_init_container():
+    executor = JobsetExecutor([Job("read", READ_INIT)])
+    Dao.get_instance().set_init_container("read", NodeInitContainer(1))
+    assert executor.run()["read"].c == 1
+
+    # e.g. the init function of the node ran again
+    Dao.get_instance().set_init_container("read", NodeInitContainer(2))
+    assert executor.run()["read"].c == 2
@@ -0,0 +1,62 @@
+import io
+import json
+import logging
+
+import pytest
+
+from flojoy import configure_logging, get_logger, set_log_level, shutdown_logging
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("disabled records must not be formatted")
+
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    set_log_level(logging.NOTSET)
+    set_log_level(logging.NOTSET, "jobset_executor")
+
+
+def test_records_are_written_as_json_lines(output):
+    configure_logging(level="INFO", stream=output)
+    log = get_logger("flojoy.flojoy_python")
+    log.info("running %s", "NODE-1", extra={"node_id": "NODE-1"})
+    log.debug("not enabled %s", Unformattable())
+    shutdown_logging()
+
+    (line,) = output.getvalue().splitlines()
+    entry = json.loads(line)
+    assert entry["message"] == "running NODE-1"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "flojoy.flojoy_python"
+    assert entry["node_id"] == "NODE-1"
+
+
+def test_levels_can_be_set_per_module(output):
+    configure_logging(
+        level="WARNING", stream=output, levels={"jobset_executor": "DEBUG"}
+    )
+    get_logger("jobset_executor").debug("submitting job: %s", "A")
+    get_logger("flojoy_python").debug("hidden")
+    shutdown_logging()
+
+    messages = [json.loads(line)["message"] for line in output.getvalue().splitlines()]
+    assert messages == ["submitting job: A"]
+
+
+def test_exceptions_are_written_apart_from_the_message(output):
+    configure_logging(level="INFO", stream=output)
+    try:
+        raise ValueError("bad input")
+    except ValueError:
+        get_logger("flojoy_python").exception("node %s failed", "NODE-1")
+    shutdown_logging()
+
+    entry = json.loads(output.getvalue())
+    assert entry["message"] == "node NODE-1 failed"
+    assert "Traceback" in entry["exception"]
+    assert "ValueError: bad input" in entry["exception"]
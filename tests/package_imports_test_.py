@@ -0,0 +1,49 @@
+import importlib
+import subprocess
+import sys
+
+import flojoy
+
+
+def test_import_loads_submodules_lazily():
+    code = (
+        "import sys, flojoy\n"
+        "assert 'numpy' not in sys.modules\n"
+        "assert [m for m in sys.modules if m.startswith('flojoy.')] == []\n"
+        "flojoy.SmallMemory\n"
+        "assert 'flojoy.small_memory' in sys.modules\n"
+        "assert 'flojoy.reconciler' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_exports_match_submodules():
+    for name in flojoy._EXPORTS:  # type: ignore
+        submodule = importlib.import_module(
+            "flojoy." + flojoy._EXPORTS[name]  # type: ignore
+        )
+        assert getattr(flojoy, name) is getattr(submodule, name)
+    # every name a submodule declares public is exported
+    for submodule_name in flojoy._SUBMODULE_EXPORTS:  # type: ignore
+        submodule = importlib.import_module("flojoy." + submodule_name)
+        for name in getattr(submodule, "__all__", []):
+            assert name in flojoy.__all__
+
+    assert flojoy.serialization.decode is not None
+    assert flojoy.np is importlib.import_module("numpy")
+
+
+def test_legacy_star_exports_are_kept():
+    namespace = {}
+    exec("from flojoy import *", namespace)
+    for name in ["Box", "Dao", "np", "data_container", "job_service", "utils"]:
+        assert namespace[name] is getattr(flojoy, name)
+
+
+def test_unknown_names_import_nothing():
+    code = (
+        "import sys, flojoy\n"
+        "assert not hasattr(flojoy, 'nonexistent')\n"
+        "assert [m for m in sys.modules if m.startswith('flojoy.')] == []\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
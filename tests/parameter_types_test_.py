@@ -0,0 +1,50 @@
+import pytest
+
+from flojoy.parameter_types import (
+    Array,
+    format_param_value,
+    parse_array,
+    parse_ctrl_value,
+)
+
+
+def test_numeric_lists_parse_into_lists():
+    floats = format_param_value("1.5, 2,3e2", "list[float]")
+    assert floats == [1.5, 2.0, 300.0] and type(floats[0]) is float
+    ints = format_param_value("1, 2", "list[int]")
+    assert ints == [1, 2] and type(ints[0]) is int
+    # parsed by Python when out of the range of numpy
+    assert format_param_value("1, 99999999999999999999", "list[int]") == [
+        1,
+        99999999999999999999,
+    ]
+    assert format_param_value("", "list[float]") == []
+    with pytest.raises(ValueError):
+        format_param_value("1.5,2", "list[int]")
+
+
+def test_array_items_are_kept_as_strings():
+    assert format_param_value("1,2", "Array").unwrap() == ["1", "2"]
+    assert format_param_value("1, b", "Array").unwrap() == ["1", "b"]
+    assert parse_array(" a, b", [str], "list[str]") == ["a", "b"]
+
+
+def test_ctrl_values_are_parsed_once_per_node():
+    value = ",".join(str(i) for i in range(10_000))
+    first = parse_ctrl_value("NODE", value, "list[float]")
+    assert first == list(range(10_000))
+
+    # mutable results are copied, so a node changing them doesn't change the cache
+    first[0] = -1.0
+    assert parse_ctrl_value("NODE", value, "list[float]")[0] == 0.0
+    names = parse_ctrl_value("NODE", "a,b", "list[str]")
+    names.append("c")
+    assert parse_ctrl_value("NODE", "a,b", "list[str]") == ["a", "b"]
+    mixed = parse_ctrl_value("NODE", "a,b", "Array")
+    assert isinstance(mixed, Array)
+    assert parse_ctrl_value("NODE", "a,b", "Array").unwrap() is not mixed.unwrap()
+
+    # cached by type: the string of an int and of a float differ
+    assert parse_ctrl_value("NODE", 1, "str") == "1"
+    assert parse_ctrl_value("NODE", 1.0, "str") == "1.0"
+    assert parse_ctrl_value("NODE", [1, 2], "unknown") == [1, 2]
@@ -0,0 +1,103 @@
+import numpy
+import pytest
+
+from flojoy import (
+    FlojoyConfig,
+    Grayscale,
+    Image,
+    JobService,
+    Matrix,
+    OrderedPair,
+    Scalar,
+    Vector,
+    flojoy,
+    lttb_indices,
+    minmax_indices,
+    preview_container,
+)
+from flojoy.utils import clear_flojoy_memory
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    clear_flojoy_memory()
+    yield
+    clear_flojoy_memory()
+
+
+def test_minmax_keeps_the_extremes_of_each_bucket():
+    y = numpy.zeros(10_001)
+    y[1234], y[8765] = 5, -5
+    indices = minmax_indices(y, 100)
+    assert len(indices) <= 100
+    assert 1234 in indices and 8765 in indices
+    assert numpy.all(numpy.diff(indices) >= 0)
+
+
+def test_lttb_picks_max_points_in_order():
+    x = numpy.linspace(0, 10, 5000)
+    indices = lttb_indices(x, numpy.sin(x), 200)
+    assert len(indices) == 200
+    assert indices[0] == 0 and indices[-1] == 4999
+    assert numpy.all(numpy.diff(indices) > 0)
+
+
+def test_preview_bounds_the_size_of_containers():
+    x = numpy.arange(1_000_000.0)
+    pair = preview_container(OrderedPair(x=x, y=numpy.sin(x)), max_points=1000)
+    assert isinstance(pair, OrderedPair) and len(pair.x) <= 1000
+    lttb = preview_container(OrderedPair(x=x, y=x), max_points=500, method="lttb")
+    assert len(lttb.y) == 500
+    assert len(preview_container(Vector(v=x), max_points=10).v) == 10
+
+    m = preview_container(Matrix(m=numpy.ones((1000, 300))), max_side=100).m
+    assert m.shape == (100, 30) and numpy.all(m == 1)
+    channel = numpy.full((64, 64), 200, dtype=numpy.uint8)
+    image = preview_container(Image(r=channel, g=channel, b=channel), max_side=16)
+    assert image.r.shape == (16, 16) and image.r.dtype == numpy.uint8
+
+    gray = preview_container(Grayscale(img=numpy.ones((4000, 4000))), max_side=100)
+    assert isinstance(gray, Grayscale) and gray.m.shape == (100, 100)
+
+    small = OrderedPair(x=[1, 2], y=[3, 4])
+    assert preview_container(small) is small
+    scalar = Scalar(c=1)
+    assert preview_container(scalar) is scalar
+
+
+def test_preview_keeps_other_keys_lazy():
+    def load_extra():
+        raise AssertionError("extra was materialized")
+
+    x = numpy.arange(10_000.0)
+    pair = OrderedPair(x=x, y=x)
+    pair.set_lazy("extra", load_extra)
+    preview = preview_container(pair, max_points=100)
+    assert len(preview.x) <= 100
+    assert preview.is_lazy("extra") and pair.is_lazy("extra")
+
+
+def test_job_preview_is_cached_until_the_result_changes():
+    service = JobService()
+    x = numpy.arange(10_000.0)
+    service.post_job_result("job", OrderedPair(x=x, y=x))
+    preview = service.get_job_preview("job")
+    assert len(preview.x) <= FlojoyConfig.get_instance().preview_max_points
+    assert service.get_job_preview("job") is preview
+    service.post_job_result("job", OrderedPair(x=x[:10], y=x[:10]))
+    assert len(service.get_job_preview("job").x) == 10
+
+
+def test_previews_computed_when_posted():
+    @flojoy
+    def RAMP():
+        x = numpy.arange(10_000.0)
+        return OrderedPair(x=x, y=x)
+
+    config = FlojoyConfig.get_instance()
+    config.preview_results = True
+    try:
+        RAMP(node_id="RAMP", job_id="ramp", jobset_id="")
+    finally:
+        config.preview_results = False
+    assert "ramp" in JobService().dao.job_previews
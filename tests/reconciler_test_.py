@@ -78,3 +78,81 @@ class ReconcilerTestCase(unittest.TestCase):
         # function under test
         with self.assertRaises(IrreconcilableContainersException):
             rec_a, rec_b = r.reconcile(dc_a, dc_b)
+
+    def test_matrix_same_size_and_scalar_are_not_copied(self):
+        dc_a = DataContainer(type="matrix", m=numpy.arange(6.0).reshape(2, 3))
+        dc_b = DataContainer(type="matrix", m=numpy.ones([2, 3]))
+
+        r = Reconciler()
+        rec_a, rec_b = r.reconcile(dc_a, dc_b)
+        self.assertIs(rec_a, dc_a)
+        self.assertIs(rec_b, dc_b)
+
+        rec_s, rec_m = r.reconcile(DataContainer(type="scalar", c=2), dc_a)
+        self.assertIs(rec_m, dc_a)
+        # the scalar is broadcast as a view, not filled into a new matrix
+        self.assertEqual(rec_s.m.strides, (0, 0))
+        self.assertTrue(numpy.array_equal(rec_s.m + rec_m.m, dc_a.m + 2))
+
+    def test_ordered_pair_resampled_on_common_x(self):
+        dc_a = DataContainer(
+            type="ordered_pair", x=numpy.array([0.0, 2.0, 4.0]), y=[0.0, 2.0, 4.0]
+        )
+        dc_b = DataContainer(
+            type="ordered_pair", x=numpy.array([3.0, 1.0]), y=[30.0, 10.0]
+        )
+
+        r = Reconciler(pad=-1)
+        rec_a, rec_b = r.reconcile(dc_a, dc_b)
+
+        numpy.testing.assert_array_equal(rec_a.x, [0, 1, 2, 3, 4])
+        numpy.testing.assert_array_equal(rec_b.x, [0, 1, 2, 3, 4])
+        numpy.testing.assert_array_equal(rec_a.y, [0, 1, 2, 3, 4])
+        numpy.testing.assert_array_equal(rec_b.y, [-1, 10, 20, 30, -1])
+
+    def test_dataframe_matrix(self):
+        df_a = pandas.DataFrame(data={"col1": [1, 2], "col2": [3, 4]})
+        dc_a = DataContainer(type="dataframe", m=df_a)
+        dc_b = DataContainer(type="matrix", m=numpy.ones([2, 2]))
+
+        r = Reconciler()
+        rec_b, rec_a = r.reconcile(dc_b, dc_a)
+
+        self.assertIs(rec_a, dc_a)
+        self.assertEqual(list(rec_b.m.columns), ["col1", "col2"])
+        self.assertTrue((rec_a.m + rec_b.m).equals(df_a + 1.0))
+
+    def test_reconcile_many_matrices_in_one_stack(self):
+        dcs = [
+            DataContainer(type="matrix", m=numpy.ones([2, 3])),
+            DataContainer(type="scalar", c=5),
+            DataContainer(type="matrix", m=numpy.full([3, 1], 2.0)),
+        ]
+
+        r = Reconciler(pad=-1)
+        rec = r.reconcile_many(dcs)
+
+        self.assertEqual([dc.m.shape for dc in rec], [(3, 3)] * 3)
+        # every reconciled matrix is a view of the same stacked array
+        self.assertTrue(all(dc.m.base is rec[0].m.base for dc in rec))
+        numpy.testing.assert_array_equal(
+            r.stack(dcs).sum(axis=0),
+            [[8.0, 5.0, 5.0], [8.0, 5.0, 5.0], [6.0, 3.0, 3.0]],
+        )
+
+    def test_reconcile_many_ordered_pairs(self):
+        dcs = [
+            DataContainer(type="ordered_pair", x=numpy.array([0.0, 2.0]), y=[0, 2]),
+            DataContainer(type="ordered_pair", x=numpy.array([1.0]), y=[10]),
+            DataContainer(type="ordered_pair", x=numpy.array([0.0, 3.0]), y=[0, 3]),
+        ]
+
+        rec = Reconciler().reconcile_many(dcs)
+
+        for dc in rec:
+            numpy.testing.assert_array_equal(dc.x, [0, 1, 2, 3])
+        numpy.testing.assert_array_equal(rec[0].y, [0, 1, 2, 0])
+        numpy.testing.assert_array_equal(rec[1].y, [0, 10, 0, 0])
+        numpy.testing.assert_array_equal(rec[2].y, [0, 1, 2, 3])
+        same = Reconciler().reconcile_many(rec)
+        self.assertTrue(all(a is b for a, b in zip(same, rec)))
@@ -0,0 +1,109 @@
+import numpy
+import pytest
+
+from flojoy import DataContainer, ResultCache, Vector, fingerprint, flojoy
+from flojoy.job_service import JobService
+
+calls = []
+
+
+@flojoy(cache=True)
+def SCALE(default: DataContainer, factor: float = 2.0) -> DataContainer:
+    calls.append(factor)
+    return Vector(v=default.v * factor)
+
+
+@flojoy(cache=True)
+def TAIL(default: DataContainer) -> DataContainer:
+    return Vector(v=default.v[1:])
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    calls.clear()
+    ResultCache.get_instance().clear()
+    yield
+    ResultCache.get_instance().clear()
+
+
+def run_scale(factor: float):
+    return SCALE(
+        node_id="SCALE-1",
+        job_id="SCALE-1",
+        jobset_id="",
+        previous_jobs=[
+            {"job_id": "SOURCE-1", "input_name": "default", "edge": "default"}
+        ],
+        function_parameters={"factor"},
+        ctrls={"factor": {"param": "factor", "value": factor, "type": "float"}},
+    )
+
+
+def test_unchanged_inputs_and_params_reuse_the_result():
+    JobService().post_job_result("SOURCE-1", Vector(v=numpy.arange(5.0)))
+    first = run_scale(2)
+    second = run_scale(2)
+    assert calls == [2.0]
+    assert second is first
+    assert not first.v.flags.writeable
+
+    run_scale(3)
+    JobService().post_job_result("SOURCE-1", Vector(v=numpy.arange(6.0)))
+    run_scale(2)
+    assert calls == [2.0, 3.0, 2.0]
+    assert ResultCache.get_instance().hits == 1
+
+
+def test_fingerprint_depends_on_content_dtype_and_shape():
+    a = numpy.arange(6.0)
+    assert fingerprint(Vector(v=a)) == fingerprint(Vector(v=a.copy()))
+    assert fingerprint(a) != fingerprint(a.reshape(2, 3))
+    assert fingerprint(a) != fingerprint(a.astype(numpy.float32))
+    b = a.copy()
+    b[0] = 1
+    assert fingerprint(a) != fingerprint(b)
+
+
+def test_cache_is_bounded():
+    cache = ResultCache(max_entries=2)
+    for i in range(3):
+        cache.put(b"%d" % i, Vector(v=numpy.arange(i + 1.0)))
+    assert cache.get(b"0") is None
+    assert cache.get(b"2") is not None
+
+
+def test_cached_result_feeds_another_cached_node():
+    JobService().post_job_result("SOURCE-1", Vector(v=numpy.arange(5.0)))
+    run_scale(2)
+
+    def run_chained():
+        return SCALE(
+            node_id="SCALE-2",
+            job_id="SCALE-2",
+            jobset_id="",
+            previous_jobs=[
+                {"job_id": "SCALE-1", "input_name": "default", "edge": "default"}
+            ],
+        )
+
+    # the input of SCALE-2 is the read-only result cached for SCALE-1
+    assert run_chained().v.tolist() == [0, 4, 8, 12, 16]
+    assert run_chained().v.tolist() == [0, 4, 8, 12, 16]
+    assert calls == [2.0, 2.0]
+
+
+def test_arrays_passed_through_leave_the_inputs_writable():
+    source = numpy.arange(5.0)
+    JobService().post_job_result("SOURCE-1", Vector(v=source))
+    result = TAIL(
+        node_id="TAIL-1",
+        job_id="TAIL-1",
+        jobset_id="",
+        previous_jobs=[
+            {"job_id": "SOURCE-1", "input_name": "default", "edge": "default"}
+        ],
+    )
+    assert source.flags.writeable
+    assert not result.v.flags.writeable
+    source[1] = 10
+    assert result.v.tolist() == [1, 2, 3, 4]
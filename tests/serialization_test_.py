@@ -0,0 +1,41 @@
+import numpy
+import pytest
+
+from flojoy import FLOJOY_INSTRUCTION, JobResultBuilder, OrderedPair
+from flojoy.serialization import decode, encode
+
+
+def test_roundtrip_is_zero_copy():
+    dc = OrderedPair(x=numpy.arange(100.0), y=numpy.ones(100))
+    buffer = encode(dc)
+    decoded = decode(buffer)
+    assert isinstance(decoded, OrderedPair)
+    numpy.testing.assert_array_equal(decoded.x, dc.x)
+    assert numpy.shares_memory(decoded.x, numpy.frombuffer(buffer, numpy.uint8))
+
+
+def test_compressed_fields_roundtrip():
+    result = (
+        JobResultBuilder()
+        .from_data(
+            OrderedPair(x=numpy.zeros(10_000), y=numpy.random.default_rng(0).random(10))
+        )
+        .flow_by_flag(True, ["true"], ["false"])
+        .build()
+    )
+    raw = encode(result)
+    compressed = encode(result, compression="zlib")
+    assert len(compressed) < len(raw) // 10
+
+    decoded = decode(compressed)
+    dc = decoded["data"]
+    numpy.testing.assert_array_equal(dc.x, numpy.zeros(10_000))
+    numpy.testing.assert_array_equal(dc.y, result["data"].y)
+    dc.x[0] = 1  # decompressed arrays are regular writable arrays
+    assert decoded.keys() == result.keys()
+    assert decoded[FLOJOY_INSTRUCTION.FLOW_TO_DIRECTIONS] == ["true"]
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError):
+        encode(OrderedPair(x=[1], y=[1]), compression="brotli")
@@ -0,0 +1,86 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pytest
+
+from flojoy import DataContainer, JobResultBuilder, JobService, OrderedPair, flojoy
+from flojoy.dao import Dao
+from flojoy.dao_backends import InMemoryBackend
+from flojoy.jobset_executor import Job, JobsetExecutor
+from flojoy.serialization import decode, encode
+from flojoy.shared_memory import SharedMemoryJobResults, SharedResult, share_result
+from flojoy.utils import clear_flojoy_memory
+
+
+@flojoy
+def SOURCE():
+    x = numpy.arange(1000, dtype=numpy.float64)
+    return OrderedPair(x=x, y=x * 2)
+
+
+@flojoy
+def DOUBLE(default: DataContainer):
+    return OrderedPair(x=default.x, y=default.y * 2)
+
+
+def _sum_in_worker(handle: SharedResult):
+    result = handle.load()
+    shares_memory = not result.y.flags.owndata
+    total = float(result.y.sum())
+    del result
+    handle.close()
+    return total, shares_memory
+
+
+@pytest.fixture
+def shared_dao():
+    dao = Dao.get_instance()
+    dao.use_shared_memory()
+    yield dao
+    clear_flojoy_memory()
+    dao.set_backend(InMemoryBackend())
+
+
+def test_encode_decode_round_trip():
+    result = (
+        JobResultBuilder()
+        .from_data(OrderedPair(x=numpy.arange(5), y=numpy.ones(5)))
+        .flow_to_directions(["true"])
+        .build()
+    )
+    decoded = decode(encode(result))
+    assert decoded["__flow_to_directions__"] == ["true"]
+    assert isinstance(decoded["data"], OrderedPair)
+    assert numpy.array_equal(decoded["data"].x, numpy.arange(5))
+    assert decoded["data"].extra is None
+
+
+def test_handle_is_decoded_without_copy_in_other_process():
+    result = OrderedPair(x=numpy.arange(10.0), y=numpy.ones(10))
+    handle = share_result(result)
+    try:
+        assert len(pickle.dumps(handle)) < 200
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            total, shares_memory = pool.submit(_sum_in_worker, handle).result()
+        assert total == 10.0
+        assert shares_memory
+    finally:
+        handle.unlink()
+
+
+def test_shared_job_results_replace_dao_dict(shared_dao):
+    assert isinstance(shared_dao.job_results, SharedMemoryJobResults)
+    JobService().post_job_result("job", OrderedPair(x=[1, 2], y=[3, 4]))
+    assert JobService().job_exists("job")
+    assert numpy.array_equal(JobService().get_job_result("job").y, [3, 4])
+    JobService().delete_job("job")
+    assert not JobService().job_exists("job")
+
+
+def test_process_pool_uses_shared_memory(shared_dao):
+    edge = {"job_id": "src", "input_name": "default", "edge": "default"}
+    jobs = [Job("src", SOURCE), Job("double", DOUBLE, previous_jobs=[edge])]
+    results = JobsetExecutor(jobs, max_workers=1, use_processes=True).run()
+    assert numpy.array_equal(results["double"].y, numpy.arange(1000) * 4)
+    assert isinstance(shared_dao.job_results.handle("double"), SharedResult)